@@ -0,0 +1,155 @@
+import os
+import json
+import time
+import asyncio
+from collections import deque
+
+from . import metrics
+
+# Expensive routes get a concurrency limit and a bounded wait queue; every
+# other route is a cheap read and is always admitted, so the dashboard keeps
+# its threadpool/CPU share while receipts and imports pile up.
+#
+# "METHOD path": (concurrent, queued, max queue wait in seconds)
+DEFAULT_LIMITS = {
+    "POST /upload-receipt/": (2, 8, 10.0),
+    "POST /expenses/import": (1, 4, 30.0),
+    "GET /expenses/export": (2, 8, 10.0),
+}
+RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "2"))
+
+
+def load_limits() -> dict:
+    """
+    ADMISSION_LIMITS overrides the defaults, e.g.
+    ADMISSION_LIMITS='POST /upload-receipt/=4:16:10,GET /expenses/export=1:2:5'
+    """
+    limits = dict(DEFAULT_LIMITS)
+    for item in filter(None, os.getenv("ADMISSION_LIMITS", "").split(",")):
+        route, _, spec = item.rpartition("=")
+        concurrent, queued, wait = spec.split(":")
+        limits[route.strip()] = (int(concurrent), int(queued), float(wait))
+    return limits
+
+
+class Rejected(Exception):
+    def __init__(self, status: int, reason: str):
+        self.status = status
+        self.reason = reason
+
+
+class RouteLimiter:
+    """
+    Concurrency limit with a bounded FIFO queue. A released slot is handed
+    straight to the oldest waiter, so queued requests can't be overtaken.
+    """
+
+    def __init__(self, route: str, limit: int, queue: int, max_wait: float):
+        self.route = route
+        self.limit = limit
+        self.queue = queue
+        self.max_wait = max_wait
+        self.active = 0
+        self._waiters = deque()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self):
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return
+        if len(self._waiters) >= self.queue:
+            raise Rejected(429, "queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            # Shielded so a timeout can't race with release() handing us the slot
+            await asyncio.wait_for(asyncio.shield(waiter), self.max_wait)
+            return
+        except asyncio.TimeoutError:
+            pass
+        except BaseException:
+            # Client went away while queued: give back a slot we may have been handed
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                waiter.cancel()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+        if waiter.done() and not waiter.cancelled():
+            return
+        waiter.cancel()
+        raise Rejected(503, "queue_timeout")
+
+    def release(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)  # slot passes to the waiter, active unchanged
+                return
+        self.active -= 1
+
+
+REJECTED = metrics.register(metrics.Counter(
+    "admission_rejected_total", "Requests rejected by admission control.", ("route", "reason")
+))
+QUEUE_WAIT = metrics.register(metrics.Histogram(
+    "admission_queue_wait_seconds", "Time spent queued before admission.", ("route",)
+))
+
+
+class AdmissionControlMiddleware:
+    def __init__(self, app, limits: dict = None):
+        self.app = app
+        self.limiters = {
+            route: RouteLimiter(route, *spec) for route, spec in (limits or load_limits()).items()
+        }
+        metrics.gauge(
+            "admission_active", "Requests currently running per limited route.",
+            callback=lambda: {(r,): l.active for r, l in self.limiters.items()}, labelnames=("route",),
+        )
+        metrics.gauge(
+            "admission_queued", "Requests waiting for a slot per limited route.",
+            callback=lambda: {(r,): l.waiting for r, l in self.limiters.items()}, labelnames=("route",),
+        )
+
+    async def __call__(self, scope, receive, send):
+        limiter = None
+        if scope["type"] == "http":
+            limiter = self.limiters.get(f"{scope['method']} {scope['path']}")
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        try:
+            await limiter.acquire()
+        except Rejected as e:
+            REJECTED.inc(limiter.route, e.reason)
+            await self._reject(send, e)
+            return
+        QUEUE_WAIT.observe(time.perf_counter() - started, limiter.route)
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
+
+    async def _reject(self, send, error: Rejected):
+        body = json.dumps({"detail": f"Server busy ({error.reason}), retry later"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": error.status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(RETRY_AFTER).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,170 @@
+import os
+import zlib
+
+# Response compression (pure ASGI, so streamed bodies are compressed chunk by
+# chunk instead of being buffered). gzip is always available; brotli and zstd
+# are offered when the `brotli` / `zstandard` packages are installed and the
+# client asks for them. Levels come from benchmarks/compression_levels.py:
+# beyond these, CPU grows much faster than the bytes saved.
+
+MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "5"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+ZSTD_LEVEL = int(os.getenv("ZSTD_LEVEL", "3"))
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/csv", "text/plain", "text/html")
+# Never touched: SSE must reach the client as each event is sent
+SKIP_TYPES = ("text/event-stream",)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class _Gzip:
+    def __init__(self, level: int = None):
+        self._z = zlib.compressobj(GZIP_LEVEL if level is None else level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._z.compress(data)
+
+    def finish(self) -> bytes:
+        return self._z.flush()
+
+
+class _Brotli:
+    def __init__(self, level: int = None):
+        self._b = brotli.Compressor(quality=BROTLI_QUALITY if level is None else level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._b.process(data)
+
+    def finish(self) -> bytes:
+        return self._b.finish()
+
+
+class _Zstd:
+    def __init__(self, level: int = None):
+        self._z = zstandard.ZstdCompressor(level=ZSTD_LEVEL if level is None else level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._z.compress(data)
+
+    def finish(self) -> bytes:
+        return self._z.flush()
+
+
+# Server preference, best ratio-per-CPU first
+ENCODERS = {}
+if zstandard is not None:
+    ENCODERS["zstd"] = _Zstd
+if brotli is not None:
+    ENCODERS["br"] = _Brotli
+ENCODERS["gzip"] = _Gzip
+
+
+def choose_encoding(accept_encoding: str):
+    """
+    First of ENCODERS the client accepts (q > 0), or None.
+    """
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                if float(params[2:]) == 0:
+                    continue
+            except ValueError:
+                pass
+        accepted.add(name.strip())
+    for name in ENCODERS:
+        if name in accepted or "*" in accepted:
+            return name
+    return None
+
+
+def _is_compressible(headers: list) -> bool:
+    content_type = ""
+    for key, value in headers:
+        if key.lower() == b"content-encoding":
+            return False  # already encoded (e.g. relayed from the writer)
+        if key.lower() == b"content-type":
+            content_type = value.decode("latin-1").lower()
+    if content_type.startswith(SKIP_TYPES):
+        return False
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware:
+    def __init__(self, app, min_size: int = MIN_SIZE):
+        self.app = app
+        self.min_size = min_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = dict(scope["headers"]).get(b"accept-encoding", b"").decode("latin-1")
+        encoding = choose_encoding(accept) if accept else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        state = {"start": None, "buffer": b"", "encoder": None, "passthrough": False}
+
+        async def send_start(compressed: bool, length: int = None):
+            start = state["start"]
+            headers = [(k, v) for k, v in start["headers"] if k.lower() != b"content-length"]
+            if compressed:
+                headers += [(b"content-encoding", encoding.encode()), (b"vary", b"Accept-Encoding")]
+            if length is not None:
+                headers.append((b"content-length", str(length).encode()))
+            await send({**start, "headers": headers})
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                state["start"] = message
+                state["passthrough"] = message["status"] in (204, 304) or not _is_compressible(message["headers"])
+                if state["passthrough"]:
+                    await send(message)
+                return
+            if message["type"] != "http.response.body" or state["passthrough"]:
+                await send(message)
+                return
+
+            body, more = message.get("body", b""), message.get("more_body", False)
+            encoder = state["encoder"]
+            if encoder is None:
+                # Undecided: hold small beginnings until the threshold or the end
+                state["buffer"] += body
+                if more and len(state["buffer"]) < self.min_size:
+                    return
+                if len(state["buffer"]) < self.min_size:
+                    await send_start(False, len(state["buffer"]))
+                    state["passthrough"] = True
+                    await send({"type": "http.response.body", "body": state["buffer"]})
+                    return
+                encoder = state["encoder"] = ENCODERS[encoding]()
+                body, state["buffer"] = state["buffer"], b""
+                if not more:
+                    # Whole body in hand: send it with a real Content-Length
+                    compressed = encoder.compress(body) + encoder.finish()
+                    await send_start(True, len(compressed))
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+                await send_start(True)
+
+            chunk = encoder.compress(body)
+            if not more:
+                chunk += encoder.finish()
+            if chunk or not more:
+                await send({"type": "http.response.body", "body": chunk, "more_body": more})
+
+        await self.app(scope, receive, send_wrapper)
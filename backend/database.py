@@ -1,8 +1,11 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 import os
+import time
+import logging
+import contextvars
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 # Go up one level to root if needed, or keep in backend.
@@ -11,15 +14,101 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 # So we want d:/mini/expenses.db = os.path.join(os.path.dirname(BASE_DIR), "expenses.db")
 
 ROOT_DIR = os.path.dirname(BASE_DIR)
-SQLALCHEMY_DATABASE_URL = f"sqlite:///{os.path.join(ROOT_DIR, 'expenses.db')}"
+# DATABASE_URL lets tests and benchmarks point the app at a scratch database
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{os.path.join(ROOT_DIR, 'expenses.db')}")
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
 )
+
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        # WAL lets readers (other workers) keep reading while the writer commits;
+        # busy_timeout waits for the lock instead of failing with "database is locked".
+        # auto_vacuum only sticks on a new, empty database; older files are
+        # switched over by the first purge with vacuum=true (see services/purge.py)
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA busy_timeout=5000")
+        cursor.close()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+# --- Query Profiling ---
+# Every statement is timed and attributed to the request that issued it
+# (see metrics.QueryProfilerMiddleware). Statements slower than
+# SLOW_QUERY_MS are logged together with their EXPLAIN QUERY PLAN.
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+# Test mode: when set, a request running more queries than its budget fails
+QUERY_BUDGET = int(os.getenv("SQL_QUERY_BUDGET", "0")) or None
+
+slow_query_log = logging.getLogger("backend.slow_queries")
+_query_stats = contextvars.ContextVar("query_stats", default=None)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryStats:
+    def __init__(self, budget: int = None):
+        self.count = 0
+        self.duration = 0.0
+        self.budget = budget
+        self._token = None
+
+
+def begin_query_stats(budget: int = None) -> QueryStats:
+    stats = QueryStats(budget)
+    stats._token = _query_stats.set(stats)
+    return stats
+
+
+def end_query_stats(stats: QueryStats):
+    _query_stats.reset(stats._token)
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        _log_slow_query(conn, cursor, statement, parameters, executemany, elapsed)
+
+    stats = _query_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.duration += elapsed
+        if stats.budget and stats.count > stats.budget:
+            raise QueryBudgetExceeded(
+                f"Query budget of {stats.budget} exceeded by statement: {statement}"
+            )
+
+
+def _log_slow_query(conn, cursor, statement, parameters, executemany, elapsed):
+    plan = ""
+    explainable = statement.lstrip().split(" ", 1)[0].upper() in ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+    if conn.dialect.name == "sqlite" and explainable and not executemany:
+        try:
+            # Run on the raw DBAPI connection so the plan lookup isn't profiled itself
+            rows = cursor.connection.execute(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+            plan = "; ".join(row[-1] for row in rows)
+        except Exception as e:
+            plan = f"unavailable ({e})"
+    slow_query_log.warning(
+        "Slow query (%.1f ms): %s | params=%r | plan=%s",
+        elapsed * 1000, statement, parameters, plan,
+    )
+
 def get_db():
     db = SessionLocal()
     try:
@@ -1,14 +1,62 @@
-from fastapi import FastAPI, Depends, HTTPException, UploadFile, File
+from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, WebSocket
+from fastapi.responses import PlainTextResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List
-from .routers import chat
-from . import models, schemas, database
+from contextlib import asynccontextmanager
+from .routers import chat, analytics
+from . import models, schemas, database, metrics, workers, admission, migrations, compression
+from .responses import FastJSONResponse
+from .services import write_queue, events, changes, categories, search, bulk, purge, rows, export, imports, csv_format, suggestions
+from .services.hub import hub
 from datetime import timedelta
-from .services import ocr
+import asyncio
 import shutil
+import sys
 import os
+import time
 
-app = FastAPI()
+# Warm the OCR stack in the background after startup (set to 0 to load on first receipt)
+OCR_WARMUP = os.getenv("OCR_WARMUP", "1") == "1"
+
+def load_ocr():
+    # cv2, numpy, PIL and pytesseract are slow to import and only receipt
+    # uploads need them, so they stay out of the module-level imports.
+    from .services import ocr
+    return ocr
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Readers never write; the writer (or a single process) owns the schema
+    if workers.ROLE != "reader":
+        # Create tables
+        models.Base.metadata.create_all(bind=database.engine)
+        migrations.run(database.engine)
+        write_queue.start_writer()
+
+    warmup = None
+    if OCR_WARMUP:
+        warmup = asyncio.create_task(run_in_threadpool(load_ocr))
+    yield
+    if warmup and not warmup.done():
+        warmup.cancel()
+    # Flushes anything still queued before shutdown
+    write_queue.stop_writer()
+    # Keep the analytics snapshot for a fast restart (if it was ever loaded)
+    snapshot = sys.modules.get(f"{__package__}.services.snapshot")
+    if snapshot and snapshot.snapshot.loaded:
+        snapshot.snapshot.save()
+
+app = FastAPI(lifespan=lifespan)
+
+metrics.gauge(
+    "ocr_stack_loaded", "1 once the OCR modules have been imported.",
+    callback=lambda: int(f"{__package__}.services.ocr" in sys.modules),
+)
+metrics.gauge(
+    "expense_write_queue_depth", "Expense inserts waiting for the next group commit.",
+    callback=lambda: write_queue.expense_writer.depth() if write_queue.expense_writer else 0,
+)
 
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -19,6 +67,9 @@ origins = [
     "https://spendwise-backend-6n8n.onrender.com"
 ]
 
+# Added before CORS so it sits inside it: 429/503 rejections still carry CORS headers
+app.add_middleware(admission.AdmissionControlMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -27,23 +78,37 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Create tables
-models.Base.metadata.create_all(bind=database.engine)
+# Inside metrics, so response sizes are recorded as sent on the wire
+app.add_middleware(compression.CompressionMiddleware)
+
+if workers.ROLE == "reader":
+    app.add_middleware(workers.WriteForwardingMiddleware)
+app.add_middleware(metrics.MetricsMiddleware)
+app.add_middleware(metrics.QueryProfilerMiddleware)
 
 @app.post("/expenses/", response_model=schemas.Expense)
-def create_expense(expense: schemas.ExpenseCreate, db: Session = Depends(database.get_db)):
-    db_expense = models.Expense(**expense.dict())
+async def create_expense(expense: schemas.ExpenseCreate, db: Session = Depends(database.get_db)):
+    if write_queue.batching_enabled():
+        # Group commit: wait for the writer to commit this row with its batch.
+        # Awaited, not blocking a threadpool thread: concurrent creates would
+        # otherwise cap the batch at the pool size and starve other endpoints.
+        # shield() so a timeout or disconnect doesn't cancel the writer's Future
+        future = write_queue.expense_writer.submit(expense.dict())
+        return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), write_queue.SUBMIT_TIMEOUT)
+    return await run_in_threadpool(_create_expense, expense, db)
+
+def _create_expense(expense: schemas.ExpenseCreate, db: Session):
+    db_expense = models.Expense(**categories.expense_values(db, expense.dict()))
     db.add(db_expense)
     db.commit()
     db.refresh(db_expense)
+    events.publish("expenses.created", rows=[events.as_row(db_expense)])
     return db_expense
 
 from datetime import date, datetime
 from fastapi.responses import StreamingResponse
-import csv
-import io
 
-@app.get("/expenses/", response_model=List[schemas.Expense])
+@app.get("/expenses/", response_model=List[schemas.Expense], response_class=FastJSONResponse)
 def read_expenses(
     skip: int = 0, 
     limit: int = 100, 
@@ -51,131 +116,85 @@ def read_expenses(
     end_date: date = None, 
     db: Session = Depends(database.get_db)
 ):
-    query = db.query(models.Expense)
+    # Fast path: plain column rows straight to orjson, no ORM objects or
+    # per-row response_model validation (the shape is checked in verify_fast_json.py)
+    query = rows.select_rows()
     if start_date:
-        query = query.filter(models.Expense.created_at >= start_date)
+        query = query.where(models.Expense.created_at >= start_date)
     if end_date:
         # Include the whole end_date (up to 23:59:59)
         # Assuming created_at is datetime, comparing with date checks 00:00:00
         # So we add 1 day to end_date and use <
-        next_day = end_date
-        query = query.filter(models.Expense.created_at < datetime(end_date.year, end_date.month, end_date.day) + timedelta(days=1))
+        query = query.where(models.Expense.created_at < datetime(end_date.year, end_date.month, end_date.day) + timedelta(days=1))
     
-    expenses = query.order_by(models.Expense.created_at.desc()).offset(skip).limit(limit).all()
-    return expenses
+    query = query.order_by(models.Expense.created_at.desc()).offset(skip).limit(limit)
+    return FastJSONResponse(rows.fetch(db, query))
+
+@app.get("/expenses/changes", response_model=schemas.ExpenseChanges)
+def read_expense_changes(since: int = 0, limit: int = 1000, db: Session = Depends(database.get_db)):
+    # Delta sync: keep a local copy, then poll with the returned seq
+    return changes.changes_since(db, since, min(limit, 10000))
+
+@app.get("/expenses/search", response_model=List[schemas.Expense], response_class=FastJSONResponse)
+def search_expenses(
+    q: str,
+    skip: int = 0,
+    limit: int = 100,
+    start_date: date = None,
+    end_date: date = None,
+    db: Session = Depends(database.get_db)
+):
+    # Prefix match on store name / description words, best match first
+    end = datetime(end_date.year, end_date.month, end_date.day) + timedelta(days=1) if end_date else None
+    return FastJSONResponse(search.search(db, q, start=start_date, end=end, skip=skip, limit=limit))
 
 @app.get("/expenses/export")
 def export_expenses(
     start_date: date = None, 
     end_date: date = None, 
-    db: Session = Depends(database.get_db)
+    format: str = "csv",
 ):
-    query = db.query(models.Expense)
+    # csv | ndjson | arrow | parquet, all streamed chunk by chunk (see services/export.py)
+    if format not in export.FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown export format. Use one of: {', '.join(export.FORMATS)}")
+    if not export.available(format):
+        raise HTTPException(status_code=501, detail=f"{format} export needs pyarrow installed on the server")
+    query = rows.select_rows()
     if start_date:
-        query = query.filter(models.Expense.created_at >= start_date)
+        query = query.where(models.Expense.created_at >= start_date)
     if end_date:
-         query = query.filter(models.Expense.created_at < datetime(end_date.year, end_date.month, end_date.day) + timedelta(days=1))
-    
-    expenses = query.order_by(models.Expense.created_at.desc()).all()
+         query = query.where(models.Expense.created_at < datetime(end_date.year, end_date.month, end_date.day) + timedelta(days=1))
+    query = query.order_by(models.Expense.created_at.desc())
 
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(['ID', 'Date', 'Amount', 'Category', 'Store', 'Description'])
-    
-    for expense in expenses:
-        writer.writerow([
-            expense.id, 
-            expense.created_at.strftime("%Y-%m-%d"), 
-            expense.amount, 
-            expense.category, 
-            expense.store_name, 
-            expense.description
-        ])
-    
-    output.seek(0)
+    media_type, extension = export.FORMATS[format]
     return StreamingResponse(
-        io.BytesIO(output.getvalue().encode()), 
-        media_type="text/csv", 
-        headers={"Content-Disposition": "attachment; filename=expenses.csv"}
+        export.stream(query, format),
+        media_type=media_type, 
+        headers={"Content-Disposition": f"attachment; filename=expenses.{extension}"}
     )
 
-@app.post("/expenses/import")
-async def import_expenses(file: UploadFile = File(...), db: Session = Depends(database.get_db)):
+@app.post("/expenses/import", status_code=202, response_model=schemas.ImportStatus)
+def import_expenses(file: UploadFile = File(...), date_format: str = None):
     if not file.filename.endswith('.csv'):
         raise HTTPException(status_code=400, detail="Invalid file format. Please upload a CSV file.")
+    # Stored and imported in the background; poll GET /imports/{id} for progress.
+    # The response already has the inferred format (date_format overrides the
+    # guessed one, e.g. %d/%m/%Y for a day-first file that looks month-first)
+    try:
+        job = imports.start(file.file, file.filename, date_format=date_format)
+    except csv_format.FormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return job.status()
 
-    content = await file.read()
-    decoded_content = content.decode('utf-8').splitlines()
-    reader = csv.reader(decoded_content)
-    
-    # Optional: Skip header if present. 
-    # Heuristic: Check if first row contains "Amount" or "Date"
-    header = next(reader, None)
-    if header:
-        header_lower = [h.lower().strip() for h in header]
-        if "amount" not in header_lower and "date" not in header_lower:
-            # Maybe not a header, reset? simple csv import usually assumes header or specific order.
-            # Let's assume standard format: Date, Amount, Category, Store, Description
-            # Or standard export format: ID, Date, Amount, Category, Store, Description
-            pass
-        
-    imported_count = 0
-    errors = []
-    
-    for row in reader:
-        try:
-            # Expected minimal: Date, Amount
-            # Let's try to map by index for simplicity if no header mapping logic
-            # Assuming Export Format: ID, Date, Amount, Category, Store, Description (6 cols)
-            # OR Simple Format: Date, Amount, Category, Store, Description (5 cols)
-            
-            if len(row) < 2:
-                continue
-                
-            # parsers
-            date_str = row[0] if len(row) < 6 else row[1] # If ID is first
-            amount_str = row[1] if len(row) < 6 else row[2]
-            category_str = row[2] if len(row) >= 3 and len(row) < 6 else (row[3] if len(row) >= 4 else "Uncategorized")
-            store_str = row[3] if len(row) >= 4 and len(row) < 6 else (row[4] if len(row) >= 5 else "")
-            desc_str = row[4] if len(row) >= 5 and len(row) < 6 else (row[5] if len(row) >= 6 else "")
-            
-            # naive safe date parsing
-            # try YYYY-MM-DD then MM/DD/YYYY
-            expense_date = datetime.now()
-            for fmt in ("%Y-%m-%d", "%m/%d/%Y", "%d-%m-%Y"):
-                try:
-                    expense_date = datetime.strptime(date_str, fmt)
-                    break
-                except ValueError:
-                    pass
-            
-            amount = float(amount_str.replace('$', '').replace(',', ''))
-            
-            # Normalize category
-            category = category_str.strip() or "Uncategorized"
-            
-            # Check if category exists, if not create it? 
-            # For now, just string.
-            
-            new_expense = models.Expense(
-                amount=amount,
-                category=category,
-                store_name=store_str.strip(),
-                description=desc_str.strip(),
-                created_at=expense_date
-            )
-            db.add(new_expense)
-            imported_count += 1
-            
-        except Exception as e:
-            errors.append(f"Row error: {e}")
-            continue
-
-    db.commit()
-    return {"message": f"Successfully imported {imported_count} expenses", "errors": errors}
+@app.get("/imports/{job_id}", response_model=schemas.ImportStatus)
+def read_import(job_id: str):
+    job = imports.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job.status()
 
 @app.post("/upload-receipt/")
-async def upload_receipt(file: UploadFile = File(...)):
+async def upload_receipt(file: UploadFile = File(...), db: Session = Depends(database.get_db)):
     temp_file = f"temp_{file.filename}"
     with open(temp_file, "wb") as buffer:
         shutil.copyfileobj(file.file, buffer)
@@ -185,11 +204,24 @@ async def upload_receipt(file: UploadFile = File(...)):
         with open(temp_file, "rb") as f:
             image_bytes = f.read()
         
-        ocr_result = ocr.process_receipt(image_bytes)
+        metrics.OCR_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        result = "error"
+        try:
+            ocr = await run_in_threadpool(load_ocr)
+            ocr_result = await run_in_threadpool(ocr.process_receipt, image_bytes)
+            result = "ok" if ocr_result["amount"] > 0 else "no_amount"
+        finally:
+            metrics.OCR_IN_FLIGHT.dec()
+            metrics.OCR_LATENCY.observe(time.perf_counter() - started, result)
     finally:
         if os.path.exists(temp_file):
             os.remove(temp_file)
 
+    # Suggested category from past expenses at this store (or with these words)
+    hint = {"category": ocr_result["category"], "store_name": ocr_result["store_name"], "description": ocr_result["text"]}
+    if await run_in_threadpool(suggestions.fill, db, [hint]):
+        ocr_result["category"] = hint["category"]
     return ocr_result
 
 @app.post("/budget/", response_model=schemas.Budget)
@@ -205,6 +237,7 @@ def create_or_update_budget(budget: schemas.BudgetCreate, db: Session = Depends(
     
     db.commit()
     db.refresh(db_budget)
+    events.publish("budget.updated", budget={"limit_amount": db_budget.limit_amount, "period": db_budget.period})
     return db_budget
 
 @app.get("/budget/", response_model=schemas.Budget)
@@ -236,40 +269,121 @@ def create_category(category: schemas.CategoryCreate, db: Session = Depends(data
     db.add(db_category)
     db.commit()
     db.refresh(db_category)
+    events.publish("categories.created", category={"id": db_category.id, "name": db_category.name, "color": db_category.color})
     return db_category
 
 
 app.include_router(chat.router, prefix="/api", tags=["chat"])
+app.include_router(analytics.router, prefix="/analytics", tags=["analytics"])
+
+@app.websocket("/ws")
+async def dashboard_updates(websocket: WebSocket):
+    # Live change events for open dashboards (see services/hub.py)
+    await hub.serve(websocket)
+
+@app.get("/metrics", include_in_schema=False)
+def read_metrics():
+    # Prometheus text exposition format
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.put("/categories/{category_id}", response_model=schemas.Category)
+def update_category(category_id: int, category: schemas.CategoryCreate, db: Session = Depends(database.get_db)):
+    db_category = db.query(models.Category).filter(models.Category.id == category_id).first()
+    if not db_category:
+        raise HTTPException(status_code=404, detail="Category not found")
+    clash = db.query(models.Category).filter(
+        models.Category.name == category.name, models.Category.id != category_id
+    ).first()
+    if clash:
+        raise HTTPException(status_code=400, detail="A category with that name already exists")
+
+    # Expenses reference the id, so a rename is one row no matter how many use it
+    old_name = db_category.name
+    db_category.name = category.name
+    db_category.color = category.color
+    db.commit()
+    db.refresh(db_category)
+    events.publish(
+        "categories.updated",
+        category={"id": db_category.id, "name": db_category.name, "color": db_category.color}, old_name=old_name,
+    )
+    return db_category
 
 @app.delete("/categories/{category_id}")
 def delete_category(category_id: int, db: Session = Depends(database.get_db)):
     db_category = db.query(models.Category).filter(models.Category.id == category_id).first()
     if not db_category:
         raise HTTPException(status_code=404, detail="Category not found")
+    # Its expenses become Uncategorized (one indexed UPDATE)
+    db.query(models.Expense).filter(models.Expense.category_id == category_id).update(
+        {models.Expense.category_id: None}, synchronize_session=False
+    )
     db.delete(db_category)
     db.commit()
+    events.publish("categories.deleted", category_id=category_id)
     return {"ok": True}
 
 # --- Expense Edit/Delete Endpoints ---
 
-@app.delete("/expenses/")
-def delete_all_expenses(db: Session = Depends(database.get_db)):
-    # Delete all rows in expenses table
+# Bulk variants: one set-based statement and one commit for many expenses.
+# Declared before /expenses/{expense_id} so "bulk" isn't taken for an id.
+
+@app.post("/expenses/bulk", response_model=List[schemas.Expense])
+def create_expenses_bulk(payload: schemas.ExpenseBulkCreate, db: Session = Depends(database.get_db)):
+    rows = bulk.create(db, payload.expenses)
+    db.commit()
+    events.publish("expenses.created", rows=rows)
+    return rows
+
+@app.patch("/expenses/bulk", response_model=schemas.BulkResult)
+def update_expenses_bulk(payload: schemas.ExpenseBulkUpdate, db: Session = Depends(database.get_db)):
     try:
-        num_deleted = db.query(models.Expense).delete()
-        db.commit()
-        return {"message": f"Deleted {num_deleted} expenses"}
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Failed to delete expenses: {str(e)}")
+        before, after = bulk.update_matching(db, payload, payload.set)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    db.commit()
+    if before:
+        events.publish("expenses.updated", before=before, after=after)
+    return {"count": len(after)}
+
+@app.delete("/expenses/bulk", response_model=schemas.BulkResult)
+def delete_expenses_bulk(payload: schemas.ExpenseBulkDelete, db: Session = Depends(database.get_db)):
+    try:
+        rows = bulk.delete_matching(db, payload)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    db.commit()
+    if rows:
+        events.publish("expenses.deleted", rows=rows)
+    return {"count": len(rows)}
+
+@app.delete("/expenses/", status_code=202, response_model=schemas.PurgeStatus)
+def delete_all_expenses(start_date: date = None, end_date: date = None, vacuum: bool = False):
+    # Deletes everything (or a date range) in small batches in the background,
+    # so other writes keep going; poll GET /expenses/purge/{id} for progress
+    criteria = schemas.ExpenseFilter(start_date=start_date, end_date=end_date) if start_date or end_date else None
+    try:
+        job = purge.start(criteria, vacuum=vacuum)
+    except purge.PurgeRunning as e:
+        raise HTTPException(status_code=409, detail=f"{e}; poll /expenses/purge/{e.job.id}")
+    return job.status()
+
+@app.get("/expenses/purge/{job_id}", response_model=schemas.PurgeStatus)
+def read_purge(job_id: str):
+    job = purge.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Purge job not found")
+    return job.status()
 
 @app.delete("/expenses/{expense_id}")
 def delete_expense(expense_id: int, db: Session = Depends(database.get_db)):
     db_expense = db.query(models.Expense).filter(models.Expense.id == expense_id).first()
     if not db_expense:
         raise HTTPException(status_code=404, detail="Expense not found")
+    row = events.as_row(db_expense)
     db.delete(db_expense)
     db.commit()
+    events.publish("expenses.deleted", rows=[row])
     return {"ok": True}
 
 @app.put("/expenses/{expense_id}", response_model=schemas.Expense)
@@ -277,10 +391,12 @@ def update_expense(expense_id: int, expense: schemas.ExpenseCreate, db: Session
     db_expense = db.query(models.Expense).filter(models.Expense.id == expense_id).first()
     if not db_expense:
         raise HTTPException(status_code=404, detail="Expense not found")
+    before = events.as_row(db_expense)
     
-    for key, value in expense.dict().items():
+    for key, value in categories.expense_values(db, expense.dict()).items():
         setattr(db_expense, key, value)
     
     db.commit()
     db.refresh(db_expense)
+    events.publish("expenses.updated", before=[before], after=[events.as_row(db_expense)])
     return db_expense
@@ -0,0 +1,293 @@
+import threading
+import time
+from bisect import bisect_left
+from . import database
+
+# Latency buckets in seconds, size buckets in bytes
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class _Sharded:
+    """
+    Base for metrics that are written on the hot path. Every thread gets its
+    own shard, so writes never take a lock; the lock is only taken the first
+    time a thread writes and when /metrics merges the shards.
+    """
+
+    def __init__(self, name: str, help_text: str, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = {}
+            self._local.shard = shard
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def _snapshot(self):
+        with self._lock:
+            return [dict(shard) for shard in self._shards]
+
+
+class Counter(_Sharded):
+    def inc(self, *labels, amount: float = 1):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def collect(self):
+        merged = {}
+        for shard in self._snapshot():
+            for labels, value in shard.items():
+                merged[labels] = merged.get(labels, 0) + value
+        return merged
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self.collect().items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+
+class Histogram(_Sharded):
+    def __init__(self, name: str, help_text: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels):
+        shard = self._shard()
+        series = shard.get(labels)
+        if series is None:
+            # [count per bucket..., +Inf count, sum]
+            series = shard[labels] = [0] * (len(self.buckets) + 2)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def collect(self):
+        merged = {}
+        for shard in self._snapshot():
+            for labels, series in shard.items():
+                total = merged.setdefault(labels, [0] * len(series))
+                for i, value in enumerate(list(series)):
+                    total[i] += value
+        return merged
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self.collect().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series[:-1]):
+                cumulative += count
+                le = bound if bound == "+Inf" else _number(bound)
+                lines.append(
+                    f"{self.name}_bucket{_labels(self.labelnames + ('le',), labels + (le,))} {cumulative}"
+                )
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """
+    A value that goes up and down. Gauges are written rarely compared to
+    histograms, so a plain lock is fine here. Pass `callback` to read the
+    value from somewhere else (pool sizes, cache entries) at scrape time;
+    with `labelnames` the callback returns a {label tuple: value} dict.
+    """
+
+    def __init__(self, name: str, help_text: str, callback=None, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.callback = callback
+        self.labelnames = tuple(labelnames)
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1):
+        with self._lock:
+            self._value -= amount
+
+    def set(self, value: float):
+        self._value = value
+
+    def value(self):
+        if self.callback:
+            try:
+                return self.callback()
+            except Exception as e:
+                print(f"Gauge {self.name} callback failed: {e}")
+                return {} if self.labelnames else 0
+        return self._value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        if not self.labelnames:
+            lines.append(f"{self.name} {_number(self.value())}")
+            return lines
+        for labels, value in sorted(self.value().items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+
+def _number(value) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _labels(names, values) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+# --- Registry ---
+
+_registry = []
+
+
+def register(metric):
+    _registry.append(metric)
+    return metric
+
+
+def gauge(name: str, help_text: str, callback=None, labelnames=()) -> Gauge:
+    """
+    Registers a gauge; services use this to expose pool and cache sizes.
+    """
+    return register(Gauge(name, help_text, callback, labelnames))
+
+
+def render() -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+REQUESTS = register(Counter(
+    "http_requests_total", "HTTP requests by route and status.", ("method", "route", "status")
+))
+LATENCY = register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency.", ("method", "route")
+))
+RESPONSE_SIZE = register(Histogram(
+    "http_response_size_bytes", "HTTP response body size.", ("method", "route"), buckets=SIZE_BUCKETS
+))
+IN_FLIGHT = gauge("http_requests_in_flight", "HTTP requests currently being served.")
+
+DB_QUERIES = register(Histogram(
+    "db_queries_per_request", "SQL statements issued per HTTP request.", ("method", "route"),
+    buckets=(1, 2, 3, 5, 10, 20, 50, 100),
+))
+DB_TIME = register(Histogram(
+    "db_time_per_request_seconds", "Time spent in SQL per HTTP request.", ("method", "route")
+))
+
+OCR_IN_FLIGHT = gauge("ocr_jobs_in_flight", "Receipt OCR jobs currently running.")
+OCR_LATENCY = register(Histogram(
+    "ocr_job_duration_seconds", "Receipt OCR processing time.", ("result",)
+))
+
+
+def _route_label(scope) -> str:
+    # Use the route template (/expenses/{expense_id}) so label cardinality stays bounded
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    Plain ASGI middleware recording latency, size, status and in-flight
+    counts for every HTTP request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        response = {"status": 500, "size": 0}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                response["size"] += len(message.get("body", b""))
+            await send(message)
+
+        IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            IN_FLIGHT.dec()
+            method = scope["method"]
+            route = _route_label(scope)
+            LATENCY.observe(time.perf_counter() - start, method, route)
+            RESPONSE_SIZE.observe(response["size"], method, route)
+            REQUESTS.inc(method, route, str(response["status"]))
+
+
+class QueryProfilerMiddleware:
+    """
+    Attributes SQL query count and time to each request, reports them in a
+    Server-Timing header and records them per route. With SQL_QUERY_BUDGET
+    set (test mode), an `X-Query-Budget` request header overrides the budget.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        budget = database.QUERY_BUDGET
+        if budget:
+            for name, value in scope.get("headers", []):
+                if name == b"x-query-budget":
+                    budget = int(value)
+
+        start = time.perf_counter()
+        stats = database.begin_query_stats(budget)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                total_ms = (time.perf_counter() - start) * 1000
+                timing = (
+                    f'db;dur={stats.duration * 1000:.2f};desc="{stats.count} queries", '
+                    f"app;dur={total_ms:.2f}"
+                )
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"server-timing", timing.encode())
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            database.end_query_stats(stats)
+            method = scope["method"]
+            route = _route_label(scope)
+            DB_QUERIES.observe(stats.count, method, route)
+            DB_TIME.observe(stats.duration, method, route)
@@ -0,0 +1,182 @@
+"""
+Schema changes that create_all() can't make on an existing database.
+Each step is idempotent and runs at startup (writer / single process only).
+"""
+import uuid
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+CHANGE_LOG_TRIGGERS = {
+    "expenses_log_insert": """
+        CREATE TRIGGER expenses_log_insert AFTER INSERT ON expenses BEGIN
+            DELETE FROM expense_changes WHERE expense_id = new.id;
+            INSERT INTO expense_changes (expense_id, deleted) VALUES (new.id, 0);
+        END
+    """,
+    "expenses_log_update": """
+        CREATE TRIGGER expenses_log_update AFTER UPDATE ON expenses BEGIN
+            DELETE FROM expense_changes WHERE expense_id = new.id;
+            INSERT INTO expense_changes (expense_id, deleted) VALUES (new.id, 0);
+        END
+    """,
+    "expenses_log_delete": """
+        CREATE TRIGGER expenses_log_delete AFTER DELETE ON expenses BEGIN
+            DELETE FROM expense_changes WHERE expense_id = old.id;
+            INSERT INTO expense_changes (expense_id, deleted) VALUES (old.id, 1);
+        END
+    """,
+}
+
+# External-content FTS5 index: the text lives in expenses, the index only
+# holds tokens. Updates that don't touch store_name/description skip it.
+SEARCH_TABLE = """
+    CREATE VIRTUAL TABLE expenses_fts USING fts5(
+        store_name, description, content='expenses', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+"""
+SEARCH_TRIGGERS = {
+    "expenses_fts_insert": """
+        CREATE TRIGGER expenses_fts_insert AFTER INSERT ON expenses BEGIN
+            INSERT INTO expenses_fts (rowid, store_name, description) VALUES (new.id, new.store_name, new.description);
+        END
+    """,
+    "expenses_fts_update": """
+        CREATE TRIGGER expenses_fts_update AFTER UPDATE OF store_name, description ON expenses BEGIN
+            INSERT INTO expenses_fts (expenses_fts, rowid, store_name, description)
+                VALUES ('delete', old.id, old.store_name, old.description);
+            INSERT INTO expenses_fts (rowid, store_name, description) VALUES (new.id, new.store_name, new.description);
+        END
+    """,
+    "expenses_fts_delete": """
+        CREATE TRIGGER expenses_fts_delete AFTER DELETE ON expenses BEGIN
+            INSERT INTO expenses_fts (expenses_fts, rowid, store_name, description)
+                VALUES ('delete', old.id, old.store_name, old.description);
+        END
+    """,
+}
+
+
+def _columns(conn, table: str) -> set:
+    return {row[1] for row in conn.execute(text(f"PRAGMA table_info({table})"))}
+
+
+def normalize_categories(conn):
+    """
+    expenses.category (free text) -> expenses.category_id (FK to categories).
+    Unknown names become categories; blank/"Uncategorized" become NULL.
+    """
+    columns = _columns(conn, "expenses")
+    if "category" not in columns:
+        return
+    if "category_id" not in columns:
+        conn.execute(text("ALTER TABLE expenses ADD COLUMN category_id INTEGER REFERENCES categories (id)"))
+
+    # One category per case-insensitive name that isn't one already
+    conn.execute(text("""
+        INSERT INTO categories (name, color)
+        SELECT min(trim(category)), 'blue' FROM expenses
+        WHERE trim(coalesce(category, '')) NOT IN ('', 'Uncategorized')
+          AND lower(trim(category)) NOT IN (SELECT lower(name) FROM categories)
+        GROUP BY lower(trim(category))
+    """))
+    conn.execute(text("""
+        UPDATE expenses SET category_id = (
+            SELECT id FROM categories WHERE lower(categories.name) = lower(trim(expenses.category))
+        )
+        WHERE trim(coalesce(category, '')) NOT IN ('', 'Uncategorized')
+    """))
+    conn.execute(text("DROP INDEX IF EXISTS ix_expenses_category"))
+    conn.execute(text("ALTER TABLE expenses DROP COLUMN category"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_expenses_category_id ON expenses (category_id)"))
+    print("Migration: expenses.category moved to expenses.category_id")
+
+
+def _triggers(conn) -> set:
+    return {row[0] for row in conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'trigger'"))}
+
+
+def add_change_log(conn):
+    """
+    Triggers stamp every insert/update/delete on expenses into
+    expense_changes. Rows that existed before the log get one entry each.
+    """
+    existing = _triggers(conn)
+    if all(name in existing for name in CHANGE_LOG_TRIGGERS):
+        return
+    for name, ddl in CHANGE_LOG_TRIGGERS.items():
+        if name not in existing:
+            conn.execute(text(ddl))
+    conn.execute(text(
+        "INSERT INTO expense_changes (expense_id, deleted) "
+        "SELECT id, 0 FROM expenses WHERE id NOT IN (SELECT expense_id FROM expense_changes "
+        "WHERE expense_id IS NOT NULL) ORDER BY id"
+    ))
+    print("Migration: expense change log enabled")
+
+
+def add_search_index(conn):
+    """
+    FTS5 index over store_name and description, kept in sync by triggers.
+    Skipped (search falls back to LIKE) when SQLite was built without FTS5.
+    """
+    existing = _triggers(conn)
+    tables = {row[0] for row in conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'table'"))}
+    if "expenses_fts" in tables and all(name in existing for name in SEARCH_TRIGGERS):
+        return
+    if "expenses_fts" not in tables:
+        try:
+            conn.execute(text(SEARCH_TABLE))
+        except OperationalError as e:
+            print(f"Migration: expense search index unavailable ({e})")
+            return
+    for name, ddl in SEARCH_TRIGGERS.items():
+        if name not in existing:
+            conn.execute(text(ddl))
+    conn.execute(text("INSERT INTO expenses_fts (expenses_fts) VALUES ('rebuild')"))
+    print("Migration: expense search index built")
+
+
+def add_import_fingerprints(conn):
+    """
+    expenses.fingerprint with a unique index. Existing rows are
+    fingerprinted once, so re-importing a file imported before this step
+    doesn't duplicate it.
+    """
+    from .services import imports
+
+    if "fingerprint" in _columns(conn, "expenses"):
+        return
+    conn.execute(text("ALTER TABLE expenses ADD COLUMN fingerprint VARCHAR"))
+    seen = {}
+    values = []
+    for row in conn.execute(text("SELECT id, created_at, amount, store_name, description FROM expenses ORDER BY id")):
+        key = imports.row_key(str(row.created_at)[:10], row.amount, row.store_name, row.description)
+        values.append({"id": row.id, "fingerprint": imports.fingerprint(key, seen)})
+    if values:
+        conn.execute(text("UPDATE expenses SET fingerprint = :fingerprint WHERE id = :id"), values)
+    conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ix_expenses_fingerprint ON expenses (fingerprint)"))
+    print(f"Migration: import fingerprints added ({len(values)} rows)")
+
+
+def add_database_token(conn):
+    """
+    Gives the database its random token (models.DatabaseToken), once.
+    """
+    if conn.execute(text("SELECT count(*) FROM database_token")).scalar():
+        return
+    conn.execute(text("INSERT INTO database_token (token) VALUES (:token)"), {"token": uuid.uuid4().hex})
+    print("Migration: database token written")
+
+
+STEPS = [normalize_categories, add_change_log, add_search_index, add_import_fingerprints, add_database_token]
+
+
+def run(engine):
+    # Triggers are SQLite syntax; other databases manage their schema elsewhere
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as conn:
+        for step in STEPS:
+            step(conn)
@@ -1,16 +1,37 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, select
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
 
+UNCATEGORIZED = "Uncategorized"
+
 class Expense(Base):
     __tablename__ = "expenses"
 
     id = Column(Integer, primary_key=True, index=True)
     amount = Column(Float, nullable=False)
-    category = Column(String, index=True, default="Uncategorized")
+    # NULL means "Uncategorized"; names live only in the categories table
+    category_id = Column(Integer, ForeignKey("categories.id"), index=True, nullable=True)
     description = Column(String, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     store_name = Column(String, nullable=True)
+    # Set on imported rows (see services/imports.py) so re-imports skip them
+    fingerprint = Column(String, unique=True, index=True, nullable=True)
+
+    category_ref = relationship("Category", lazy="joined")
+
+    @hybrid_property
+    def category(self):
+        return self.category_ref.name if self.category_ref else UNCATEGORIZED
+
+    @category.expression
+    def category(cls):
+        # Correlated lookup; fine for filters, but group by category_id in hot paths
+        return func.coalesce(
+            select(Category.name).where(Category.id == cls.category_id).correlate(cls).scalar_subquery(),
+            UNCATEGORIZED,
+        )
 
 class Budget(Base):
     __tablename__ = "budgets"
@@ -25,3 +46,24 @@ class Category(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, unique=True, index=True)
     color = Column(String, default="blue") # tailored for frontend badges
+
+class ExpenseChange(Base):
+    # One row per expense holding its latest change (filled by triggers, see
+    # migrations.py). seq only ever grows; a row with no expense_id marks
+    # "everything before this was deleted".
+    __tablename__ = "expense_changes"
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    seq = Column(Integer, primary_key=True)
+    expense_id = Column(Integer, unique=True, nullable=True)
+    deleted = Column(Boolean, default=False, nullable=False)
+    changed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class DatabaseToken(Base):
+    # One random token, written when the database is first migrated (see
+    # migrations.py). Caches kept outside the database file (the analytics
+    # snapshot) check it, so a replaced or re-created file isn't mistaken
+    # for the one they were built from.
+    __tablename__ = "database_token"
+
+    token = Column(String, primary_key=True)
@@ -0,0 +1,14 @@
+import orjson
+from fastapi.responses import Response
+
+
+class FastJSONResponse(Response):
+    """
+    Serializes with orjson (datetimes as ISO 8601, like FastAPI's encoder).
+    Return it directly from an endpoint to skip response_model validation;
+    only do that for content already shaped like the model (services/rows.py).
+    """
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content)
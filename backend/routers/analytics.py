@@ -0,0 +1,56 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from datetime import date, datetime, timedelta
+from ..database import get_db
+
+router = APIRouter()
+
+def load_analytics():
+    # NumPy is only needed here, so keep it off the startup import path
+    from ..services import analytics
+    return analytics
+
+@router.get("/trends")
+def read_trends(
+    start_date: date = None,
+    end_date: date = None,
+    category: str = None,
+    db: Session = Depends(get_db)
+):
+    # Defaults to the last 90 days
+    end_date = end_date or date.today()
+    start_date = start_date or end_date - timedelta(days=89)
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must be before end_date")
+    return load_analytics().spending_trends(db, start_date, end_date, category)
+
+def load_anomalies():
+    from ..services import anomalies
+    return anomalies
+
+@router.get("/anomalies")
+def read_anomalies(
+    start_date: date = None,
+    end_date: date = None,
+    threshold: float = 3.5,
+    limit: int = 50,
+    db: Session = Depends(get_db)
+):
+    # Defaults to the current month
+    today = date.today()
+    start_date = start_date or today.replace(day=1)
+    end_date = end_date or today
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must be before end_date")
+
+    start = datetime(start_date.year, start_date.month, start_date.day)
+    end = datetime(end_date.year, end_date.month, end_date.day) + timedelta(days=1)
+    return load_anomalies().find_anomalies(db, start, end, threshold, limit)
+
+def load_recurring():
+    from ..services import recurring
+    return recurring
+
+@router.get("/recurring")
+def read_recurring(db: Session = Depends(get_db)):
+    return load_recurring().find_recurring(db)
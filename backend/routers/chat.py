@@ -1,8 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import iterate_in_threadpool
 from sqlalchemy.orm import Session
-from ..database import get_db
+from ..database import get_db, SessionLocal
 from ..services.ai_analyst import AIAnalyst
+from ..services.llm import get_llm
 from pydantic import BaseModel
+import json
 
 router = APIRouter()
 
@@ -13,12 +17,49 @@ class ChatResponse(BaseModel):
     response: str
 
 @router.post("/chat", response_model=ChatResponse)
-def chat_with_analyst(request: ChatRequest, db: Session = Depends(get_db)):
+def chat_with_analyst(request: ChatRequest, db: Session = Depends(get_db), llm=Depends(get_llm)):
     try:
-        analyst = AIAnalyst(db)
+        analyst = AIAnalyst(db, llm=llm)
         response_text = analyst.analyze(request.message)
         return ChatResponse(response=response_text)
     except Exception as e:
         print(f"AI Analyst Info: {str(e)}") # Keep internal log
         # Return the error to the user for debugging purposes during dev
         return ChatResponse(response=f"I encountered an error: {str(e)}")
+
+# --- Streaming (Server-Sent Events) ---
+
+def _sse_event(data: dict, event: str = None) -> str:
+    payload = f"data: {json.dumps(data)}\n\n"
+    return f"event: {event}\n{payload}" if event else payload
+
+async def _chat_events(message: str, llm):
+    # The session lives as long as the stream, not the request handler.
+    # Each blocking step (DB query, LLM chunk) runs in the threadpool only
+    # while it is being computed; waiting on the client stays on the event loop.
+    db = SessionLocal()
+    try:
+        analyst = AIAnalyst(db, llm=llm)
+        async for fragment in iterate_in_threadpool(analyst.analyze_stream(message)):
+            yield _sse_event({"delta": fragment})
+        yield _sse_event({}, event="done")
+    except Exception as e:
+        print(f"AI Analyst Info: {str(e)}")
+        yield _sse_event({"error": f"I encountered an error: {str(e)}"}, event="error")
+    finally:
+        db.close()
+
+def _sse_response(message: str, llm) -> StreamingResponse:
+    return StreamingResponse(
+        _chat_events(message, llm),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/chat/stream")
+async def stream_chat_get(message: str, llm=Depends(get_llm)):
+    return _sse_response(message, llm)
+
+@router.post("/chat/stream")
+async def stream_chat_post(request: ChatRequest, llm=Depends(get_llm)):
+    return _sse_response(request.message, llm)
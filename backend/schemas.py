@@ -1,6 +1,6 @@
 from pydantic import BaseModel
-from typing import Optional, List
-from datetime import datetime
+from typing import Optional, List, Dict
+from datetime import datetime, date
 
 class ExpenseBase(BaseModel):
     amount: float
@@ -18,6 +18,81 @@ class Expense(ExpenseBase):
     class Config:
         from_attributes = True
 
+class ExpenseChanges(BaseModel):
+    seq: int  # pass back as ?since= on the next sync
+    reset: bool  # all expenses were deleted since `since`: drop the local copy first
+    changed: List[Expense]
+    deleted: List[int]
+    has_more: bool
+
+class ExpenseBulkCreate(BaseModel):
+    expenses: List[ExpenseCreate]
+
+class ExpenseFilter(BaseModel):
+    # Criteria are ANDed; at least one is required
+    ids: Optional[List[int]] = None
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None  # inclusive
+    store: Optional[str] = None  # word-prefix match, like /expenses/search
+    category: Optional[str] = None
+
+class ExpensePatch(BaseModel):
+    amount: Optional[float] = None
+    category: Optional[str] = None
+    description: Optional[str] = None
+    store_name: Optional[str] = None
+
+class ExpenseBulkUpdate(ExpenseFilter):
+    set: ExpensePatch
+
+class ExpenseBulkDelete(ExpenseFilter):
+    pass
+
+class BulkResult(BaseModel):
+    count: int
+
+class PurgeStatus(BaseModel):
+    id: str
+    state: str  # pending, deleting, vacuuming, done, failed
+    total: int
+    deleted: int
+    progress: float  # 0..1
+    vacuum: bool
+    freed_pages: int
+    error: Optional[str] = None
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+
+class ImportFormat(BaseModel):
+    encoding: str
+    delimiter: str
+    has_header: bool
+    header: List[str]
+    columns: Dict[str, int]  # field (date, amount, category, store, description, id) -> column
+    date_format: str  # strptime format
+    date_ambiguous: bool  # another format fits the sampled dates too (e.g. day/month)
+    decimal: str
+    thousands: str
+    currency: Optional[str] = None
+    sampled_rows: int
+
+class ImportStatus(BaseModel):
+    id: str
+    filename: str
+    state: str  # queued, importing, done, failed
+    total: int
+    processed: int
+    imported: int
+    skipped: int  # already imported (same fingerprint)
+    categorized: int  # had no category, got the suggested one
+    failed: int
+    progress: float  # 0..1
+    errors: List[str]  # first few row errors
+    format: Optional[ImportFormat] = None  # as inferred from the first rows
+    error: Optional[str] = None
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+
 class BudgetBase(BaseModel):
     limit_amount: float
     period: str
@@ -0,0 +1,92 @@
+"""
+Starts the API, optionally in multi-worker mode.
+
+    python -m backend.serve --host 0.0.0.0 --port 8000 --workers 4
+
+With one worker this is plain `uvicorn backend.main:app`. With more, it
+starts a single writer process on WRITER_ADDRESS first, then N reader
+workers that serve reads and OCR and forward every write to the writer.
+WEB_CONCURRENCY sets the default worker count.
+"""
+import os
+import sys
+import time
+import signal
+import argparse
+import subprocess
+
+from . import workers
+
+
+def start_writer(address: str) -> subprocess.Popen:
+    if not workers.is_tcp_address(address) and os.path.exists(address):
+        os.remove(address)
+
+    command = [sys.executable, "-m", "uvicorn", "backend.main:app", "--workers", "1"]
+    if workers.is_tcp_address(address):
+        host, port = address.rsplit(":", 1)
+        command += ["--host", host, "--port", port]
+    else:
+        command += ["--uds", address]
+
+    env = dict(os.environ, FINTRACK_ROLE="writer", WRITER_ADDRESS=address)
+    # Inserts from all workers meet in the writer, so group-commit them by default
+    env.setdefault("EXPENSE_WRITE_MODE", "batch")
+    return subprocess.Popen(command, env=env)
+
+
+def wait_for_writer(address: str, process: subprocess.Popen, timeout: float = 30):
+    import httpx
+
+    if workers.is_tcp_address(address):
+        client = httpx.Client(base_url=f"http://{address}")
+    else:
+        client = httpx.Client(transport=httpx.HTTPTransport(uds=address), base_url="http://writer")
+
+    deadline = time.monotonic() + timeout
+    with client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError("Writer process exited during startup")
+            try:
+                client.get("/budget/")
+                return
+            except httpx.TransportError:
+                time.sleep(0.1)
+    raise RuntimeError(f"Writer did not come up on {address}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "1")))
+    parser.add_argument("--writer-address", default=workers.WRITER_ADDRESS)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    if args.workers <= 1:
+        uvicorn.run("backend.main:app", host=args.host, port=args.port)
+        return
+
+    writer = start_writer(args.writer_address)
+    try:
+        wait_for_writer(args.writer_address, writer)
+        # Reader workers inherit these through the environment
+        os.environ["FINTRACK_ROLE"] = "reader"
+        os.environ["WRITER_ADDRESS"] = args.writer_address
+        uvicorn.run("backend.main:app", host=args.host, port=args.port, workers=args.workers)
+    finally:
+        if os.name == "nt":
+            writer.terminate()
+        else:
+            writer.send_signal(signal.SIGINT)
+        try:
+            writer.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            writer.kill()
+
+
+if __name__ == "__main__":
+    main()
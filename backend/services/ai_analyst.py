@@ -1,22 +1,146 @@
 import re
 import os
+from collections import namedtuple
+from itertools import product
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, case, and_, or_
 from ..models import Expense, Category, Budget
-from datetime import datetime
+from . import categories as category_names, search
+from datetime import datetime, timedelta
 import calendar
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# --- Query Planner ---
+# Compound questions ("food and transport at walmart this month vs last month")
+# are broken into (category, store, period) aggregates and answered with a
+# single conditional-aggregation statement instead of one SUM per part.
+
+Aggregate = namedtuple("Aggregate", ["category", "store", "period"])
+
+PERIOD_PATTERN = re.compile(
+    r"\b(today|yesterday|this week|last week|this month|last month|this year|last year)\b"
+)
+# "vs" / "compared to" don't end a phrase: PHRASE_SPLIT splits on them
+STORE_PATTERN = re.compile(
+    r"\bat\s+(?:the\s+)?(.+?)(?=\s+(?:on|for|this|last|today|yesterday)\b|[?!]|(?<!\bvs)\.|$)"
+)
+CATEGORY_PATTERN = re.compile(
+    r"\b(?:on|for)\s+(.+?)(?=\s+(?:at|this|last|today|yesterday)\b|[?!]|(?<!\bvs)\.|$)"
+)
+PHRASE_SPLIT = re.compile(r"\s*(?:,|\band\b|&|\bor\b|\bvs\b\.?|\bversus\b|\bcompared (?:to|with)\b)\s*")
+IGNORED_WORDS = {"total", "budget", "this", "recent", "last", "the", "my", "me", "it", "average"}
+
+
+def period_range(period: str, now: datetime = None):
+    """
+    Returns the [start, end) datetime range covered by a period phrase.
+    """
+    now = now or datetime.now()
+    today = datetime(now.year, now.month, now.day)
+
+    if period == "today":
+        return today, today + timedelta(days=1)
+    if period == "yesterday":
+        return today - timedelta(days=1), today
+    if period in ("this week", "last week"):
+        start = today - timedelta(days=today.weekday())
+        if period == "last week":
+            start -= timedelta(days=7)
+        return start, start + timedelta(days=7)
+    if period in ("this month", "last month"):
+        year, month = now.year, now.month
+        if period == "last month":
+            year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+        days = calendar.monthrange(year, month)[1]
+        start = datetime(year, month, 1)
+        return start, start + timedelta(days=days)
+    if period in ("this year", "last year"):
+        year = now.year if period == "this year" else now.year - 1
+        return datetime(year, 1, 1), datetime(year + 1, 1, 1)
+    raise ValueError(f"Unknown period '{period}'")
+
+
+class QueryPlanner:
+    """
+    Parses spending questions that mention several categories, stores or
+    periods into a list of Aggregates. Simple questions return None so the
+    regular intent branches keep handling them.
+    """
+
+    def plan(self, query: str):
+        if "budget" in query:
+            return None
+
+        periods = self._unique(PERIOD_PATTERN.findall(query))
+        stores = self._split_phrases(STORE_PATTERN.findall(query))
+        categories = self._split_phrases(CATEGORY_PATTERN.findall(query))
+
+        filters = len(categories) + len(stores)
+        is_compound = len(categories) > 1 or len(stores) > 1 or (categories and stores) or periods
+        if not is_compound:
+            return None
+        # A bare period ("this month vs last month") still needs a spending verb
+        if filters == 0 and not re.search(r"spen[dt]|total|cost|paid", query):
+            return None
+
+        return [
+            Aggregate(category, store, period)
+            for (category, store), period in product(
+                product(categories or [None], stores or [None]), periods or [None]
+            )
+        ]
+
+    def _split_phrases(self, phrases):
+        # "food, transport and rent" -> ["food", "transport", "rent"]
+        words = []
+        for phrase in phrases:
+            # "spend on this month": the period was captured as a category
+            phrase = PERIOD_PATTERN.sub(" ", phrase)
+            for word in PHRASE_SPLIT.split(phrase):
+                word = word.strip()
+                if word and word not in IGNORED_WORDS:
+                    words.append(word)
+        return self._unique(words)
+
+    def _unique(self, items):
+        seen = []
+        for item in items:
+            if item not in seen:
+                seen.append(item)
+        return seen
+
 class AIAnalyst:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, llm=None):
         self.db = db
         # Optional: Keep LLM for generic chitchat if key is present, but not required.
         self.api_key = os.getenv("GEMINI_API_KEY")
-        self.model = None
+        self.model = llm
+        self.planner = QueryPlanner()
+
+    def _snapshot(self):
+        # Columnar copy of the expenses (NumPy), or None to use SQL
+        from .snapshot import get_snapshot
+        return get_snapshot(self.db)
 
     def analyze(self, query: str) -> str:
+        return "".join(self.analyze_stream(query))
+
+    def analyze_stream(self, query: str):
+        """
+        Yields the answer in fragments. Listings (recent transactions,
+        breakdowns, LLM output) are produced lazily, so each fragment can be
+        sent to the client as soon as its sub-result is computed.
+        """
+        response = self._respond(query)
+        if isinstance(response, str):
+            yield response
+        else:
+            yield from response
+
+    def _respond(self, query: str):
+        # Returns either a full answer string or an iterator of fragments
         query_lower = query.lower().strip()
 
         # --- 1. Small Talk & Personality ---
@@ -31,13 +155,25 @@ class AIAnalyst:
                 "- 'Total spent?'\n"
                 "- 'How much spent on Food?'\n"
                 "- 'Spending at Walmart?'\n"
+                "- 'Food and Transport this month vs last month?'\n"
                 "- 'What is my budget?'\n"
                 "- 'Biggest expense?'\n"
+                "- 'Spending breakdown by category'\n"
+                "- 'Any unusual charges this month?'\n"
                 "- 'Recent transactions'"
             )
 
         # --- 3. Structured Financial Intents ---
-        
+
+        # Unusual charges (robust outliers per category/store)
+        if re.search(r"unusual|anomal|suspicious|outlier", query_lower):
+            return self._iter_anomalies(query_lower)
+
+        # Compound questions (several categories/stores/periods) -> one query
+        aggregates = self.planner.plan(query_lower)
+        if aggregates:
+            return self._iter_plan(aggregates)
+
         # Total Spent
         if re.search(r"total.*spent|how much.*spent.*total|overall spent", query_lower):
             return self._get_total_spent()
@@ -53,9 +189,12 @@ class AIAnalyst:
         if "top category" in query_lower or "most spent on" in query_lower:
             return self._get_top_category()
 
+        if "breakdown" in query_lower or "by category" in query_lower:
+            return self._iter_category_breakdown()
+
         # Recent Transactions
         if "recent" in query_lower or "last transaction" in query_lower or "latest" in query_lower:
-            return self._get_recent_transactions()
+            return self._iter_recent_transactions()
 
         # Spent by Category (Regex)
         category_match = re.search(r"(?:on|in|for)\s+(\w+)", query_lower)
@@ -80,7 +219,11 @@ class AIAnalyst:
         if keyword_response:
             return keyword_response
             
-        # --- 5. Default / Echo ---
+        # --- 5. Optional LLM for anything else ---
+        if self.model:
+            return self._iter_llm(query)
+
+        # --- 6. Default / Echo ---
         return "I'm not sure how to answer that yet, but I'm listening! You can ask about your spending, budget, or specific lists."
 
     def _handle_small_talk(self, query: str) -> str:
@@ -122,14 +265,24 @@ class AIAnalyst:
             
             # Check Store (Simple ILIKE check for token)
             # This might be heavy if many stores, but okay for personal app
-            store_match = self.db.query(func.sum(Expense.amount)).filter(func.lower(Expense.store_name).contains(token)).scalar()
+            snap = self._snapshot()
+            if snap is not None:
+                store_match = snap.total(store=token)
+            else:
+                store_match = self.db.query(func.sum(Expense.amount)).filter(search.store_filter(self.db, token)).scalar()
             if store_match and store_match > 0:
                  return f"You've spent ${store_match:.2f} at locations matching '{token}'."
                  
         return None
 
+    def _total_spent(self) -> float:
+        snap = self._snapshot()
+        if snap is not None:
+            return snap.total()
+        return self.db.query(func.sum(Expense.amount)).scalar() or 0.0
+
     def _get_total_spent(self) -> str:
-        total = self.db.query(func.sum(Expense.amount)).scalar() or 0.0
+        total = self._total_spent()
         return f"You have spent a total of ${total:.2f} across all transactions."
 
     def _get_budget_status(self) -> str:
@@ -137,7 +290,7 @@ class AIAnalyst:
         if not budget:
              return "You haven't set a budget yet. Go to the dashboard to set one!"
         
-        total_spent = self.db.query(func.sum(Expense.amount)).scalar() or 0.0
+        total_spent = self._total_spent()
         remaining = budget.limit_amount - total_spent
         status = "under" if remaining >= 0 else "over"
         return f"Your budget is ${budget.limit_amount:.2f}. You've spent ${total_spent:.2f}. You are ${abs(remaining):.2f} {status} budget."
@@ -148,10 +301,20 @@ class AIAnalyst:
             return "You don't have any expenses yet."
         return f"Your biggest expense was ${expense.amount:.2f} at {expense.store_name} ({expense.category}) on {expense.created_at.strftime('%Y-%m-%d')}."
 
+    def _category_totals(self):
+        snap = self._snapshot()
+        if snap is not None:
+            return snap.by_category()
+        # Grouped on the integer id; names come from the joined categories row
+        return self.db.query(
+            category_names.name_column(), func.sum(Expense.amount)
+        ).outerjoin(Category, Category.id == Expense.category_id).group_by(
+            Expense.category_id
+        ).order_by(func.sum(Expense.amount).desc()).all()
+
     def _get_top_category(self) -> str:
-        result = self.db.query(
-            Expense.category, func.sum(Expense.amount)
-        ).group_by(Expense.category).order_by(func.sum(Expense.amount).desc()).first()
+        rows = self._category_totals()
+        result = rows[0] if rows else None
         
         if not result:
             return "No spending data available."
@@ -159,28 +322,157 @@ class AIAnalyst:
         return f"You spend the most on {category} with a total of ${amount:.2f}."
 
     def _get_spent_by_category(self, category_name: str) -> str:
-        total = self.db.query(func.sum(Expense.amount)).filter(func.lower(Expense.category) == category_name.lower()).scalar() or 0.0
-        if total == 0:
-             total = self.db.query(func.sum(Expense.amount)).filter(func.lower(Expense.category).contains(category_name.lower())).scalar() or 0.0
+        snap = self._snapshot()
+        if snap is not None:
+            total = snap.total(category=category_name.lower())
+            if total == 0:
+                total = snap.total(category=category_name.lower(), category_contains=True)
+        else:
+            total = self.db.query(func.sum(Expense.amount)).filter(category_names.matches(category_name)).scalar() or 0.0
+            if total == 0:
+                total = self.db.query(func.sum(Expense.amount)).filter(category_names.matches(category_name, contains=True)).scalar() or 0.0
              
         if total == 0:
              return f"I couldn't find any spending for the category '{category_name}'."
         return f"You've spent ${total:.2f} on {category_name.capitalize()}."
 
     def _get_spent_by_store(self, store_name: str) -> str:
-        total = self.db.query(func.sum(Expense.amount)).filter(func.lower(Expense.store_name).contains(store_name.lower())).scalar() or 0.0
+        snap = self._snapshot()
+        if snap is not None:
+            total = snap.total(store=store_name.lower())
+        else:
+            total = self.db.query(func.sum(Expense.amount)).filter(search.store_filter(self.db, store_name)).scalar() or 0.0
         if total == 0:
              return f"I couldn't find any spending at '{store_name}'."
         return f"You've spent ${total:.2f} at {store_name.capitalize()}."
 
     def _get_recent_transactions(self) -> str:
+        return "".join(self._iter_recent_transactions())
+
+    def _iter_recent_transactions(self):
         expenses = self.db.query(Expense).order_by(Expense.created_at.desc()).limit(3).all()
         if not expenses:
-            return "No recent transactions found."
-        
-        response = "Here are your latest 3 transactions:\n"
+            yield "No recent transactions found."
+            return
+
+        yield "Here are your latest 3 transactions:\n"
         for ex in expenses:
             store = ex.store_name or "Unknown Store"
             date_str = ex.created_at.strftime("%b %d")
-            response += f"- {date_str}: ${ex.amount:.2f} at {store}\n"
-        return response
+            yield f"- {date_str}: ${ex.amount:.2f} at {store}\n"
+
+    def _iter_category_breakdown(self):
+        rows = self._category_totals()
+        if not rows:
+            yield "No spending data available."
+            return
+
+        yield "Here's your spending by category:\n"
+        for category, amount in rows:
+            yield f"- {category}: ${amount:.2f}\n"
+
+    def _iter_anomalies(self, query: str):
+        from . import anomalies  # pulls in NumPy, so only when asked
+
+        period = PERIOD_PATTERN.search(query)
+        period = period.group(1) if period else "this month"
+        start, end = period_range(period)
+        flagged = anomalies.find_anomalies(self.db, start, end, limit=5)
+        if not flagged:
+            yield f"Nothing unusual {period}. Your spending looks normal."
+            return
+
+        yield f"These stand out {period}:\n"
+        for item in flagged:
+            store = item["store_name"] or "Unknown Store"
+            against = item["store_name"] if item["compared_to"] == "store" else item["category"]
+            yield (
+                f"- {item['created_at'].strftime('%b %d')}: ${item['amount']:.2f} at {store} "
+                f"(usually ~${item['typical_amount']:.2f} for {against})\n"
+            )
+
+    def _iter_llm(self, query: str):
+        prompt = (
+            "You are FinTrack AI, a friendly personal finance assistant. "
+            f"Answer briefly: {query}"
+        )
+        try:
+            for chunk in self.model.stream(prompt):
+                if chunk:
+                    yield chunk
+        except Exception as e:
+            print(f"LLM Error: {e}")
+            yield "I'm not sure how to answer that yet, but I'm listening! You can ask about your spending, budget, or specific lists."
+
+    def _aggregate_conditions(self, aggregate: Aggregate, now: datetime):
+        conditions = []
+        if aggregate.category:
+            conditions.append(category_names.matches(aggregate.category))
+        if aggregate.store:
+            conditions.append(search.store_filter(self.db, aggregate.store))
+        if aggregate.period:
+            start, end = period_range(aggregate.period, now)
+            conditions.append(Expense.created_at >= start)
+            conditions.append(Expense.created_at < end)
+        return and_(*conditions)
+
+    def _iter_plan(self, aggregates):
+        yield "Here's the breakdown:\n"
+        lines = self._run_plan(aggregates)
+        for i, line in enumerate(lines):
+            yield line if i == len(lines) - 1 else line + "\n"
+
+    def _run_plan(self, aggregates):
+        now = datetime.now()
+        snap = self._snapshot()
+        if snap is not None:
+            # Each aggregate is a masked sum over the in-memory columns
+            totals = {}
+            for agg in aggregates:
+                start, end = period_range(agg.period, now) if agg.period else (None, None)
+                totals[agg] = snap.total(category=agg.category, store=agg.store, start=start, end=end)
+            return self._format_plan(aggregates, totals)
+
+        # Every aggregate becomes a SUM(CASE WHEN ...) column of the same
+        # statement, so the whole question costs one round trip.
+        conditions = [self._aggregate_conditions(agg, now) for agg in aggregates]
+        columns = [
+            func.coalesce(func.sum(case((cond, Expense.amount), else_=0.0)), 0.0).label(f"a{i}")
+            for i, cond in enumerate(conditions)
+        ]
+        row = self.db.query(*columns).filter(or_(*conditions)).one()
+        totals = {agg: float(row[i] or 0.0) for i, agg in enumerate(aggregates)}
+        return self._format_plan(aggregates, totals)
+
+    def _format_plan(self, aggregates, totals):
+        groups = {}
+        for agg in aggregates:
+            groups.setdefault((agg.category, agg.store), []).append(agg)
+
+        lines = []
+        for (category, store), group in groups.items():
+            label = category.capitalize() if category else ("Spending" if store else "Total spending")
+            if store:
+                label += f" at {store.capitalize()}"
+
+            if len(group) == 1:
+                period = f" {group[0].period}" if group[0].period else ""
+                lines.append(f"- {label}{period}: ${totals[group[0]]:.2f}")
+                continue
+
+            parts = ", ".join(f"{agg.period} ${totals[agg]:.2f}" for agg in group)
+            if len(group) == 2:
+                delta = totals[group[0]] - totals[group[1]]
+                direction = "up" if delta >= 0 else "down"
+                parts += f" ({direction} ${abs(delta):.2f})"
+            lines.append(f"- {label}: {parts}")
+
+        if len(groups) > 1:
+            periods = self.planner._unique([agg.period for agg in aggregates])
+            combined = []
+            for period in periods:
+                total = sum(totals[agg] for agg in aggregates if agg.period == period)
+                combined.append(f"{period} ${total:.2f}" if period else f"${total:.2f}")
+            lines.append(f"Combined: {', '.join(combined)}")
+
+        return lines
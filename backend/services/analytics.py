@@ -0,0 +1,165 @@
+"""
+Vectorized spending analytics. The window is loaded with one query as plain
+columns and every statistic is computed with NumPy array operations.
+"""
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from sqlalchemy import func, cast, Integer
+from sqlalchemy.orm import Session
+
+from ..models import Expense, Budget, Category
+from .snapshot import get_snapshot
+from . import categories as category_names
+
+# julianday() of 0001-01-01 00:00, so julianday(x) - offset - ordinal = day fraction
+JULIAN_OFFSET = 1721424.5
+
+
+def _julian(day: date) -> float:
+    return day.toordinal() + JULIAN_OFFSET
+
+
+def load_columns(db: Session, start: date, end: date, category: str = None):
+    """
+    One query for the window; returns (day offset, amount, category) arrays.
+    SQLite sums per (day, category) while scanning, so only a few thousand
+    rows reach Python no matter how many expenses fall in the window.
+    """
+    snap = get_snapshot(db)
+    if snap is not None:
+        days, amounts, categories = snap.daily_by_category(
+            datetime(start.year, start.month, start.day),
+            datetime(end.year, end.month, end.day) + timedelta(days=1),
+            category.lower() if category else None,
+        )
+        categories[categories == None] = "Uncategorized"  # noqa: E711 (elementwise)
+        return days, amounts, categories
+
+    day = cast(func.julianday(Expense.created_at) - _julian(start), Integer).label("day")
+    query = db.query(day, func.sum(Expense.amount), category_names.name_column()).outerjoin(
+        Category, Category.id == Expense.category_id
+    ).filter(
+        Expense.created_at >= datetime(start.year, start.month, start.day),
+        Expense.created_at < datetime(end.year, end.month, end.day) + timedelta(days=1),
+    )
+    if category:
+        query = query.filter(category_names.matches(category))
+
+    rows = query.group_by(day, Expense.category_id).all()
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0), np.empty(0, dtype=object)
+
+    days, amounts, categories = zip(*rows)
+    days = np.asarray(days, dtype=np.int64)
+    amounts = np.asarray(amounts, dtype=float)
+    categories = np.asarray(categories, dtype=object)
+    categories[categories == None] = "Uncategorized"  # noqa: E711 (elementwise)
+    return days, amounts, categories
+
+
+def moving_average(series: np.ndarray, window: int) -> np.ndarray:
+    """
+    Trailing moving average; the first window-1 points average what exists so far.
+    """
+    cumulative = np.concatenate(([0.0], np.cumsum(series)))
+    index = np.arange(1, len(series) + 1)
+    lower = np.maximum(index - window, 0)
+    return (cumulative[index] - cumulative[lower]) / (index - lower)
+
+
+def period_bounds(period: str, today: date):
+    if period == "weekly":
+        start = today - timedelta(days=today.weekday())
+        return start, start + timedelta(days=7)
+    start = today.replace(day=1)
+    end = (start + timedelta(days=32)).replace(day=1)
+    return start, end
+
+
+def project_budget(daily: np.ndarray, period_start_index: int, period_days: int, limit: float) -> dict:
+    """
+    Fits a line to cumulative spend so far this period and extends it to
+    the period end.
+    """
+    spent_daily = daily[period_start_index:]
+    cumulative = np.cumsum(spent_daily)
+    spent = float(cumulative[-1]) if len(cumulative) else 0.0
+
+    if len(cumulative) >= 2:
+        slope, intercept = np.polyfit(np.arange(len(cumulative)), cumulative, 1)
+        projected = float(slope * (period_days - 1) + intercept)
+    else:
+        # Day one: assume today's pace holds
+        projected = spent * period_days
+    projected = max(projected, spent)
+
+    return {
+        "limit": limit,
+        "spent": round(spent, 2),
+        "days_elapsed": len(spent_daily),
+        "period_days": period_days,
+        "projected": round(projected, 2),
+        "projected_remaining": round(limit - projected, 2),
+        "on_track": limit <= 0 or projected <= limit,
+    }
+
+
+def _rounded(array: np.ndarray):
+    return np.round(array, 2).tolist()
+
+
+def spending_trends(db: Session, start: date = None, end: date = None, category: str = None) -> dict:
+    end = end or date.today()
+    start = start or end - timedelta(days=89)
+
+    budget = db.query(Budget).first()
+    period = budget.period if budget else "monthly"
+    period_start, period_end = period_bounds(period, end)
+
+    # Load from whichever is earlier so the projection always sees the whole period
+    load_start = min(start, period_start)
+    days, amounts, categories = load_columns(db, load_start, end, category)
+
+    n_days = (end - load_start).days + 1
+    daily_all = np.bincount(days, weights=amounts, minlength=n_days)[:n_days]
+
+    offset = (start - load_start).days
+    daily = daily_all[offset:]
+    dates = np.arange(np.datetime64(start), np.datetime64(end) + 1)
+
+    # Month-over-month on calendar months touched by the window (none if start > end)
+    months = dates.astype("datetime64[M]")
+    month_index = (months - months[:1]).astype(np.int64)
+    monthly = np.bincount(month_index, weights=daily)
+    deltas = np.diff(monthly)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = np.where(monthly[:-1] > 0, deltas / monthly[:-1] * 100, np.nan)
+
+    in_window = days >= offset
+    names, codes = np.unique(categories[in_window], return_inverse=True)
+    category_totals = np.bincount(codes, weights=amounts[in_window], minlength=len(names))
+    order = np.argsort(-category_totals)
+
+    projection = project_budget(
+        daily_all, (period_start - load_start).days, (period_end - period_start).days,
+        budget.limit_amount if budget else 0.0,
+    )
+    projection["period"] = period
+
+    return {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "dates": dates.astype(str).tolist(),
+        "daily": _rounded(daily),
+        "ma7": _rounded(moving_average(daily, 7)),
+        "ma30": _rounded(moving_average(daily, 30)),
+        "months": np.unique(months).astype(str).tolist(),
+        "monthly": _rounded(monthly),
+        "mom_delta": _rounded(deltas),
+        "mom_pct": [None if np.isnan(p) else round(float(p), 1) for p in pct],
+        "categories": names[order].tolist(),
+        "category_totals": _rounded(category_totals[order]),
+        "total": round(float(daily.sum()), 2),
+        "projection": projection,
+    }
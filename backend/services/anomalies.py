@@ -0,0 +1,304 @@
+"""
+Robust anomaly detection over expenses.
+
+Each category and store keeps a baseline: a histogram of log(amount) over
+fixed bins. Median and MAD for every baseline are computed from the
+histograms in one vectorized pass, and new expenses only bump a bin count,
+so baselines never need the full history re-read after the first load.
+
+The cache remembers which bins each expense was counted in, so an update
+or delete takes exactly that back out and applying a row twice is
+harmless. That lets the write events (this process) and the change log
+(every process, read before each use) both feed it.
+"""
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from ..models import Expense, Category
+from . import events, changes, categories as category_names
+
+# log-spaced bins from $0.01 to $100k (~6.5% wide each)
+BIN_EDGES = np.linspace(np.log(0.01), np.log(100_000), 257)
+BIN_CENTERS = (BIN_EDGES[:-1] + BIN_EDGES[1:]) / 2
+BIN_WIDTH = BIN_EDGES[1] - BIN_EDGES[0]
+
+DEFAULT_THRESHOLD = 3.5
+MIN_SAMPLES = 5
+# Bigger change log deltas than this are cheaper to reload from scratch
+MAX_SYNC_CHANGES = 10_000
+# Recently counted expenses kept in a dict until there are this many
+MERGE_AFTER = 4096
+
+
+def _bins(amounts) -> np.ndarray:
+    logs = np.log(np.clip(np.asarray(amounts, dtype=float), 0.01, None))
+    return np.clip(np.searchsorted(BIN_EDGES, logs, side="right") - 1, 0, len(BIN_CENTERS) - 1)
+
+
+def _normalize(names) -> np.ndarray:
+    # Trimmed lower-case names as a NumPy string array (None -> "")
+    names = np.asarray(names, dtype=object)
+    names[names == None] = ""  # noqa: E711 (elementwise)
+    return np.char.lower(np.char.strip(names.astype(str)))
+
+
+class BaselineCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.loaded_at = None
+        self.seq = 0  # change log position the baselines reflect
+        self._clear()
+
+    def _clear(self):
+        self.keys = {}  # ("category" | "store", normalized name) -> row in counts
+        self.counts = np.zeros((0, len(BIN_CENTERS)))
+        # What each expense was counted as: sorted ids with (category row,
+        # store row, bin) per id (bin -1 once taken out), plus a dict for
+        # the ones counted since the arrays were last rebuilt
+        self.ids = np.empty(0, dtype=np.int64)
+        self.counted = np.empty((0, 3), dtype=np.int64)
+        self._recent = {}
+        self._stats = None
+
+    # --- Building / updating ---
+
+    def load(self, db: Session):
+        # seq is read first: anything committed while the rows are read is
+        # applied again by the next sync, which is harmless
+        seq = changes.current_seq(db)
+        rows = db.query(Expense.id, Expense.amount, category_names.name_column(), Expense.store_name).outerjoin(
+            Category, Category.id == Expense.category_id
+        ).order_by(Expense.id).all()
+        with self._lock:
+            self._clear()
+            if rows:
+                ids, amounts, categories, stores = zip(*rows)
+                bins = _bins(amounts)
+                category_rows = self._rows_for("category", categories)
+                store_rows = self._rows_for("store", stores)
+                np.add.at(self.counts, (category_rows, bins), 1)
+                np.add.at(self.counts, (store_rows, bins), 1)
+                self.ids = np.asarray(ids, dtype=np.int64)
+                self.counted = np.column_stack([category_rows, store_rows, bins]).astype(np.int64)
+            self.seq = seq
+            self.loaded_at = time.monotonic()
+
+    def _rows_for(self, dimension: str, names, create: bool = True) -> np.ndarray:
+        """
+        Baseline row per name (-1 for unknown names when create=False).
+        Only the distinct names are looked up in Python.
+        """
+        unique, inverse = np.unique(_normalize(names), return_inverse=True)
+        lookup = np.empty(len(unique), dtype=np.int64)
+        for i, name in enumerate(unique):
+            key = (dimension, str(name))
+            if key not in self.keys:
+                if not create:
+                    lookup[i] = -1
+                    continue
+                self.keys[key] = len(self.keys)
+            lookup[i] = self.keys[key]
+
+        missing = len(self.keys) - self.counts.shape[0]
+        if missing > 0:
+            self.counts = np.vstack([self.counts, np.zeros((missing, len(BIN_CENTERS)))])
+        return lookup[inverse.reshape(-1)]
+
+    def _take_back(self, ids):
+        """
+        Removes what these expenses were counted as (unknown ids are skipped).
+        """
+        for expense_id in ids:
+            counted = self._recent.pop(expense_id, None)
+            if counted is None:
+                position = np.searchsorted(self.ids, expense_id)
+                if position < len(self.ids) and self.ids[position] == expense_id and self.counted[position, 2] >= 0:
+                    counted = tuple(self.counted[position])
+                    self.counted[position, 2] = -1
+            if counted is not None:
+                category_row, store_row, bin_index = counted
+                self.counts[category_row, bin_index] -= 1
+                self.counts[store_row, bin_index] -= 1
+
+    def _count(self, rows):
+        bins = _bins([row["amount"] for row in rows])
+        category_rows = self._rows_for("category", [row["category"] for row in rows])
+        store_rows = self._rows_for("store", [row["store_name"] for row in rows])
+        np.add.at(self.counts, (category_rows, bins), 1)
+        np.add.at(self.counts, (store_rows, bins), 1)
+        for row, category_row, store_row, bin_index in zip(rows, category_rows, store_rows, bins):
+            position = np.searchsorted(self.ids, row["id"])
+            if position < len(self.ids) and self.ids[position] == row["id"]:
+                self.counted[position] = (category_row, store_row, bin_index)
+            else:
+                self._recent[row["id"]] = (int(category_row), int(store_row), int(bin_index))
+        if len(self._recent) > MERGE_AFTER:
+            self._merge()
+
+    def _merge(self):
+        kept = self.counted[:, 2] >= 0
+        recent = sorted(self._recent.items())
+        self.ids = np.concatenate([self.ids[kept], np.asarray([i for i, _ in recent], dtype=np.int64)])
+        self.counted = np.concatenate([self.counted[kept], np.asarray([c for _, c in recent], dtype=np.int64)])
+        order = np.argsort(self.ids, kind="stable")
+        self.ids, self.counted = self.ids[order], self.counted[order]
+        self._recent = {}
+
+    def upsert(self, rows):
+        """
+        Counts new expenses and recounts known ones.
+        """
+        if not rows or self.loaded_at is None:
+            return
+        rows = list({row["id"]: row for row in rows}.values())
+        with self._lock:
+            self._take_back([row["id"] for row in rows])
+            self._count(rows)
+            self._stats = None
+
+    def remove(self, ids):
+        if not ids or self.loaded_at is None:
+            return
+        with self._lock:
+            self._take_back(set(ids))
+            self._stats = None
+
+    def reset(self):
+        with self._lock:
+            self._clear()
+
+    def ensure_loaded(self, db: Session):
+        """
+        Loads on first use, then catches up with the change log: writes from
+        other worker processes, and any event this process missed.
+        """
+        if self.loaded_at is None:
+            self.load(db)
+            return
+        delta = changes.changes_since(db, self.seq, MAX_SYNC_CHANGES)
+        if delta["reset"] or delta["has_more"]:
+            self.load(db)
+            return
+        self.upsert([events.as_row(expense) for expense in delta["changed"]])
+        self.remove(delta["deleted"])
+        self.seq = max(self.seq, delta["seq"])
+
+    # --- Statistics ---
+
+    def stats(self):
+        """
+        (median, mad, samples) arrays aligned with self.keys, in log space.
+        """
+        with self._lock:
+            return self._current_stats()
+
+    def _current_stats(self):
+        if self._stats is None:
+            self._stats = self._compute(self.counts)
+        return self._stats
+
+    @staticmethod
+    def _compute(counts: np.ndarray):
+        samples = counts.sum(axis=1)
+        if counts.shape[0] == 0:
+            empty = np.zeros(0)
+            return empty, empty, empty
+
+        # Median: first bin where the cumulative count reaches half
+        half = samples[:, None] / 2
+        median_bin = np.argmax(np.cumsum(counts, axis=1) >= half, axis=1)
+        median = BIN_CENTERS[median_bin]
+
+        # MAD: weighted median of |center - median| per row
+        deviation = np.abs(BIN_CENTERS[None, :] - median[:, None])
+        order = np.argsort(deviation, axis=1)
+        sorted_dev = np.take_along_axis(deviation, order, axis=1)
+        sorted_counts = np.take_along_axis(counts, order, axis=1)
+        mad_index = np.argmax(np.cumsum(sorted_counts, axis=1) >= half, axis=1)
+        mad = sorted_dev[np.arange(len(mad_index)), mad_index]
+        # Never narrower than a bin, or identical charges make everything an outlier
+        return median, np.maximum(mad, BIN_WIDTH), samples
+
+    def robust_z(self, dimension: str, names, amounts) -> tuple:
+        """
+        Robust z-scores (0.6745 * (x - median) / MAD) of amounts against
+        their key's baseline, NaN where the baseline is too small, and the
+        baseline's typical amount (NaN for unknown names).
+        """
+        # Stats and rows under one lock: a concurrent write may add keys
+        with self._lock:
+            median, mad, samples = self._current_stats()
+            rows = self._rows_for(dimension, names, create=False)
+        logs = np.log(np.clip(np.asarray(amounts, dtype=float), 0.01, None))
+        z = np.full(len(rows), np.nan)
+        typical = np.full(len(rows), np.nan)
+        known = rows >= 0
+        if known.any():
+            r = rows[known]
+            z[known] = np.where(
+                samples[r] >= MIN_SAMPLES,
+                0.6745 * (logs[known] - median[r]) / mad[r],
+                np.nan,
+            )
+            typical[known] = np.exp(median[r])
+        return z, typical
+
+
+baselines = BaselineCache()
+
+events.subscribe("expenses.created", baselines.upsert)
+events.subscribe("expenses.deleted", lambda rows: baselines.remove([row["id"] for row in rows]))
+events.subscribe("expenses.updated", lambda before, after: baselines.upsert(after))
+events.subscribe("expenses.cleared", baselines.reset)
+# Baselines are keyed by name; rebuild on next use after a rename
+events.subscribe("categories.updated", lambda category, old_name: setattr(baselines, "loaded_at", None))
+
+
+def find_anomalies(db: Session, start: datetime = None, end: datetime = None,
+                   threshold: float = DEFAULT_THRESHOLD, limit: int = 50) -> list:
+    """
+    Expenses in [start, end) that are unusually large for their category or store.
+    """
+    baselines.ensure_loaded(db)
+
+    query = db.query(
+        Expense.id, Expense.amount, category_names.name_column(), Expense.store_name, Expense.created_at,
+        Expense.description,
+    ).outerjoin(Category, Category.id == Expense.category_id)
+    if start:
+        query = query.filter(Expense.created_at >= start)
+    if end:
+        query = query.filter(Expense.created_at < end)
+    rows = query.all()
+    if not rows:
+        return []
+
+    ids, amounts, categories, stores, dates, descriptions = zip(*rows)
+    z_category, typical_category = baselines.robust_z("category", categories, amounts)
+    z_store, typical_store = baselines.robust_z("store", stores, amounts)
+
+    # Only unusually *large* charges are interesting here
+    score = np.fmax(z_category, z_store)
+    flagged = np.flatnonzero(np.nan_to_num(score, nan=-np.inf) > threshold)
+    flagged = flagged[np.argsort(-score[flagged])][:limit]
+
+    results = []
+    for i in flagged:
+        by_store = np.nan_to_num(z_store[i], nan=-np.inf) >= np.nan_to_num(z_category[i], nan=-np.inf)
+        dimension, typical = ("store", typical_store[i]) if by_store else ("category", typical_category[i])
+        results.append({
+            "id": ids[i],
+            "amount": amounts[i],
+            "category": categories[i],
+            "store_name": stores[i],
+            "description": descriptions[i],
+            "created_at": dates[i],
+            "score": round(float(score[i]), 2),
+            "compared_to": dimension,
+            "typical_amount": round(float(typical), 2),
+        })
+    return results
@@ -0,0 +1,118 @@
+"""
+Set-based bulk expense writes: one INSERT / UPDATE / DELETE statement per
+call instead of one round trip (and one commit) per expense. Callers
+commit and publish the returned rows as events.
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, delete, insert, select, update
+from sqlalchemy.orm import Session
+
+from ..models import Category, Expense, UNCATEGORIZED
+from . import categories, rows, search
+
+# Event row keys (schemas.Expense fields)
+ROW_KEYS = [column.key for column in rows.COLUMNS]
+
+
+def condition(db: Session, criteria) -> object:
+    """
+    WHERE clause for a schemas.ExpenseFilter.
+    """
+    conditions = []
+    if criteria.ids is not None:
+        conditions.append(Expense.id.in_(criteria.ids))
+    if criteria.start_date:
+        conditions.append(Expense.created_at >= criteria.start_date)
+    if criteria.end_date:
+        end = criteria.end_date
+        conditions.append(Expense.created_at < datetime(end.year, end.month, end.day) + timedelta(days=1))
+    if criteria.store:
+        conditions.append(search.store_filter(db, criteria.store))
+    if criteria.category:
+        conditions.append(categories.matches(criteria.category))
+    if not conditions:
+        # Refuse to touch every row by accident; DELETE /expenses/ clears everything
+        raise ValueError("Give ids, a date range, a store or a category")
+    return and_(*conditions)
+
+
+def rows_matching(db: Session, where, limit: int = None) -> list:
+    """
+    Event rows (see events.as_row) for expenses matching where, by id.
+    """
+    query = rows.select_rows().where(where)
+    if limit:
+        query = query.order_by(Expense.id).limit(limit)
+    return rows.fetch(db, query)
+
+
+def create(db: Session, expenses: list) -> list:
+    return insert_values(db, [expense.dict() for expense in expenses])
+
+
+def insert_values(db: Session, values: list) -> list:
+    """
+    Inserts expenses given as API field dicts ("category" is a name); any
+    other Expense column (created_at, fingerprint) passes straight through.
+    Returns event rows.
+    """
+    if not values:
+        return []
+    ids = categories.resolve(db, [v["category"] for v in values])
+    names = dict(db.execute(select(Category.id, Category.name).where(Category.id.in_(set(ids.values()) - {None}))).all())
+
+    # executemany with RETURNING: multi-row INSERT statements. On SQLite,
+    # sort_by_parameter_order falls back to one statement per row; SQLite
+    # numbers a multi-row INSERT's rows in VALUES order (it just may RETURN
+    # them in any order), so sorting by id gives the same pairing.
+    sqlite = db.get_bind().dialect.name == "sqlite"
+    inserted = db.execute(
+        insert(Expense).returning(Expense.id, Expense.created_at, sort_by_parameter_order=not sqlite),
+        [categories.expense_values(db, v, ids) for v in values],
+    ).all()
+    if sqlite:
+        inserted.sort(key=lambda row: row.id)
+    return [
+        {
+            **{key: v.get(key) for key in ROW_KEYS},
+            "id": row.id,
+            "created_at": row.created_at,
+            "category": names.get(ids[v["category"]], UNCATEGORIZED),
+        }
+        for v, row in zip(values, inserted)
+    ]
+
+
+def update_matching(db: Session, criteria, patch) -> tuple:
+    """
+    Applies the patch's set fields to every matching expense.
+    Returns (before rows, after rows).
+    """
+    where = condition(db, criteria)
+    changes = patch.dict(exclude_unset=True)
+    if changes.get("amount", 0) is None:
+        raise ValueError("amount can't be null")
+    before = rows_matching(db, where)
+    if not before or not changes:
+        return before, before
+
+    values = categories.expense_values(db, changes)
+    db.execute(update(Expense).where(where).values(**values).execution_options(synchronize_session=False))
+
+    if "category" in changes:
+        category_id = values["category_id"]
+        changes["category"] = db.get(Category, category_id).name if category_id else UNCATEGORIZED
+    after = [{**row, **changes} for row in before]
+    return before, after
+
+
+def delete_matching(db: Session, criteria) -> list:
+    """
+    Deletes every matching expense. Returns the deleted rows.
+    """
+    where = condition(db, criteria)
+    deleted = rows_matching(db, where)
+    if deleted:
+        db.execute(delete(Expense).where(where).execution_options(synchronize_session=False))
+    return deleted
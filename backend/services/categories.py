@@ -0,0 +1,82 @@
+"""
+Category name <-> id mapping for expense writes and filters. The API still speaks in
+category names; rows store categories.id.
+"""
+from sqlalchemy import func, select, or_
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from ..models import Category, Expense, UNCATEGORIZED
+
+
+def _key(name) -> str:
+    return (name or "").strip().lower()
+
+
+def resolve(db: Session, names) -> dict:
+    """
+    Maps each name to a category id, creating categories that don't exist yet
+    (matched case-insensitively). Blank and "Uncategorized" map to None.
+    """
+    wanted = {_key(name): (name or "").strip() for name in names}
+    wanted.pop("", None)
+    wanted.pop(UNCATEGORIZED.lower(), None)
+
+    ids = {}
+    if wanted:
+        ids = _lookup(db, wanted)
+        missing = [wanted[key] for key in wanted if key not in ids]
+        if missing:
+            # A concurrent request may create the same name between the lookup
+            # and the insert: skip those rows and read back whichever won
+            created = db.execute(
+                insert(Category).values([{"name": name} for name in missing])
+                .on_conflict_do_nothing(index_elements=["name"])
+                .returning(Category.id, Category.name)
+            ).all()
+            ids.update({_key(name): category_id for category_id, name in created})
+            if len(created) < len(missing):
+                ids = _lookup(db, wanted)
+    return {name: ids.get(_key(name)) for name in names}
+
+
+def _lookup(db: Session, wanted: dict) -> dict:
+    rows = db.query(Category.id, Category.name).filter(func.lower(Category.name).in_(list(wanted))).all()
+    return {_key(name): category_id for category_id, name in rows}
+
+
+def expense_values(db: Session, values: dict, ids: dict = None) -> dict:
+    """
+    Expense column values from API fields: "category" (a name) becomes "category_id".
+    Pass ids from resolve() when converting many rows.
+    """
+    values = dict(values)
+    if "category" in values:
+        name = values.pop("category")
+        values["category_id"] = (ids if ids is not None else resolve(db, [name]))[name]
+    return values
+
+
+def name_column():
+    """
+    Category name for queries that outer-join Category on Expense.category_id.
+    """
+    return func.coalesce(Category.name, UNCATEGORIZED)
+
+
+def matches(name: str, contains: bool = False):
+    """
+    Filter on Expense by (lower-case) category name, resolved through the
+    small categories table so expenses are matched on the indexed id.
+    """
+    name = name.lower()
+    if contains:
+        condition = func.lower(Category.name).contains(name)
+        uncategorized = name in UNCATEGORIZED.lower()
+    else:
+        condition = func.lower(Category.name) == name
+        uncategorized = name == UNCATEGORIZED.lower()
+    clause = Expense.category_id.in_(select(Category.id).where(condition))
+    if uncategorized:
+        clause = or_(clause, Expense.category_id.is_(None))
+    return clause
@@ -0,0 +1,56 @@
+"""
+Reads the expense change log (see migrations.add_change_log) so clients and
+caches can sync in O(changes) instead of re-reading every expense.
+"""
+from sqlalchemy import func, insert, select, literal
+from sqlalchemy.orm import Session
+
+from ..models import Expense, ExpenseChange
+
+
+def current_seq(db: Session) -> int:
+    return db.query(func.max(ExpenseChange.seq)).scalar() or 0
+
+
+def record_clear(db: Session):
+    """
+    After deleting every expense: one marker replaces all their tombstones.
+    Call inside the same transaction as the (last) delete. Expenses written
+    while a chunked purge was running survive it, so they're logged again
+    after the marker.
+    """
+    db.query(ExpenseChange).delete()
+    db.add(ExpenseChange(expense_id=None, deleted=True))
+    db.flush()
+    db.execute(insert(ExpenseChange).from_select(
+        ["expense_id", "deleted"], select(Expense.id, literal(False)).order_by(Expense.id)
+    ))
+
+
+def changes_since(db: Session, since: int = 0, limit: int = 1000) -> dict:
+    # One SELECT, so one snapshot: pysqlite doesn't open a read transaction,
+    # and a write committed between two queries could otherwise land below
+    # the returned seq and never be delivered. record_clear() deletes every
+    # entry before its marker, so the marker (if any) comes first here.
+    rows = (
+        db.query(ExpenseChange.seq, ExpenseChange.expense_id, ExpenseChange.deleted, Expense)
+        .outerjoin(Expense, Expense.id == ExpenseChange.expense_id)
+        .filter(ExpenseChange.seq > since)
+        .order_by(ExpenseChange.seq)
+        .limit(limit + 1)
+        .all()
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    changed, deleted, reset = [], [], False
+    for _, expense_id, is_deleted, expense in rows:
+        if expense_id is None:
+            changed, deleted, reset = [], [], True
+        elif is_deleted or expense is None:
+            deleted.append(expense_id)
+        else:
+            changed.append(expense)
+
+    seq = rows[-1][0] if rows else since
+    return {"seq": seq, "reset": reset, "changed": changed, "deleted": deleted, "has_more": has_more}
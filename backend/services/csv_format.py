@@ -0,0 +1,356 @@
+"""
+Works out a CSV file's layout once, from its first SNIFF_ROWS rows, so an
+import parses every row with one known format instead of guessing per row:
+
+    encoding     utf-8 (with or without BOM), else cp1252
+    delimiter    , ; tab or |, whichever gives the most rows the same width
+    columns      from header names (bank exports included), or the old
+                 positional layouts when there's no header
+    date format  the first of DATE_FORMATS that parses every sampled date;
+                 when others do too (03/04/2024) settle_dates() decides
+                 with the rest of the file
+    numbers      decimal/thousands separators and the currency symbol/code
+
+CsvFormat.parser() then turns rows into expense values with that single
+format: ISO and d/m/y-style dates skip strptime, and each distinct date
+string is parsed once per file.
+"""
+import io
+import os
+import re
+import csv
+import codecs
+import unicodedata
+from collections import Counter
+from datetime import datetime
+from itertools import islice
+
+SNIFF_ROWS = int(os.getenv("IMPORT_SNIFF_ROWS", "300"))
+SNIFF_BYTES = 256 * 1024
+DELIMITERS = (",", ";", "\t", "|")
+
+# Tried in order; the first that parses every sampled date wins, so US
+# month-first comes before day-first for "/" (what imports always assumed)
+DATE_FORMATS = (
+    "%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y/%m/%d",
+    "%m/%d/%Y", "%d/%m/%Y", "%d-%m-%Y", "%m-%d-%Y", "%d.%m.%Y",
+    "%m/%d/%y", "%d/%m/%y", "%d.%m.%y", "%Y%m%d",
+    "%d %b %Y", "%d-%b-%Y", "%b %d, %Y", "%d %B %Y", "%B %d, %Y",
+)
+ISO_FORMATS = ("%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S")
+
+# field -> header names it's recognised by (lower case, "(...)" dropped)
+HEADER_NAMES = {
+    "id": ("id",),
+    "date": ("date", "transaction date", "posted date", "posting date", "booking date", "value date",
+             "created_at", "created at"),
+    "amount": ("amount", "value", "sum", "total", "price", "debit"),
+    "category": ("category", "type"),
+    "store": ("store", "store_name", "store name", "merchant", "payee", "vendor", "shop", "name", "counterparty"),
+    "description": ("description", "memo", "details", "narrative", "notes", "note", "reference"),
+}
+# Header-less files: the app's own export (ID first) or the simple layout
+EXPORT_LAYOUT = ("id", "date", "amount", "category", "store", "description")
+SIMPLE_LAYOUT = ("date", "amount", "category", "store", "description")
+
+CURRENCY_CODE = re.compile(r"\b[A-Z]{3}\b")
+
+
+class FormatError(ValueError):
+    pass
+
+
+def _cell(row: list, index) -> str:
+    return row[index].strip() if index is not None and index < len(row) else ""
+
+
+def _header_key(name: str) -> str:
+    return " ".join(re.sub(r"\(.*?\)", "", name).lower().replace("_", " ").split())
+
+
+def _date_parser(date_format: str):
+    """
+    One-format date parser, memoized per distinct string.
+    """
+    split = re.fullmatch(r"%([dmY])([/.-])%([dmY])\2%([dmY])", date_format)
+    if date_format in ISO_FORMATS:
+        length = len(datetime(2000, 1, 1).strftime(date_format))
+        def convert(text):
+            if len(text) != length:
+                raise ValueError
+            return datetime.fromisoformat(text)
+    elif split:
+        order, separator = (split.group(1), split.group(3), split.group(4)), split.group(2)
+        def convert(text):
+            parts = dict(zip(order, text.split(separator)))
+            if len(parts) != 3 or len(parts["Y"]) != 4:
+                raise ValueError
+            return datetime(int(parts["Y"]), int(parts["m"]), int(parts["d"]))
+    else:
+        def convert(text):
+            return datetime.strptime(text, date_format)
+
+    cache = {}
+    def parse(text: str) -> datetime:
+        try:
+            return cache[text]
+        except KeyError:
+            pass
+        try:
+            value = convert(text)
+        except ValueError:
+            raise ValueError(f"date {text!r} doesn't match {date_format}") from None
+        if len(cache) > 10000:
+            cache.clear()
+        cache[text] = value
+        return value
+    return parse
+
+
+def _amount_parser(decimal: str, thousands: str, symbols: str, codes: list):
+    table = {ord(c): None for c in thousands + symbols + "  '+"}
+    if decimal != ".":
+        table[ord(decimal)] = "."
+
+    def parse(text: str) -> float:
+        for code in codes:
+            text = text.replace(code, "")
+        text = text.strip()
+        negative = False
+        if text.startswith("(") and text.endswith(")"):
+            text, negative = text[1:-1], True
+        elif text.endswith("-"):
+            text, negative = text[:-1], True
+        value = float(text.translate(table))
+        return -value if negative else value
+    return parse
+
+
+class CsvFormat:
+    def __init__(self, encoding: str, delimiter: str, has_header: bool, header: list, columns: dict,
+                 date_formats: list, decimal: str, thousands: str,
+                 currency: str = None, symbols: str = "", codes: list = (), sampled_rows: int = 0):
+        self.encoding = encoding
+        self.delimiter = delimiter
+        self.has_header = has_header
+        self.header = header
+        self.columns = columns  # field -> column index
+        self.date_formats = date_formats  # every format that fits; the first is used
+        self.decimal = decimal
+        self.thousands = thousands
+        self.currency = currency
+        self.symbols = symbols  # currency symbols seen in amounts
+        self.codes = list(codes)  # currency codes seen in amounts
+        self.sampled_rows = sampled_rows
+
+    def describe(self) -> dict:
+        return {
+            "encoding": self.encoding,
+            "delimiter": self.delimiter,
+            "has_header": self.has_header,
+            "header": self.header,
+            "columns": self.columns,
+            "date_format": self.date_format,
+            "date_ambiguous": self.date_ambiguous,
+            "decimal": self.decimal,
+            "thousands": self.thousands,
+            "currency": self.currency,
+            "sampled_rows": self.sampled_rows,
+        }
+
+    @property
+    def date_format(self) -> str:
+        return self.date_formats[0]
+
+    @property
+    def date_ambiguous(self) -> bool:
+        return len(self.date_formats) > 1
+
+    def reader(self, f):
+        return csv.reader(f, delimiter=self.delimiter)
+
+    def settle_dates(self, values):
+        """
+        Narrows an ambiguous date format down with more of the file's dates
+        (the first rows are often all early in a month, where 03/04 reads
+        either way).
+        """
+        if self.date_ambiguous and values:
+            self.date_formats = _date_formats(values, self.date_formats, minimum=0)
+
+    def parser(self):
+        """
+        row -> expense values (amount, category, store_name, description,
+        created_at); raises ValueError for a row that doesn't fit.
+        """
+        parse_date = _date_parser(self.date_format)
+        parse_amount = _amount_parser(self.decimal, self.thousands, self.symbols, self.codes)
+        date, amount = self.columns["date"], self.columns["amount"]
+        category, store, description = (self.columns.get(f) for f in ("category", "store", "description"))
+
+        def parse(row: list) -> dict:
+            return {
+                "amount": parse_amount(_cell(row, amount)),
+                "category": _cell(row, category) or "Uncategorized",
+                "store_name": _cell(row, store),
+                "description": _cell(row, description),
+                "created_at": parse_date(_cell(row, date)),
+            }
+        return parse
+
+
+def _decode(raw: bytes, complete: bool) -> tuple:
+    for encoding in ("utf-8-sig", "cp1252"):
+        try:
+            text = codecs.getincrementaldecoder(encoding)().decode(raw, final=complete)
+            break
+        except UnicodeDecodeError:
+            continue
+    if not complete:
+        # Drop the partial last line
+        text = text[:text.rfind("\n") + 1] or text
+    return encoding, text
+
+
+def _delimiter(text: str) -> str:
+    def score(delimiter):
+        widths = Counter(len(row) for row in islice(csv.reader(io.StringIO(text), delimiter=delimiter), 50) if row)
+        if not widths:
+            return (False, 0, 0)
+        width, rows = widths.most_common(1)[0]
+        return (width > 1, rows, width)
+    return max(DELIMITERS, key=score)
+
+
+def _date_formats(values, formats=DATE_FORMATS, minimum: float = 0.9) -> list:
+    """
+    The formats (in preference order) that parse the most of values.
+    """
+    counts = {f: sum(_parses_date(f, v) for v in values) for f in formats}
+    best = max(counts.values(), default=0)
+    if not values or best < minimum * len(values):
+        example = next(iter(values), "nothing")
+        raise FormatError(f"Couldn't work out the date format (first date: {example!r})")
+    return [f for f in formats if counts[f] == best]
+
+
+def _number_format(values: list) -> tuple:
+    """
+    (decimal, thousands, currency, symbols, codes) for sampled amount strings.
+    """
+    symbols, codes = Counter(), Counter()
+    votes = Counter()
+    for value in values:
+        symbols.update(c for c in value if unicodedata.category(c) == "Sc")
+        codes.update(CURRENCY_CODE.findall(value))
+        digits = "".join(c for c in value if c.isdigit() or c in ".,")
+        dot, comma = digits.rfind("."), digits.rfind(",")
+        if dot >= 0 and comma >= 0:
+            votes["." if dot > comma else ","] += 1
+        elif dot >= 0 or comma >= 0:
+            separator = "." if dot >= 0 else ","
+            if digits.count(separator) > 1:
+                votes["," if separator == "." else "."] += 1  # only ever a thousands separator
+            elif len(digits) - max(dot, comma) - 1 != 3:
+                votes[separator] += 1
+            # else "1,234" / "1.234": could be either, no vote
+    decimal = "," if votes[","] > votes["."] else "."
+    thousands = "." if decimal == "," else ","
+    seen = symbols + codes
+    currency = seen.most_common(1)[0][0] if seen else None
+    return decimal, thousands, currency, "".join(symbols), list(codes)
+
+
+def _find_column(rows: list, exclude: set, test) -> int:
+    width = max((len(row) for row in rows), default=0)
+    scores = {
+        i: sum(test(_cell(row, i)) for row in rows)
+        for i in range(width) if i not in exclude
+    }
+    best = max(scores, key=scores.get, default=None)
+    # - 1: the first row may be a header nobody recognised
+    return best if best is not None and scores[best] >= 0.9 * len(rows) - 1 else None
+
+
+def _is_date(text: str) -> bool:
+    return bool(text) and any(_parses_date(f, text) for f in DATE_FORMATS)
+
+
+def _parses_date(date_format: str, text: str) -> bool:
+    try:
+        datetime.strptime(text, date_format)
+        return True
+    except ValueError:
+        return False
+
+
+def _is_amount(text: str) -> bool:
+    return bool(re.fullmatch(r"[(+-]?\D{0,4}\d[\d.,'  ]*\D{0,4}[)-]?", text)) and not _is_date(text)
+
+
+def sniff(path: str, date_format: str = None) -> CsvFormat:
+    """
+    Infers the format from the start of the file. date_format overrides
+    the inferred one (for day/month files that look month-first).
+    Raises FormatError when there's no usable date or amount column.
+    """
+    with open(path, "rb") as f:
+        raw = f.read(SNIFF_BYTES + 1)
+    complete = len(raw) <= SNIFF_BYTES
+    encoding, text = _decode(raw[:SNIFF_BYTES], complete)
+    delimiter = _delimiter(text)
+    rows = [row for row in islice(csv.reader(io.StringIO(text), delimiter=delimiter), SNIFF_ROWS + 1) if any(c.strip() for c in row)]
+    if not rows:
+        raise FormatError("The file is empty")
+
+    first = [_header_key(cell) for cell in rows[0]]
+    columns = {}
+    for i, name in enumerate(first):
+        for field, names in HEADER_NAMES.items():
+            if name in names and field not in columns:
+                columns[field] = i
+    has_header = "date" in columns or "amount" in columns
+    if not has_header:
+        # Header-less (or an unrecognised header): the old positional layouts
+        widths = Counter(len(row) for row in rows)
+        layout = EXPORT_LAYOUT if widths.most_common(1)[0][0] >= 6 else SIMPLE_LAYOUT
+        columns = {field: i for i, field in enumerate(layout)}
+    data = rows[1:] if has_header else rows
+
+    # Columns the header didn't name: find them by content
+    if "date" not in columns or not sum(_is_date(_cell(row, columns["date"])) for row in data):
+        columns["date"] = _find_column(data, set(columns.values()) - {columns.get("date")}, _is_date)
+    if "amount" not in columns or not sum(_is_amount(_cell(row, columns["amount"])) for row in data):
+        columns["amount"] = _find_column(data, set(columns.values()) - {columns.get("amount")} | {columns["date"]}, _is_amount)
+    if columns["date"] is None:
+        raise FormatError("Couldn't find a date column")
+    if columns["amount"] is None:
+        raise FormatError("Couldn't find an amount column")
+
+    dates = [_cell(row, columns["date"]) for row in data if _cell(row, columns["date"])]
+    if not has_header and dates and not _is_date(dates[0]):
+        # First row is a header we don't know the names of
+        has_header, data, dates = True, data[1:], dates[1:]
+    if date_format:
+        if not dates or not all(_parses_date(date_format, d) for d in dates):
+            raise FormatError(f"Dates in the file don't match {date_format}")
+        date_formats = [date_format]
+    else:
+        date_formats = _date_formats(dates)
+    decimal, thousands, currency, symbols, codes = _number_format(
+        [_cell(row, columns["amount"]) for row in data if _cell(row, columns["amount"])]
+    )
+    return CsvFormat(
+        encoding=encoding,
+        delimiter=delimiter,
+        has_header=has_header,
+        header=rows[0] if has_header else [],
+        columns={field: i for field, i in columns.items() if i is not None},
+        date_formats=date_formats,
+        decimal=decimal,
+        thousands=thousands,
+        currency=currency,
+        symbols=symbols,
+        codes=codes,
+        sampled_rows=len(data),
+    )
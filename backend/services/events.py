@@ -0,0 +1,47 @@
+"""
+In-process notifications for writes. Write endpoints publish after
+their transaction commits; caches subscribe to keep themselves current
+instead of re-reading the whole table, and the /ws hub forwards them to
+open dashboards.
+
+Events (payload keyword arguments):
+    expenses.created  rows=[row, ...]
+    expenses.updated  before=[row, ...], after=[row, ...]
+    expenses.deleted  rows=[row, ...]
+    expenses.cleared  (no payload)
+    budget.updated  budget={limit_amount, period}
+    categories.created  category={id, name, color}
+    categories.updated  category={id, name, color}, old_name=name
+    categories.deleted  category_id=id
+"""
+from collections import defaultdict
+
+_subscribers = defaultdict(list)
+
+
+def subscribe(event: str, callback):
+    _subscribers[event].append(callback)
+    return callback
+
+
+def publish(event: str, **payload):
+    for callback in list(_subscribers[event]):
+        try:
+            callback(**payload)
+        except Exception as e:
+            # A broken subscriber must never fail the write that already committed
+            print(f"Event subscriber error ({event}): {e}")
+
+
+def as_row(expense) -> dict:
+    """
+    Plain dict snapshot of an Expense, safe to keep after the session closes.
+    """
+    return {
+        "id": expense.id,
+        "amount": expense.amount,
+        "category": expense.category,
+        "description": expense.description,
+        "store_name": expense.store_name,
+        "created_at": expense.created_at,
+    }
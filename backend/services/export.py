@@ -0,0 +1,170 @@
+"""
+Expense export in several formats, always streamed from a yield_per query
+so server memory stays bounded by one chunk (one row group for Parquet):
+
+    csv      - the original spreadsheet layout (ID, Date, Amount, ...)
+    ndjson   - one JSON object per line, same keys/values as GET /expenses/
+    arrow    - Arrow IPC stream, one record batch per chunk
+    parquet  - Parquet, one row group per PARQUET_ROW_GROUP_ROWS rows
+
+Arrow and Parquet keep the types (int ids, float amounts, timestamps), so
+pandas.read_parquet / pyarrow.ipc.open_stream load them without re-parsing
+text. They need pyarrow, which is optional: without it only csv and ndjson
+are offered.
+"""
+import io
+import csv
+import os
+import importlib.util
+
+import orjson
+
+from ..database import SessionLocal
+
+CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "1000"))
+# Row groups much smaller than this make Parquet readers slow; bigger ones
+# cost server memory while they're collected
+PARQUET_ROW_GROUP_ROWS = int(os.getenv("PARQUET_ROW_GROUP_ROWS", "50000"))
+
+# format -> (media type, file extension)
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+NEEDS_PYARROW = ("arrow", "parquet")
+
+
+def available(format: str) -> bool:
+    # find_spec checks pyarrow is installed without importing it
+    return format in FORMATS and (format not in NEEDS_PYARROW or importlib.util.find_spec("pyarrow") is not None)
+
+
+def load_pyarrow():
+    # pyarrow (and NumPy with it) is slow to import and only arrow/parquet
+    # exports need it, so it stays out of the module-level imports
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+    return pyarrow
+
+
+def _schema(pyarrow):
+    # Same columns as rows.COLUMNS
+    return pyarrow.schema([
+        ("amount", pyarrow.float64()),
+        ("category", pyarrow.string()),
+        ("description", pyarrow.string()),
+        ("store_name", pyarrow.string()),
+        ("id", pyarrow.int64()),
+        ("created_at", pyarrow.timestamp("us")),
+    ])
+
+
+def _batch(pyarrow, schema, partition):
+    columns = list(zip(*partition))
+    return pyarrow.RecordBatch.from_arrays(
+        [pyarrow.array(column, type=field.type) for column, field in zip(columns, schema)],
+        schema=schema,
+    )
+
+
+class _Chunks:
+    """
+    Write-only file object for pyarrow writers; drain() hands over whatever
+    was written since the last call.
+    """
+    closed = False
+
+    def __init__(self):
+        self._parts = []
+        self._size = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._size += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._size
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data, self._parts = b"".join(self._parts), []
+        return data
+
+
+def _csv(partitions):
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(['ID', 'Date', 'Amount', 'Category', 'Store', 'Description'])
+    for partition in partitions:
+        writer.writerows(
+            (row.id, row.created_at.strftime("%Y-%m-%d"), row.amount, row.category, row.store_name, row.description)
+            for row in partition
+        )
+        yield output.getvalue().encode()
+        output.seek(0)
+        output.truncate()
+    if output.tell():
+        yield output.getvalue().encode()
+
+
+def _ndjson(partitions):
+    for partition in partitions:
+        keys = partition[0]._fields
+        yield b"".join(orjson.dumps(dict(zip(keys, row)), option=orjson.OPT_APPEND_NEWLINE) for row in partition)
+
+
+def _arrow(partitions):
+    pyarrow = load_pyarrow()
+    schema = _schema(pyarrow)
+    sink = _Chunks()
+    with pyarrow.ipc.new_stream(sink, schema) as writer:
+        for partition in partitions:
+            writer.write_batch(_batch(pyarrow, schema, partition))
+            yield sink.drain()
+    # End-of-stream marker (and the schema, for an empty export)
+    yield sink.drain()
+
+
+def _parquet(partitions):
+    pyarrow = load_pyarrow()
+    schema = _schema(pyarrow)
+    sink = _Chunks()
+    pending, pending_rows = [], 0
+    with pyarrow.parquet.ParquetWriter(sink, schema) as writer:
+        for partition in partitions:
+            pending.append(_batch(pyarrow, schema, partition))
+            pending_rows += len(partition)
+            if pending_rows >= PARQUET_ROW_GROUP_ROWS:
+                writer.write_table(pyarrow.Table.from_batches(pending), row_group_size=pending_rows)
+                pending, pending_rows = [], 0
+                yield sink.drain()
+        if pending:
+            writer.write_table(pyarrow.Table.from_batches(pending), row_group_size=pending_rows)
+    # Footer
+    yield sink.drain()
+
+
+WRITERS = {"csv": _csv, "ndjson": _ndjson, "arrow": _arrow, "parquet": _parquet}
+
+
+def stream(query, format: str = "csv"):
+    """
+    Generator of encoded chunks for a rows.select_rows() query. Opens its
+    own session: a StreamingResponse body outlives the request's
+    dependencies.
+    """
+    query = query.execution_options(yield_per=CHUNK_ROWS)
+    db = SessionLocal()
+    try:
+        for chunk in WRITERS[format](db.execute(query).partitions()):
+            if chunk:
+                yield chunk
+    finally:
+        db.close()
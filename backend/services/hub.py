@@ -0,0 +1,157 @@
+"""
+Pushes compact change events to connected dashboards over /ws.
+
+Write endpoints publish through services/events.py; the hub turns those into
+JSON messages and fans them out to every client's bounded queue. A client
+whose queue fills up (slow network, frozen tab) is disconnected instead of
+buffering without limit, and reconnects/refetches on its own.
+
+Messages:
+    {"type": "expense.created", "expenses": [...]}
+    {"type": "expense.updated", "expenses": [...]}
+    {"type": "expense.deleted", "ids": [...]}
+    {"type": "expense.cleared"}
+    {"type": "budget.updated", "budget": {...}}
+    {"type": "category.created", "category": {...}}
+    {"type": "category.updated", "category": {...}}
+    {"type": "category.deleted", "id": 3}
+
+Reader workers (multi-worker mode) never see the writer's events, so there
+the hub tails the expense change log instead and sends "expense.changed"
+(created or updated) and "expense.deleted"/"expense.cleared".
+"""
+import os
+import json
+import asyncio
+
+from fastapi import WebSocket, WebSocketDisconnect
+from starlette.concurrency import run_in_threadpool
+
+from .. import metrics, workers
+from ..database import SessionLocal
+from . import events, changes
+
+QUEUE_SIZE = int(os.getenv("WS_QUEUE_SIZE", "100"))
+POLL_SECONDS = float(os.getenv("WS_POLL_SECONDS", "1"))
+# 1013 = "try again later"
+SLOW_CLIENT_CLOSE_CODE = 1013
+
+DROPPED = metrics.register(metrics.Counter(
+    "ws_clients_dropped_total", "WebSocket clients disconnected for falling behind.", ()
+))
+
+
+def _json_default(value):
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+
+class Client:
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.overflowed = asyncio.Event()
+
+
+class Hub:
+    def __init__(self):
+        self.clients = set()
+        self._loop = None
+        self._poller = None
+
+    def broadcast(self, message: dict):
+        """
+        Safe to call from any thread (endpoints run in the threadpool).
+        """
+        if not self.clients or self._loop is None:
+            return
+        text = json.dumps(message, default=_json_default)
+        self._loop.call_soon_threadsafe(self._fan_out, text)
+
+    def _fan_out(self, text: str):
+        for client in list(self.clients):
+            try:
+                client.queue.put_nowait(text)
+            except asyncio.QueueFull:
+                self.clients.discard(client)
+                client.overflowed.set()
+                DROPPED.inc()
+
+    async def serve(self, websocket: WebSocket):
+        await websocket.accept()
+        self._loop = asyncio.get_running_loop()
+        client = Client(websocket)
+        self.clients.add(client)
+        if workers.ROLE == "reader" and self._poller is None:
+            self._poller = asyncio.create_task(self._poll_change_log())
+
+        sender = asyncio.create_task(self._send(client))
+        receiver = asyncio.create_task(self._receive(client))
+        overflow = asyncio.create_task(client.overflowed.wait())
+        try:
+            await asyncio.wait({sender, receiver, overflow}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            self.clients.discard(client)
+            for task in (sender, receiver, overflow):
+                task.cancel()
+
+        if client.overflowed.is_set():
+            try:
+                await websocket.close(code=SLOW_CLIENT_CLOSE_CODE)
+            except Exception:
+                pass  # already gone
+
+    async def _send(self, client: Client):
+        while True:
+            await client.websocket.send_text(await client.queue.get())
+
+    async def _receive(self, client: Client):
+        # Clients don't send anything meaningful; this just notices disconnects
+        try:
+            while True:
+                await client.websocket.receive_text()
+        except WebSocketDisconnect:
+            pass
+
+    async def _poll_change_log(self):
+        seq = await run_in_threadpool(self._current_seq)
+        while True:
+            await asyncio.sleep(POLL_SECONDS)
+            if not self.clients:
+                continue
+            try:
+                seq = await run_in_threadpool(self._publish_changes, seq)
+            except Exception as e:
+                print(f"WebSocket change poll failed: {e}")
+
+    def _current_seq(self) -> int:
+        db = SessionLocal()
+        try:
+            return changes.current_seq(db)
+        finally:
+            db.close()
+
+    def _publish_changes(self, since: int) -> int:
+        db = SessionLocal()
+        try:
+            delta = changes.changes_since(db, since, QUEUE_SIZE * 10)
+            if delta["reset"]:
+                self.broadcast({"type": "expense.cleared"})
+            if delta["changed"]:
+                self.broadcast({"type": "expense.changed", "expenses": [events.as_row(e) for e in delta["changed"]]})
+            if delta["deleted"]:
+                self.broadcast({"type": "expense.deleted", "ids": delta["deleted"]})
+            return delta["seq"]
+        finally:
+            db.close()
+
+
+hub = Hub()
+
+events.subscribe("expenses.created", lambda rows: hub.broadcast({"type": "expense.created", "expenses": rows}))
+events.subscribe("expenses.updated", lambda before, after: hub.broadcast({"type": "expense.updated", "expenses": after}))
+events.subscribe("expenses.deleted", lambda rows: hub.broadcast({"type": "expense.deleted", "ids": [r["id"] for r in rows]}))
+events.subscribe("expenses.cleared", lambda: hub.broadcast({"type": "expense.cleared"}))
+events.subscribe("budget.updated", lambda budget: hub.broadcast({"type": "budget.updated", "budget": budget}))
+events.subscribe("categories.created", lambda category: hub.broadcast({"type": "category.created", "category": category}))
+events.subscribe("categories.updated", lambda category, old_name: hub.broadcast({"type": "category.updated", "category": category}))
+events.subscribe("categories.deleted", lambda category_id: hub.broadcast({"type": "category.deleted", "id": category_id}))
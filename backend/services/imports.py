@@ -0,0 +1,231 @@
+"""
+CSV imports as background jobs.
+
+POST /expenses/import only stores the upload (under IMPORT_DIR), sniffs its
+format from the first rows (see csv_format.py) and queues a job; one worker
+thread parses the file CHUNK rows at a time with that format, so imports
+never run inside a request and two imports never race each other. Progress
+is kept on the job (GET /imports/{id}).
+
+Every imported row gets a fingerprint: a hash of its date, amount,
+normalized store and description, plus how many identical rows came before
+it in the same file (two coffees on the same day are two expenses, and
+re-importing that file still matches both). expenses.fingerprint has a
+unique index; each chunk checks its fingerprints with one IN query and
+skips the ones already stored, so overlapping bank exports don't duplicate.
+"""
+import os
+import time
+import uuid
+import queue
+import hashlib
+import threading
+from datetime import datetime
+
+from sqlalchemy import select
+
+from ..database import SessionLocal
+from ..models import Expense
+from . import bulk, csv_format, events, suggestions
+
+IMPORT_DIR = os.getenv("IMPORT_DIR", "imports")
+CHUNK = int(os.getenv("IMPORT_CHUNK", "1000"))
+PAUSE_SECONDS = float(os.getenv("IMPORT_PAUSE_SECONDS", "0.01"))
+# Row errors kept on the job; the rest are only counted
+MAX_ERRORS = 100
+# Finished jobs kept for status lookups
+KEEP_JOBS = 20
+
+
+def _normalize(text) -> str:
+    return " ".join((text or "").lower().split())
+
+
+def row_key(day: str, amount, store, description) -> str:
+    """
+    What makes two rows "the same expense": day (YYYY-MM-DD), amount to the
+    cent, and store/description ignoring case and spacing.
+    """
+    return "\x1f".join((day, f"{float(amount):.2f}", _normalize(store), _normalize(description)))
+
+
+def fingerprint(key: str, seen: dict) -> str:
+    """
+    Fingerprint for the next occurrence of key; seen counts occurrences
+    so far (one dict per file).
+    """
+    occurrence = seen.get(key, 0)
+    seen[key] = occurrence + 1
+    return hashlib.blake2b(f"{key}\x1f{occurrence}".encode(), digest_size=16).hexdigest()
+
+
+class ImportJob:
+    def __init__(self, filename: str, path: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.filename = filename
+        self.path = path
+        self.format = None  # csv_format.CsvFormat
+        self.state = "queued"  # queued -> importing -> done | failed
+        self.total = 0
+        self.processed = 0
+        self.imported = 0
+        self.skipped = 0  # duplicates of rows already stored
+        self.categorized = 0  # uncategorized rows given a suggested category
+        self.failed = 0
+        self.errors = []
+        self.error = None
+        self.started_at = datetime.now()
+        self.finished_at = None
+
+    def status(self) -> dict:
+        return {
+            "id": self.id,
+            "filename": self.filename,
+            "state": self.state,
+            "total": self.total,
+            "processed": self.processed,
+            "imported": self.imported,
+            "skipped": self.skipped,
+            "categorized": self.categorized,
+            "failed": self.failed,
+            "progress": round(self.processed / self.total, 3) if self.total else float(self.state == "done"),
+            "errors": self.errors,
+            "format": self.format.describe() if self.format else None,
+            "error": self.error,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+_jobs = {}
+_lock = threading.Lock()
+_queue = queue.Queue()
+_worker = None
+
+
+def start(upload, filename: str, date_format: str = None) -> ImportJob:
+    """
+    Stores the uploaded file object, works out its format and queues its
+    import. Raises csv_format.FormatError (and keeps nothing) when the
+    file has no usable date or amount column.
+    """
+    global _worker
+    os.makedirs(IMPORT_DIR, exist_ok=True)
+    job = ImportJob(filename, None)
+    job.path = os.path.join(IMPORT_DIR, f"{job.id}.csv")
+    with open(job.path, "wb") as f:
+        while chunk := upload.read(1024 * 1024):
+            f.write(chunk)
+    try:
+        job.format = csv_format.sniff(job.path, date_format)
+    except Exception:
+        os.remove(job.path)
+        raise
+
+    with _lock:
+        _jobs[job.id] = job
+        finished = [j for j in _jobs.values() if j.finished_at is not None]
+        for old in sorted(finished, key=lambda j: j.started_at)[:-KEEP_JOBS]:
+            del _jobs[old.id]
+        if _worker is None:
+            _worker = threading.Thread(target=_work, name="import-worker", daemon=True)
+            _worker.start()
+    _queue.put(job)
+    return job
+
+
+def get(job_id: str):
+    return _jobs.get(job_id)
+
+
+def _work():
+    while True:
+        _run(_queue.get())
+
+
+def _run(job: ImportJob):
+    try:
+        job.state = "importing"
+        _import(job)
+        job.state = "done"
+        os.remove(job.path)
+    except Exception as e:
+        # The stored file stays in IMPORT_DIR for a look
+        print(f"Import {job.id} failed: {e}")
+        job.state, job.error = "failed", str(e)
+    finally:
+        job.finished_at = datetime.now()
+
+
+def _error(job: ImportJob, line: int, e: Exception):
+    job.failed += 1
+    if len(job.errors) < MAX_ERRORS:
+        job.errors.append(f"Row {line}: {e}")
+
+
+def _import(job: ImportJob):
+    fmt = job.format
+    skip = 1 if fmt.has_header else 0
+    # Counting pass; also collects the distinct dates when the first rows
+    # couldn't tell day/month order apart
+    dates, column = set(), fmt.columns["date"]
+    with open(job.path, newline="", encoding=fmt.encoding) as f:
+        rows = 0
+        for row in fmt.reader(f):
+            rows += 1
+            if fmt.date_ambiguous and column < len(row):
+                dates.add(row[column].strip())
+    job.total = max(rows - skip, 0)
+    if skip and fmt.header:
+        dates.discard(fmt.header[column].strip())
+    fmt.settle_dates(dates)
+
+    parse = fmt.parser()
+    seen = {}
+    with open(job.path, newline="", encoding=fmt.encoding) as f:
+        reader = fmt.reader(f)
+        if skip:
+            next(reader, None)
+        chunk = []
+        for line, row in enumerate(reader, start=1 + skip):
+            chunk.append((line, row))
+            if len(chunk) >= CHUNK:
+                _import_chunk(job, chunk, parse, seen)
+                chunk = []
+                time.sleep(PAUSE_SECONDS)  # let other writers take the lock
+        if chunk:
+            _import_chunk(job, chunk, parse, seen)
+
+
+def _import_chunk(job: ImportJob, chunk: list, parse, seen: dict):
+    values = []
+    for line, row in chunk:
+        if not any(cell.strip() for cell in row):
+            continue
+        try:
+            value = parse(row)
+        except Exception as e:
+            _error(job, line, e)
+            continue
+        key = row_key(value["created_at"].date().isoformat(), value["amount"], value["store_name"], value["description"])
+        value["fingerprint"] = fingerprint(key, seen)
+        values.append(value)
+
+    db = SessionLocal()
+    try:
+        # One set-based existence check per chunk
+        stored = set(db.scalars(
+            select(Expense.fingerprint).where(Expense.fingerprint.in_([v["fingerprint"] for v in values]))
+        ))
+        new = [v for v in values if v["fingerprint"] not in stored]
+        job.categorized += suggestions.fill(db, new)
+        rows = bulk.insert_values(db, new)
+        db.commit()
+    finally:
+        db.close()
+
+    job.processed += len(chunk)
+    job.imported += len(rows)
+    job.skipped += len(values) - len(new)
+    if rows:
+        events.publish("expenses.created", rows=rows)
@@ -0,0 +1,55 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+_llm = None
+
+
+class GeminiLLM:
+    """
+    Thin wrapper around the Gemini SDK. The SDK is imported on first use so
+    the app starts fine without it when no GEMINI_API_KEY is configured.
+    """
+
+    def __init__(self, api_key: str, model_name: str = None):
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(model_name or os.getenv("GEMINI_MODEL", "gemini-1.5-flash"))
+
+    def stream(self, prompt: str):
+        for chunk in self.model.generate_content(prompt, stream=True):
+            yield chunk.text
+
+
+class FakeLLM:
+    """
+    Local stand-in for tests: streams canned chunks without any network call.
+    """
+
+    def __init__(self, chunks=None):
+        self.chunks = chunks or ["This ", "is ", "a ", "fake ", "answer."]
+        self.prompts = []
+
+    def stream(self, prompt: str):
+        self.prompts.append(prompt)
+        for chunk in self.chunks:
+            yield chunk
+
+
+def get_llm():
+    """
+    Dependency returning the shared LLM client, or None if no key is set.
+    """
+    global _llm
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        return None
+    if _llm is None:
+        try:
+            _llm = GeminiLLM(api_key)
+        except Exception as e:
+            print(f"LLM unavailable: {e}")
+            return None
+    return _llm
@@ -0,0 +1,173 @@
+"""
+Chunked expense deletion ("purge") in a background thread.
+
+One DELETE over a big table holds SQLite's write lock for seconds, so every
+other write times out behind it. A purge deletes CHUNK rows per
+transaction and pauses between chunks, letting queued writes in. Progress
+is kept on the job (GET /expenses/purge/{id}).
+
+With vacuum=True the freed pages are handed back to the filesystem
+afterwards: a few pages per step with PRAGMA incremental_vacuum, or one
+full VACUUM the first time to switch an older database to
+auto_vacuum=INCREMENTAL.
+"""
+import os
+import time
+import uuid
+import threading
+from datetime import datetime
+
+from sqlalchemy import delete, func, select, text
+
+from ..database import SessionLocal, engine
+from ..models import Expense
+from . import bulk, changes, events
+
+CHUNK = int(os.getenv("PURGE_CHUNK", "2000"))
+PAUSE_SECONDS = float(os.getenv("PURGE_PAUSE_SECONDS", "0.02"))
+VACUUM_PAGES = int(os.getenv("PURGE_VACUUM_PAGES", "500"))
+# Finished jobs kept for status lookups
+KEEP_JOBS = 20
+
+
+class PurgeRunning(Exception):
+    def __init__(self, job):
+        super().__init__(f"Purge {job.id} is still running")
+        self.job = job
+
+
+class PurgeJob:
+    def __init__(self, criteria, vacuum: bool):
+        self.id = uuid.uuid4().hex[:12]
+        self.criteria = criteria  # schemas.ExpenseFilter, or None for everything
+        self.vacuum = vacuum
+        self.state = "pending"  # pending -> deleting -> vacuuming -> done | failed
+        self.total = 0
+        self.deleted = 0
+        self.freed_pages = 0
+        self.error = None
+        self.started_at = datetime.now()
+        self.finished_at = None
+
+    def status(self) -> dict:
+        return {
+            "id": self.id,
+            "state": self.state,
+            "total": self.total,
+            "deleted": self.deleted,
+            "progress": round(self.deleted / self.total, 3) if self.total else 1.0,
+            "vacuum": self.vacuum,
+            "freed_pages": self.freed_pages,
+            "error": self.error,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+_jobs = {}
+_lock = threading.Lock()
+
+
+def start(criteria=None, vacuum: bool = False) -> PurgeJob:
+    """
+    Starts a purge of the expenses matching criteria (all when None).
+    Raises PurgeRunning while another purge is in progress.
+    """
+    with _lock:
+        for job in _jobs.values():
+            if job.finished_at is None:
+                raise PurgeRunning(job)
+        job = PurgeJob(criteria, vacuum)
+        _jobs[job.id] = job
+        for old in sorted(_jobs.values(), key=lambda j: j.started_at)[:-KEEP_JOBS]:
+            del _jobs[old.id]
+    threading.Thread(target=_run, args=(job,), name=f"purge-{job.id}", daemon=True).start()
+    return job
+
+
+def get(job_id: str):
+    return _jobs.get(job_id)
+
+
+def _run(job: PurgeJob):
+    try:
+        _delete(job)
+        if job.vacuum:
+            job.state = "vacuuming"
+            _compact(job)
+        job.state = "done"
+    except Exception as e:
+        print(f"Purge {job.id} failed: {e}")
+        job.state, job.error = "failed", str(e)
+    finally:
+        job.finished_at = datetime.now()
+
+
+def _delete(job: PurgeJob):
+    db = SessionLocal()
+    try:
+        # Only rows that existed when the purge started; new writes are left alone
+        last_id = db.query(func.max(Expense.id)).scalar() or 0
+        where = Expense.id <= last_id
+        if job.criteria is not None:
+            where = bulk.condition(db, job.criteria) & where
+        job.total = db.query(func.count(Expense.id)).filter(where).scalar()
+        db.commit()
+        job.state = "deleting"
+
+        while True:
+            if job.criteria is None:
+                # Everything goes: no need to read the rows, listeners get one "cleared"
+                chunk = select(Expense.id).where(where).order_by(Expense.id).limit(CHUNK).correlate(None).scalar_subquery()
+                count = db.execute(delete(Expense).where(Expense.id.in_(chunk))).rowcount
+                rows = None
+            else:
+                rows = bulk.rows_matching(db, where, limit=CHUNK)
+                count = len(rows)
+                if rows:
+                    db.execute(delete(Expense).where(Expense.id.in_([row["id"] for row in rows])))
+
+            if count == 0:
+                break
+            db.commit()
+            job.deleted += count
+            if rows:
+                events.publish("expenses.deleted", rows=rows)
+            time.sleep(PAUSE_SECONDS)  # let other writers take the lock
+
+        if job.criteria is None:
+            changes.record_clear(db)
+            survivors = bulk.rows_matching(db, Expense.id > last_id)
+            db.commit()
+            events.publish("expenses.cleared")
+            if survivors:
+                events.publish("expenses.created", rows=survivors)
+    finally:
+        db.close()
+
+
+def _compact(job: PurgeJob):
+    if engine.dialect.name != "sqlite":
+        return
+    # VACUUM can't run inside a transaction
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        before = conn.execute(text("PRAGMA page_count")).scalar()
+        # FTS5 keeps deleted tokens until its segments merge; after a full purge
+        # rebuilding from the (now small) table is cheaper than merging
+        if conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'expenses_fts'")).first():
+            command = "rebuild" if job.criteria is None else "optimize"
+            conn.execute(text(f"INSERT INTO expenses_fts (expenses_fts) VALUES ('{command}')"))
+        if conn.execute(text("PRAGMA auto_vacuum")).scalar() != 2:
+            # One-off: switch to incremental mode (only takes effect through VACUUM)
+            conn.execute(text("PRAGMA auto_vacuum = INCREMENTAL"))
+            conn.execute(text("VACUUM"))
+        else:
+            while conn.execute(text("PRAGMA freelist_count")).scalar() > 0:
+                # It frees one page per step and execute() only steps once;
+                # executescript() runs it to the end
+                conn.connection.dbapi_connection.executescript(f"PRAGMA incremental_vacuum({VACUUM_PAGES})")
+                job.freed_pages = before - conn.execute(text("PRAGMA page_count")).scalar()
+                time.sleep(PAUSE_SECONDS)
+        # In WAL mode the file only shrinks once the log is checkpointed
+        conn.execute(text("PRAGMA wal_checkpoint(TRUNCATE)"))
+        job.freed_pages = before - conn.execute(text("PRAGMA page_count")).scalar()
@@ -0,0 +1,132 @@
+"""
+Recurring charge (subscription, rent, utility) detection.
+
+Expenses are bucketed by (normalized store, approximate amount) in a hash
+index, so charges that repeat land in the same bucket in one pass. Each
+bucket's dates are then sorted and the gaps checked against known cadences.
+Nothing is compared pairwise, so the whole table is scanned in near-linear
+time.
+"""
+from datetime import date, timedelta
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from ..models import Expense
+
+# name -> (nominal period in days, allowed deviation in days)
+CADENCES = {
+    "weekly": (7, 1.5),
+    "biweekly": (14, 2.5),
+    "monthly": (30.44, 4),
+    "quarterly": (91.3, 10),
+    "yearly": (365.25, 20),
+}
+# Amounts within ~10% of each other share a bucket
+AMOUNT_BUCKET = np.log(1.1)
+MIN_OCCURRENCES = 3
+# Share of gaps that must match the cadence (allows a skipped or late month)
+MIN_REGULARITY = 0.75
+DAYS_PER_MONTH = 30.44
+
+
+def _bucket_index(stores, amounts: np.ndarray) -> dict:
+    """
+    (normalized store, amount bucket) -> list of row positions.
+    """
+    buckets = np.floor(np.log(np.clip(amounts, 0.01, None)) / AMOUNT_BUCKET).astype(np.int64)
+    index = {}
+    for position, key in enumerate(zip(stores, buckets.tolist())):
+        index.setdefault(key, []).append(position)
+    return index
+
+
+def _match_cadence(gaps: np.ndarray):
+    """
+    Returns (cadence name, period in days) for the gaps, or None.
+    """
+    gaps = gaps[gaps >= 1]  # same-day duplicates aren't a new period
+    if len(gaps) < MIN_OCCURRENCES - 1:
+        return None
+    typical = float(np.median(gaps))
+    for name, (period, tolerance) in CADENCES.items():
+        if abs(typical - period) <= tolerance:
+            regular = np.abs(gaps - period) <= tolerance
+            if regular.mean() >= MIN_REGULARITY:
+                return name, period
+            return None
+    return None
+
+
+def _detect(positions: np.ndarray, days: np.ndarray, cents: np.ndarray):
+    """
+    Returns (sorted positions, cadence, period) for a bucket, or None.
+    """
+    positions = positions[np.argsort(days[positions])]
+    match = _match_cadence(np.diff(days[positions]))
+    if match:
+        return (positions, *match)
+
+    # A busy store buries a fixed-price subscription among other purchases
+    # of similar size, so retry with just the most common exact amount
+    values, counts = np.unique(cents[positions], return_counts=True)
+    if counts.max() >= MIN_OCCURRENCES and counts.max() < len(positions):
+        positions = positions[cents[positions] == values[np.argmax(counts)]]
+        match = _match_cadence(np.diff(days[positions]))
+        if match:
+            return (positions, *match)
+    return None
+
+
+def find_recurring(db: Session, today: date = None) -> dict:
+    today = today or date.today()
+    # Core select: plain tuples, no ORM row processing for the full-table scan
+    rows = db.execute(
+        select(Expense.id, func.lower(func.trim(Expense.store_name)), Expense.amount, func.julianday(Expense.created_at))
+        .where(Expense.store_name.isnot(None), func.trim(Expense.store_name) != "")
+    ).all()
+    if not rows:
+        return {"recurring": [], "monthly_committed": 0.0}
+
+    ids, stores, amounts, days = zip(*rows)
+    ids = np.asarray(ids, dtype=np.int64)
+    amounts = np.asarray(amounts, dtype=float)
+    cents = np.round(amounts * 100).astype(np.int64)
+    days = np.asarray(days, dtype=float)
+
+    found = []
+    for positions in _bucket_index(stores, amounts).values():
+        if len(positions) < MIN_OCCURRENCES:
+            continue
+        detected = _detect(np.asarray(positions), days, cents)
+        if detected:
+            found.append(detected)
+    if not found:
+        return {"recurring": [], "monthly_committed": 0.0}
+
+    # Display fields come from the first and latest charge of each series
+    wanted = {int(ids[p[0]]) for p, _, _ in found} | {int(ids[p[-1]]) for p, _, _ in found}
+    by_id = {e.id: e for e in db.query(Expense).filter(Expense.id.in_(wanted))}
+
+    results = []
+    for positions, cadence, period in found:
+        first, last = by_id[int(ids[positions[0]])], by_id[int(ids[positions[-1]])]
+        amount = float(np.median(amounts[positions]))
+        results.append({
+            "store_name": last.store_name,
+            "category": last.category,
+            "amount": round(amount, 2),
+            "cadence": cadence,
+            "occurrences": len(positions),
+            "first_seen": first.created_at,
+            "last_seen": last.created_at,
+            "next_expected": (last.created_at + timedelta(days=period)).date(),
+            "monthly_cost": round(amount * DAYS_PER_MONTH / period, 2),
+            # Missed two cycles in a row -> probably cancelled
+            "active": (today - last.created_at.date()).days <= 2 * period,
+        })
+
+    results.sort(key=lambda item: -item["monthly_cost"])
+    committed = sum(item["monthly_cost"] for item in results if item["active"])
+    return {"recurring": results, "monthly_committed": round(committed, 2)}
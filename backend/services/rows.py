@@ -0,0 +1,32 @@
+"""
+Expenses as plain dicts from a column-only query: no ORM objects and no
+per-row schema validation. Keys and values match schemas.Expense
+(verify_fast_json.py checks that), so list endpoints can hand them straight
+to responses.FastJSONResponse.
+"""
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..models import Category, Expense
+from . import categories
+
+# schemas.Expense fields, in the same order
+COLUMNS = (
+    Expense.amount,
+    categories.name_column().label("category"),
+    Expense.description,
+    Expense.store_name,
+    Expense.id,
+    Expense.created_at,
+)
+
+
+def select_rows():
+    return select(*COLUMNS).outerjoin(Category, Category.id == Expense.category_id)
+
+
+def fetch(db: Session, query) -> list:
+    result = db.execute(query)
+    keys = list(result.keys())
+    # zip() over plain rows is ~2x faster than .mappings() at 10k rows
+    return [dict(zip(keys, row)) for row in result]
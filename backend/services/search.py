@@ -0,0 +1,96 @@
+"""
+Full-text search over expense store names and descriptions.
+
+Backed by the expenses_fts FTS5 index (see migrations.add_search_index).
+Every word of the query must match the start of a word in the text, so
+"whole fo" finds "Whole Foods". Databases without the index fall back
+to LIKE, which scans but gives the same kind of answers.
+"""
+import re
+
+from sqlalchemy import column, literal_column, or_, select, table, text, func
+from sqlalchemy.orm import Session
+
+from ..models import Expense
+from . import rows
+
+WORD = re.compile(r"\w+", re.UNICODE)
+# Store hits count for more than description hits
+STORE_WEIGHT, DESCRIPTION_WEIGHT = 4.0, 1.0
+
+fts = table("expenses_fts", column("rowid"))
+_available = {}  # database url -> has the FTS index
+
+
+def words(query: str) -> list:
+    return [word.lower() for word in WORD.findall(query or "")]
+
+
+def match_expression(query: str, column_name: str = None) -> str:
+    """
+    FTS5 query where each word is a quoted prefix, e.g. 'whole fo' ->
+    '"whole"* "fo"*'. Quoting keeps user input from being read as FTS syntax.
+    """
+    terms = " ".join(f'"{word}"*' for word in words(query))
+    return f"{column_name} : ({terms})" if column_name else terms
+
+
+def matches_text(query: str, value: str) -> bool:
+    """
+    The same prefix rule in Python, for filtering values already in memory.
+    """
+    targets = words(value)
+    return all(any(target.startswith(word) for target in targets) for word in words(query))
+
+
+def available(db: Session) -> bool:
+    bind = db.get_bind()
+    key = bind.url.render_as_string(hide_password=True)
+    if key not in _available:
+        _available[key] = bind.dialect.name == "sqlite" and db.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = 'expenses_fts'")
+        ).first() is not None
+    return _available[key]
+
+
+def _matching_ids(expression: str):
+    return select(fts.c.rowid).where(text("expenses_fts MATCH :expression").bindparams(expression=expression))
+
+
+def _like(text_column, query: str):
+    return func.lower(func.coalesce(text_column, "")).contains(" ".join(words(query)))
+
+
+def store_filter(db: Session, store: str):
+    """
+    Condition on Expense for store names matching `store`.
+    """
+    if available(db):
+        return Expense.id.in_(_matching_ids(match_expression(store, "store_name")))
+    return _like(Expense.store_name, store)
+
+
+def search(db: Session, query: str, start=None, end=None, skip: int = 0, limit: int = 100) -> list:
+    """
+    Expenses matching `query` as schemas.Expense-shaped dicts, best match first.
+    """
+    if not words(query):
+        return []
+    if available(db):
+        rank = literal_column(f"bm25(expenses_fts, {STORE_WEIGHT}, {DESCRIPTION_WEIGHT})").label("rank")
+        matched = select(fts.c.rowid, rank).where(
+            text("expenses_fts MATCH :expression").bindparams(expression=match_expression(query))
+        ).subquery()
+        results = rows.select_rows().join(matched, matched.c.rowid == Expense.id)
+        order = [matched.c.rank, Expense.created_at.desc()]
+    else:
+        results = rows.select_rows().where(or_(
+            _like(Expense.store_name, query), _like(Expense.description, query)
+        ))
+        order = [Expense.created_at.desc()]
+
+    if start:
+        results = results.where(Expense.created_at >= start)
+    if end:
+        results = results.where(Expense.created_at < end)
+    return rows.fetch(db, results.order_by(*order).offset(skip).limit(limit))
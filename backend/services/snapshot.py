@@ -0,0 +1,472 @@
+"""
+Columnar in-memory copy of the expenses table for analytics.
+
+One NumPy array per column (id, created_at, amount, category code, store
+code), with category and store names dictionary-encoded. Loaded lazily on
+first use, kept current from the write events and saved as .npy files that
+are memory-mapped back on restart, so sums and group-bys become array
+reductions instead of SQLite scans.
+
+Other processes (multi-worker mode, scripts) don't publish events here, so
+every SNAPSHOT_CHECK_SECONDS the change log's seq is compared with the one
+the snapshot is synced to, and only the changed rows are pulled in.
+"""
+import os
+import json
+import time
+import threading
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import func, literal, select, true
+from sqlalchemy.orm import Session
+
+from .. import database, workers
+from ..models import Expense, Category, DatabaseToken, ExpenseChange
+from . import events, changes, search, categories as category_names
+
+ENABLED = os.getenv("EXPENSE_SNAPSHOT", "1") != "0"
+CACHE_DIR = os.getenv("EXPENSE_SNAPSHOT_CACHE", "expense_snapshot")
+# Relative paths sit next to the default database, not wherever the server was started
+if CACHE_DIR:
+    CACHE_DIR = os.path.join(database.ROOT_DIR, CACHE_DIR)
+CHECK_SECONDS = float(os.getenv("SNAPSHOT_CHECK_SECONDS", "5"))
+# Bigger deltas than this are cheaper to reload from scratch
+MAX_SYNC_CHANGES = 10_000
+
+COLUMNS = ("id", "created_at", "amount", "category", "store")
+# Deleted rows stay in place (live=False, amount 0) until this share of the
+# arrays is dead, then the columns are compacted in one pass
+MAX_DEAD_SHARE = 0.25
+# julianday() of 1970-01-01 00:00
+UNIX_EPOCH_JULIAN = 2440587.5
+
+
+def _database_name(db: Session) -> str:
+    return db.get_bind().url.render_as_string(hide_password=True)
+
+
+def _datetimes(values) -> np.ndarray:
+    return np.asarray(values, dtype="datetime64[us]")
+
+
+class Dictionary:
+    """
+    Dictionary encoding for a string column: code -> name and name -> code.
+    """
+
+    def __init__(self, names=()):
+        self.names = list(names)
+        self.codes = {name: code for code, name in enumerate(self.names)}
+
+    def encode(self, values) -> np.ndarray:
+        codes = np.empty(len(values), dtype=np.int32)
+        for i, value in enumerate(values):
+            code = self.codes.get(value)
+            if code is None:
+                code = self.codes[value] = len(self.names)
+                self.names.append(value)
+            codes[i] = code
+        return codes
+
+    def matching(self, predicate) -> np.ndarray:
+        """
+        Codes whose (lower-cased) name satisfies predicate.
+        """
+        return np.asarray(
+            [code for code, name in enumerate(self.names) if predicate((name or "").lower())], dtype=np.int32
+        )
+
+
+class ExpenseSnapshot:
+    def __init__(self, cache_dir: str = CACHE_DIR):
+        self.cache_dir = cache_dir
+        self._lock = threading.RLock()
+        self.loaded = False
+        self.checked_at = 0.0
+        self.seq = 0  # change log position the arrays reflect
+        self.database = None
+        self.token = None  # DatabaseToken of the database the arrays came from
+        self._clear()
+
+    def _clear(self):
+        self.id = np.empty(0, dtype=np.int64)
+        self.created_at = np.empty(0, dtype="datetime64[us]")
+        self.amount = np.empty(0)
+        self.category = np.empty(0, dtype=np.int32)
+        self.store = np.empty(0, dtype=np.int32)
+        self.live = np.empty(0, dtype=bool)
+        self.dead = 0  # rows with live=False
+        # name -> writable array the column is a view of, with spare room at the end
+        self._buffers = {}
+        self.categories = Dictionary()
+        self.category_ids = {}  # category id -> code in self.categories
+        self.stores = Dictionary()
+
+    def __len__(self):
+        return len(self.id)  # including deleted rows not compacted yet
+
+    # --- Loading ---
+
+    def ensure_loaded(self, db: Session):
+        with self._lock:
+            if self.loaded and time.monotonic() - self.checked_at < CHECK_SECONDS:
+                return self
+            seq, token, names = self._check(db)
+            self.checked_at = time.monotonic()
+            if not self.loaded or token != self.token:
+                # First check, or the file behind the URL was replaced since
+                self.loaded = False
+                self.token = token
+                self._load_cache(db, seq)
+            # Renames first, so synced rows carrying a new name land on its code
+            self.rename_categories(names)
+            if seq != self.seq or not self.loaded:
+                self.sync(db, seq)
+                self.rename_categories(names)  # ids for anything just loaded
+            return self
+
+    def _check(self, db: Session) -> tuple:
+        """
+        (change log seq, database token, {category id: name}) in one
+        statement. Renames aren't in the change log (nor seen by other
+        processes' events), so each check re-reads the small categories table.
+        """
+        seq = select(func.max(ExpenseChange.seq)).scalar_subquery()
+        token = select(DatabaseToken.token).limit(1).scalar_subquery()
+        # One row even with no categories
+        one = select(literal(1)).subquery()
+        rows = db.execute(select(seq, token, Category.id, Category.name).select_from(one.outerjoin(Category, true()))).all()
+        names = {category_id: name for _, _, category_id, name in rows if category_id is not None}
+        return rows[0][0] or 0, rows[0][1], names
+
+    def sync(self, db: Session, seq: int = None):
+        """
+        Pulls in whatever changed since self.seq (or reloads if that's too much).
+        """
+        if not self.loaded:
+            self.load(db, seq)
+            return
+        delta = changes.changes_since(db, self.seq, MAX_SYNC_CHANGES)
+        if delta["reset"] or delta["has_more"]:
+            self.load(db, seq)
+            return
+        with self._lock:
+            self.upsert([events.as_row(expense) for expense in delta["changed"]])
+            self.remove([{"id": expense_id} for expense_id in delta["deleted"]])
+            self.seq = delta["seq"]
+
+    def load(self, db: Session, seq: int = None):
+        # seq must be read before the rows below (pysqlite gives every SELECT
+        # its own snapshot): changes committed in between are then synced
+        # again, and applying a row twice is harmless
+        if seq is None:
+            seq = changes.current_seq(db)
+        # Core select: plain tuples, and julianday() avoids parsing datetimes in Python
+        rows = db.execute(
+            select(
+                Expense.id, func.julianday(Expense.created_at), Expense.amount, category_names.name_column(),
+                Expense.store_name,
+            ).outerjoin(Category, Category.id == Expense.category_id).order_by(Expense.id)
+        ).all()
+        with self._lock:
+            self._clear()
+            if rows:
+                ids, days, amounts, categories, stores = zip(*rows)
+                self.id = np.asarray(ids, dtype=np.int64)
+                micros = np.round((np.asarray(days, dtype=float) - UNIX_EPOCH_JULIAN) * 86_400_000_000)
+                self.created_at = micros.astype(np.int64).view("datetime64[us]")
+                self.amount = np.asarray(amounts, dtype=float)
+                self.category = self.categories.encode(categories)
+                self.store = self.stores.encode(stores)
+                self.live = np.ones(len(self.id), dtype=bool)
+            self.loaded = True
+            self.seq = seq
+            self.checked_at = time.monotonic()
+        print(f"Expense snapshot loaded: {len(self)} rows")
+        self.database = _database_name(db)
+        self.save()
+
+    # --- Cache file ---
+
+    def _load_cache(self, db: Session, seq: int) -> bool:
+        """
+        Maps the saved arrays back in; False if missing or from another
+        database (by URL and DatabaseToken).
+        """
+        meta_path = os.path.join(self.cache_dir or "", "meta.json")
+        if not self.cache_dir or not os.path.exists(meta_path):
+            return False
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            # Same URL isn't enough: a deleted and re-created file can reach
+            # the same seq with different rows
+            if (meta["database"] != _database_name(db) or not self.token or meta.get("token") != self.token
+                    or meta["seq"] > seq):
+                return False
+            # Memory-mapped: pages are read lazily and shared with the OS cache
+            arrays = {name: np.load(os.path.join(self.cache_dir, f"{name}.npy"), mmap_mode="r") for name in COLUMNS}
+            if any(len(array) != meta["rows"] for array in arrays.values()):
+                return False
+        except Exception as e:
+            print(f"Ignoring expense snapshot cache: {e}")
+            return False
+
+        self.id, self.amount = arrays["id"], arrays["amount"]
+        self.created_at = arrays["created_at"]
+        self.category, self.store = arrays["category"], arrays["store"]
+        self.live, self.dead = np.ones(meta["rows"], dtype=bool), 0
+        self.categories = Dictionary(meta["categories"])
+        self.category_ids = {int(category_id): code for category_id, code in meta.get("category_ids", {}).items()}
+        self.stores = Dictionary(meta["stores"])
+        self.seq = meta["seq"]
+        self.database = meta["database"]
+        self.loaded = True
+        print(f"Expense snapshot mapped from {self.cache_dir}: {len(self)} rows")
+        return True
+
+    def save(self):
+        # Reader workers share the writer's cache directory; only it writes there
+        if not self.cache_dir or workers.ROLE == "reader":
+            return
+        try:
+            with self._lock:
+                self._compact()
+                os.makedirs(self.cache_dir, exist_ok=True)
+                # meta.json goes last and is what marks the cache valid
+                meta_path = os.path.join(self.cache_dir, "meta.json")
+                if os.path.exists(meta_path):
+                    os.remove(meta_path)
+                for name in COLUMNS:
+                    path = os.path.join(self.cache_dir, f"{name}.npy")
+                    # np.save on a memory-mapped source would truncate the file it reads from
+                    np.save(path + ".tmp.npy", np.array(getattr(self, name)))
+                    os.replace(path + ".tmp.npy", path)
+                meta = {
+                    "database": self.database,
+                    "token": self.token,
+                    "seq": self.seq,
+                    "rows": len(self),
+                    "categories": self.categories.names,
+                    "category_ids": self.category_ids,
+                    "stores": self.stores.names,
+                }
+                with open(meta_path + ".tmp", "w") as f:
+                    json.dump(meta, f)
+                os.replace(meta_path + ".tmp", meta_path)
+        except OSError as e:
+            print(f"Could not save expense snapshot: {e}")
+
+    # --- Deltas from the write endpoints ---
+
+    def _apply(self, change):
+        with self._lock:
+            if self.loaded:
+                change()
+
+    def _writable(self, extra: int = 0):
+        """
+        Makes every column a writable view with room for extra more rows.
+        Columns live in buffers that double when full, so single-row writes
+        don't copy whole columns; a memory-mapped (read-only) column is
+        copied once, on the first write after loading.
+        """
+        n = len(self)
+        for name in COLUMNS + ("live",):
+            column = getattr(self, name)
+            buffer = self._buffers.get(name)
+            if buffer is None or column.base is not buffer or len(buffer) < n + extra:
+                buffer = np.empty(max(n + extra, 2 * n, 1024), dtype=column.dtype)
+                buffer[:n] = column
+                self._buffers[name] = buffer
+            setattr(self, name, buffer[:n])
+
+    def upsert(self, rows):
+        """
+        Inserts new expenses and overwrites known ones (applying a row twice is harmless).
+        """
+        if not rows:
+            return
+
+        def change():
+            positions = self._positions([row["id"] for row in rows])
+            known = [(row, position) for row, position in zip(rows, positions) if position >= 0]
+            new = [row for row, position in zip(rows, positions) if position < 0]
+            self._writable(len(new))
+
+            if known:
+                found, positions = zip(*known)
+                positions = np.asarray(positions)
+                self.created_at[positions] = _datetimes([row["created_at"] for row in found])
+                self.amount[positions] = [row["amount"] for row in found]
+                self.category[positions] = self.categories.encode([row["category"] for row in found])
+                self.store[positions] = self.stores.encode([row["store_name"] for row in found])
+                # Deleted and written again (an id SQLite handed out a second time)
+                self.dead -= int(np.count_nonzero(~self.live[positions]))
+                self.live[positions] = True
+
+            if new:
+                n, end = len(self), len(self) + len(new)
+                values = {
+                    "id": [row["id"] for row in new],
+                    "created_at": _datetimes([row["created_at"] for row in new]),
+                    "amount": [row["amount"] for row in new],
+                    "category": self.categories.encode([row["category"] for row in new]),
+                    "store": self.stores.encode([row["store_name"] for row in new]),
+                    "live": True,
+                }
+                for name in COLUMNS + ("live",):
+                    buffer = self._buffers[name]
+                    buffer[n:end] = values[name]
+                    setattr(self, name, buffer[:end])
+                if np.any(np.diff(self.id[n - 1 if n else 0:]) < 0):
+                    self._sort()
+        self._apply(change)
+
+    def remove(self, rows):
+        def change():
+            positions = self._positions([row["id"] for row in rows])
+            positions = np.unique(positions[positions >= 0])
+            positions = positions[self.live[positions]]
+            if not len(positions):
+                return
+            self._writable()
+            self.live[positions] = False
+            self.amount[positions] = 0.0  # unfiltered sums can skip the live mask
+            self.dead += len(positions)
+            if self.dead > len(self) * MAX_DEAD_SHARE:
+                self._compact()
+        self._apply(change)
+
+    def _compact(self):
+        if not self.dead:
+            return
+        live = self.live
+        for name in COLUMNS + ("live",):
+            setattr(self, name, getattr(self, name)[live])
+        self.dead = 0
+
+    def clear(self):
+        self._apply(self._clear)
+
+    def rename_categories(self, names: dict, old_names: dict = None):
+        """
+        Brings category names up to date from {category id: name}. Codes
+        are tied to ids; a code without one yet takes the id of the category
+        with its (old) name.
+        """
+        def change():
+            for category_id, name in names.items():
+                code = self.category_ids.get(category_id)
+                if code is None:
+                    code = self.categories.codes.get((old_names or {}).get(category_id, name))
+                    if code is None:
+                        continue
+                    self.category_ids[category_id] = code
+                if self.categories.names[code] != name:
+                    self._rename_code(code, name)
+        self._apply(change)
+
+    def _rename_code(self, code: int, name: str):
+        names, codes = self.categories.names, self.categories.codes
+        other = codes.get(name)
+        if other is not None and other != code:
+            # Rows already synced under the new name: fold them into this code
+            self._writable()
+            self.category[self.category == other] = code
+        if codes.get(names[code]) == code:
+            del codes[names[code]]
+        names[code] = name
+        codes[name] = code
+
+    def _positions(self, ids) -> np.ndarray:
+        ids = np.asarray(ids, dtype=np.int64)
+        positions = np.searchsorted(self.id, ids)
+        positions = np.minimum(positions, max(len(self) - 1, 0))
+        if not len(self):
+            return np.full(len(ids), -1)
+        return np.where(self.id[positions] == ids, positions, -1)
+
+    def _sort(self):
+        order = np.argsort(self.id, kind="stable")
+        for name in COLUMNS + ("live",):
+            setattr(self, name, getattr(self, name)[order])
+
+    # --- Queries ---
+
+    def mask(self, category: str = None, store: str = None, start: datetime = None, end: datetime = None,
+             category_contains: bool = False) -> np.ndarray:
+        """
+        Rows matching a (lower-case) category, store name words (prefix match) and a [start, end) range.
+        """
+        mask = self.live.copy() if self.dead else np.ones(len(self), dtype=bool)
+        if category:
+            if category_contains:
+                codes = self.categories.matching(lambda name: category in name)
+            else:
+                codes = self.categories.matching(lambda name: name == category)
+            mask &= np.isin(self.category, codes)
+        if store:
+            # Same word-prefix rule as the search index, over distinct store names
+            mask &= np.isin(self.store, self.stores.matching(lambda name: search.matches_text(store, name)))
+        if start:
+            mask &= self.created_at >= np.datetime64(start, "us")
+        if end:
+            mask &= self.created_at < np.datetime64(end, "us")
+        return mask
+
+    def total(self, **filters) -> float:
+        with self._lock:
+            if not filters:
+                return float(self.amount.sum())
+            return float(self.amount[self.mask(**filters)].sum())
+
+    def by_category(self, mask: np.ndarray = None):
+        """
+        [(category name, total)] sorted by total, largest first.
+        """
+        with self._lock:
+            codes, amounts = self.category, self.amount
+            if mask is None and self.dead:
+                mask = self.live
+            if mask is not None:
+                codes, amounts = codes[mask], amounts[mask]
+            totals = np.bincount(codes, weights=amounts, minlength=len(self.categories.names))
+            present = np.bincount(codes, minlength=len(self.categories.names)) > 0
+            order = [code for code in np.argsort(-totals, kind="stable") if present[code]]
+            return [(self.categories.names[code], float(totals[code])) for code in order]
+
+    def daily_by_category(self, start: datetime, end: datetime, category: str = None):
+        """
+        (day offset from start, total, category name) per (day, category) in [start, end).
+        """
+        with self._lock:
+            mask = self.mask(category=category, start=start, end=end)
+            days = (self.created_at[mask] - np.datetime64(start, "us")) // np.timedelta64(1, "D")
+            n_codes = max(len(self.categories.names), 1)
+            keys, inverse = np.unique(days.astype(np.int64) * n_codes + self.category[mask], return_inverse=True)
+            totals = np.bincount(inverse.reshape(-1), weights=self.amount[mask], minlength=len(keys))
+            names = np.asarray(self.categories.names + [None], dtype=object)
+            return keys // n_codes, totals, names[keys % n_codes]
+
+
+snapshot = ExpenseSnapshot()
+
+events.subscribe("expenses.created", snapshot.upsert)
+events.subscribe("expenses.deleted", snapshot.remove)
+events.subscribe("expenses.updated", lambda before, after: snapshot.upsert(after))
+events.subscribe("expenses.cleared", snapshot.clear)
+# Dictionary encoding makes a rename one entry, whatever the row count
+events.subscribe("categories.updated", lambda category, old_name: snapshot.rename_categories(
+    {category["id"]: category["name"]}, {category["id"]: old_name}
+))
+
+
+def get_snapshot(db: Session):
+    """
+    The loaded snapshot, or None when EXPENSE_SNAPSHOT=0 (callers fall back to SQL).
+    """
+    if not ENABLED:
+        return None
+    return snapshot.ensure_loaded(db)
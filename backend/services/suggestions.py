@@ -0,0 +1,238 @@
+"""
+Category suggestions for uncategorized expenses (OCR results, imported
+rows), from what the user already filed.
+
+The index counts categories per normalized store name and per description /
+store word, built once from the history and then kept current from
+expense events and the change log (like the anomaly baselines), so a
+suggestion is a couple of dict lookups:
+
+    1. the store's most frequent category, if the store has been seen
+    2. otherwise a vote over the row's words, each word weighted by the
+       share of its expenses in each category ("latte" -> Coffee 0.9)
+"""
+import re
+import threading
+import time
+from collections import Counter
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..models import Category, Expense, UNCATEGORIZED
+from . import events, changes, search
+
+# Bigger change log deltas than this are cheaper to reload from scratch
+MAX_SYNC_CHANGES = 10_000
+# A word needs this many categorized expenses before it gets a vote
+MIN_WORD_SAMPLES = 2
+# Store numbers, phone numbers, "#1234": noise for matching stores
+_NOISE = re.compile(r"[#\d]+|[^\w\s]")
+
+
+# Placeholders (OCR fallback / form default), not stores
+UNKNOWN_STORES = {"unknown", "unknown store"}
+
+
+def store_key(store: str) -> str:
+    key = " ".join(_NOISE.sub(" ", (store or "").lower()).split())
+    return "" if key in UNKNOWN_STORES else key
+
+
+def _words(store: str, description: str) -> set:
+    return {w for w in search.words(f"{store or ''} {description or ''}") if len(w) > 2 and not w.isdigit()}
+
+
+def _contribution(category: str, store: str, description: str):
+    # What one expense counts as: (category, store key, words), or None
+    if not category or category == UNCATEGORIZED:
+        return None
+    return category, store_key(store), frozenset(_words(store, description))
+
+
+def _bump(table: dict, key: str, category: str, count: int):
+    counts = table.setdefault(key, Counter())
+    counts[category] += count
+    if counts[category] <= 0:
+        del counts[category]
+        if not counts:
+            del table[key]
+
+
+class CategoryIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.loaded_at = None
+        self.seq = 0  # change log position the counts reflect
+        self._clear()
+
+    def _clear(self):
+        self.stores = {}  # store key -> Counter(category name -> expenses)
+        self.words = {}  # word -> Counter(category name -> expenses)
+        self.categories = Counter()  # category name -> expenses
+        self._best = {}  # store key -> (category, share), filled on lookup
+        # What each expense was counted as (see _contribution), so an update
+        # or delete takes exactly that back out and applying a row twice is
+        # harmless. Identical rows share one tuple.
+        self.counted = {}
+
+    # --- Building / updating ---
+
+    def load(self, db: Session):
+        # seq is read first: anything committed while the rows are read is
+        # applied again by the next sync, which is harmless
+        seq = changes.current_seq(db)
+        rows = db.query(Expense.id, Category.name, Expense.store_name, Expense.description).join(
+            Category, Category.id == Expense.category_id
+        ).all()
+        with self._lock:
+            self._clear()
+            self._count(rows)
+            self.seq = seq
+            self.loaded_at = time.monotonic()
+
+    def _apply(self, counted: tuple, sign: int):
+        category, key, words = counted
+        self.categories[category] += sign
+        if self.categories[category] <= 0:
+            del self.categories[category]
+        if key:
+            _bump(self.stores, key, category, sign)
+            self._best.pop(key, None)
+        for word in words:
+            _bump(self.words, word, category, sign)
+
+    def _take_back(self, ids):
+        for expense_id in ids:
+            counted = self.counted.pop(expense_id, None)
+            if counted is not None:
+                self._apply(counted, -1)
+
+    def _count(self, rows):
+        # rows: (id, category, store_name, description)
+        shared = {}
+        for expense_id, *values in rows:
+            values = tuple(values)
+            if values not in shared:
+                shared[values] = _contribution(*values)
+            counted = shared[values]
+            if counted is not None:
+                self.counted[expense_id] = counted
+                self._apply(counted, 1)
+
+    def upsert(self, rows):
+        """
+        Counts new expenses and recounts known ones (event rows).
+        """
+        if not rows or self.loaded_at is None:
+            return
+        rows = list({row["id"]: row for row in rows}.values())
+        with self._lock:
+            self._take_back([row["id"] for row in rows])
+            self._count([(row["id"], row["category"], row["store_name"], row["description"]) for row in rows])
+
+    def remove(self, ids):
+        if not ids or self.loaded_at is None:
+            return
+        with self._lock:
+            self._take_back(set(ids))
+
+    def reset(self):
+        with self._lock:
+            self._clear()
+
+    def ensure_loaded(self, db: Session):
+        """
+        Loads on first use, then catches up with the change log: writes from
+        other worker processes, and any event this process missed.
+        """
+        if self.loaded_at is None:
+            self.load(db)
+            return
+        delta = changes.changes_since(db, self.seq, MAX_SYNC_CHANGES)
+        if delta["reset"] or delta["has_more"]:
+            self.load(db)
+            return
+        self.upsert([events.as_row(expense) for expense in delta["changed"]])
+        self.remove(delta["deleted"])
+        self.seq = max(self.seq, delta["seq"])
+
+    # --- Lookups ---
+
+    def _store_best(self, key: str, categories: set = None):
+        best = self._best.get(key)
+        if best is None or (categories is not None and best[0] not in categories):
+            counts = self.stores.get(key)
+            total = sum(counts.values()) if counts else 0
+            if total <= 0:
+                return None
+            if categories is None:
+                category, count = counts.most_common(1)[0]
+                best = self._best[key] = (category, count / total)
+            else:
+                ranked = [(category, count) for category, count in counts.most_common() if category in categories]
+                if not ranked:
+                    return None
+                best = (ranked[0][0], ranked[0][1] / total)
+        return best
+
+    def suggest(self, store: str = None, description: str = None, categories: set = None) -> tuple:
+        """
+        (category, confidence 0..1, "store" | "words"), or None. Only names
+        in categories are suggested when it's given.
+        """
+        with self._lock:
+            best = self._store_best(store_key(store), categories)
+            if best:
+                return best[0], round(best[1], 2), "store"
+
+            votes = Counter()
+            voters = 0
+            for word in _words(store, description):
+                counts = self.words.get(word)
+                total = sum(counts.values()) if counts else 0
+                if total >= MIN_WORD_SAMPLES:
+                    voters += 1
+                    for category, count in counts.items():
+                        if categories is None or category in categories:
+                            votes[category] += count / total
+        if not votes:
+            return None
+        category, score = votes.most_common(1)[0]
+        return category, round(score / voters, 2), "words"
+
+
+index = CategoryIndex()
+
+events.subscribe("expenses.created", index.upsert)
+events.subscribe("expenses.deleted", lambda rows: index.remove([row["id"] for row in rows]))
+events.subscribe("expenses.updated", lambda before, after: index.upsert(after))
+events.subscribe("expenses.cleared", index.reset)
+# Counted by name; rebuild on next use after a rename or delete (a deleted
+# category's expenses are Uncategorized now)
+events.subscribe("categories.updated", lambda category, old_name: setattr(index, "loaded_at", None))
+events.subscribe("categories.deleted", lambda category_id: setattr(index, "loaded_at", None))
+
+
+def fill(db: Session, values: list) -> int:
+    """
+    Gives every value dict (category, store_name, description) whose
+    category is Uncategorized the suggested category, in place. Returns how
+    many were filled. Only categories that still exist are suggested (another
+    worker process may have deleted one), so filling never recreates one.
+    """
+    index.ensure_loaded(db)
+    existing = None
+    filled = 0
+    for value in values:
+        if value.get("category") in (None, "", UNCATEGORIZED):
+            if existing is None:
+                existing = set(db.scalars(select(Category.name)))
+                # Renamed or deleted by another worker process (no event here)
+                if set(index.categories) - existing:
+                    index.load(db)
+            suggestion = index.suggest(value.get("store_name"), value.get("description"), existing)
+            if suggestion:
+                value["category"] = suggestion[0]
+                filled += 1
+    return filled
@@ -0,0 +1,154 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from ..database import SessionLocal
+from ..models import Expense, Category, UNCATEGORIZED
+from . import events, categories
+
+# Optional write mode: EXPENSE_WRITE_MODE=batch groups expense inserts into
+# one transaction (one fsync) per batch instead of one per request.
+WRITE_MODE = os.getenv("EXPENSE_WRITE_MODE", "direct")
+BATCH_SIZE = int(os.getenv("WRITE_BATCH_SIZE", "100"))
+BATCH_MS = float(os.getenv("WRITE_BATCH_MS", "5"))
+SUBMIT_TIMEOUT = float(os.getenv("WRITE_SUBMIT_TIMEOUT", "30"))
+
+
+class ExpenseWriteQueue:
+    """
+    Single writer thread that drains queued expense inserts and commits them
+    together, either every BATCH_MS milliseconds or every BATCH_SIZE rows.
+    Each submitter gets a Future that resolves once its batch has committed.
+    """
+
+    def __init__(self, session_factory=SessionLocal, batch_size: int = BATCH_SIZE, batch_ms: float = BATCH_MS):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.batch_delay = batch_ms / 1000
+        self._queue = queue.Queue()
+        self._thread = None
+        self._stopping = threading.Event()
+        self.batches = 0
+        self.rows = 0
+
+    def start(self):
+        if self._thread is None:
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="expense-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stopping.set()
+            self._thread.join()
+            self._thread = None
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def submit(self, values: dict) -> Future:
+        future = Future()
+        self._queue.put((values, future))
+        return future
+
+    def _run(self):
+        while not (self._stopping.is_set() and self._queue.empty()):
+            try:
+                first = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            batch = [first]
+            deadline = time.monotonic() + self.batch_delay
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            self._write(batch)
+
+    def _write(self, batch):
+        db = self.session_factory()
+        try:
+            try:
+                committed = [(batch, self._commit(db, batch))]
+            except Exception:
+                db.rollback()
+                # Retry one by one so a single bad row doesn't fail its whole batch
+                committed = []
+                for item in batch:
+                    try:
+                        committed.append(([item], self._commit(db, [item])))
+                    except Exception as e:
+                        db.rollback()
+                        item[1].set_exception(e)
+            self._resolve(db, committed)
+        finally:
+            db.close()
+
+    def _commit(self, db, batch):
+        category_ids = categories.resolve(db, [values.get("category") for values, _ in batch])
+        expenses = [Expense(**categories.expense_values(db, values, category_ids)) for values, _ in batch]
+        db.add_all(expenses)
+        db.flush()
+        ids = [expense.id for expense in expenses]
+        db.commit()
+        return ids
+
+    def _resolve(self, db, committed):
+        items = [(item, expense_id) for batch, ids in committed for item, expense_id in zip(batch, ids)]
+        if not items:
+            return
+        try:
+            # created_at is a server default; read it back for the whole batch at
+            # once, with the stored category name ("food" and "" arrive as Food
+            # and Uncategorized)
+            ids = [expense_id for _, expense_id in items]
+            stored = {
+                expense_id: (created_at, category)
+                for expense_id, created_at, category in db.query(Expense.id, Expense.created_at, Category.name)
+                .outerjoin(Category, Category.id == Expense.category_id)
+                .filter(Expense.id.in_(ids))
+            }
+        except Exception as e:
+            for (_, future), _ in items:
+                future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.rows += len(items)
+        rows = []
+        for (values, future), expense_id in items:
+            created_at, category = stored[expense_id]
+            row = {**values, "id": expense_id, "created_at": created_at, "category": category or UNCATEGORIZED}
+            rows.append(row)
+            future.set_result(row)
+        events.publish("expenses.created", rows=rows)
+
+
+expense_writer = None
+
+
+def batching_enabled() -> bool:
+    return expense_writer is not None
+
+
+def start_writer():
+    global expense_writer
+    if WRITE_MODE == "batch" and expense_writer is None:
+        expense_writer = ExpenseWriteQueue()
+        expense_writer.start()
+    return expense_writer
+
+
+def stop_writer():
+    global expense_writer
+    if expense_writer is not None:
+        expense_writer.stop()
+        expense_writer = None
@@ -0,0 +1,103 @@
+import os
+import tempfile
+
+# Multi-worker deployment roles (see backend/serve.py):
+#   single - one process serving everything (default, plain `uvicorn backend.main:app`)
+#   writer - the only process that writes to SQLite, listening on WRITER_ADDRESS
+#   reader - one of N workers serving reads/OCR and forwarding writes to the writer
+ROLE = os.getenv("FINTRACK_ROLE", "single")
+
+# Unix socket path, or host:port on platforms without Unix sockets
+DEFAULT_WRITER_ADDRESS = (
+    "127.0.0.1:8765" if os.name == "nt" else os.path.join(tempfile.gettempdir(), "fintrack-writer.sock")
+)
+WRITER_ADDRESS = os.getenv("WRITER_ADDRESS", DEFAULT_WRITER_ADDRESS)
+
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+# POST endpoints that only read (or run OCR) stay on the reader workers
+READ_ONLY_POSTS = {"/api/chat", "/api/chat/stream", "/upload-receipt/"}
+# GETs answered from the writer's memory (background job progress)
+WRITER_GETS = ("/expenses/purge/", "/imports/")
+
+HOP_BY_HOP = {b"connection", b"keep-alive", b"transfer-encoding", b"upgrade", b"host"}
+
+
+def is_tcp_address(address: str) -> bool:
+    host, _, port = address.rpartition(":")
+    return bool(host) and port.isdigit()
+
+
+def is_write(scope) -> bool:
+    if scope["method"] == "GET" and scope["path"].startswith(WRITER_GETS):
+        return True
+    return scope["method"] in WRITE_METHODS and scope["path"] not in READ_ONLY_POSTS
+
+
+class WriteForwardingMiddleware:
+    """
+    Used by reader workers: write requests are relayed unchanged to the
+    writer process, so only one process ever holds the SQLite write lock.
+    """
+
+    def __init__(self, app, address: str = WRITER_ADDRESS):
+        self.app = app
+        self.address = address
+        self._client = None
+
+    def _get_client(self):
+        if self._client is None:
+            import httpx
+
+            if is_tcp_address(self.address):
+                transport = httpx.AsyncHTTPTransport()
+                base_url = f"http://{self.address}"
+            else:
+                transport = httpx.AsyncHTTPTransport(uds=self.address)
+                base_url = "http://writer"
+            self._client = httpx.AsyncClient(transport=transport, base_url=base_url, timeout=None)
+        return self._client
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not is_write(scope):
+            await self.app(scope, receive, send)
+            return
+
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+
+        client = self._get_client()
+        headers = [(k, v) for k, v in scope["headers"] if k.lower() not in HOP_BY_HOP]
+        url = scope["path"]
+        if scope.get("query_string"):
+            url += "?" + scope["query_string"].decode()
+
+        request = client.build_request(scope["method"], url, headers=headers, content=body)
+        try:
+            response = await client.send(request, stream=True)
+        except Exception as e:
+            print(f"Writer unavailable: {e}")
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [(b"content-type", b"application/json"), (b"retry-after", b"1")],
+            })
+            await send({"type": "http.response.body", "body": b'{"detail": "Writer unavailable"}'})
+            return
+
+        try:
+            await send({
+                "type": "http.response.start",
+                "status": response.status_code,
+                "headers": [
+                    (k, v) for k, v in response.headers.raw if k.lower() not in HOP_BY_HOP
+                ],
+            })
+            async for chunk in response.aiter_raw():
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            await response.aclose()
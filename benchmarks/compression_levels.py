@@ -0,0 +1,95 @@
+"""
+CPU vs bytes for response compression: compresses a 1000-row JSON page and
+a 10000-row CSV export with every available codec (gzip always; brotli and
+zstd when installed) at several levels, the way CompressionMiddleware does
+(streamed through one compressor object).
+
+Usage:
+    python benchmarks/compression_levels.py --runs 5 --out compression.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+from benchmarks.seed_expenses import seed
+
+LEVELS = {
+    "gzip": (1, 3, 5, 6, 9),
+    "br": (1, 4, 6, 9, 11),
+    "zstd": (1, 3, 6, 12, 19),
+}
+# Chunk size the export streams in (roughly EXPORT_CHUNK_ROWS rows of CSV)
+CHUNK = 64 * 1024
+
+
+def _compress(encoder_class, level: int, body: bytes) -> bytes:
+    encoder = encoder_class(level)
+    out = [encoder.compress(body[i:i + CHUNK]) for i in range(0, len(body), CHUNK)]
+    out.append(encoder.finish())
+    return b"".join(out)
+
+
+def measure(encoder_class, level: int, body: bytes, runs: int) -> dict:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        compressed = _compress(encoder_class, level, body)
+        timings.append(time.perf_counter() - start)
+    elapsed = statistics.median(timings)
+    return {
+        "bytes": len(compressed),
+        "ratio": round(len(body) / len(compressed), 2),
+        "ms": round(elapsed * 1000, 2),
+        "mb_per_s": round(len(body) / elapsed / 1e6, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--out", help="write JSON results to this file (default: stdout)")
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "compression_levels.db")
+    # Before seeding: seed() imports backend.database, which reads DATABASE_URL once
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ["EXPENSE_SNAPSHOT_CACHE"] = ""
+    seed(db_path, 10000)
+
+    from fastapi.testclient import TestClient
+    from backend.main import app
+    from backend.compression import ENCODERS
+
+    with TestClient(app) as client:
+        identity = {"Accept-Encoding": "identity"}
+        payloads = {
+            "json_1000_rows": client.get("/expenses/?limit=1000", headers=identity).content,
+            "csv_export_10000_rows": client.get("/expenses/export", headers=identity).content,
+        }
+
+    results = {}
+    for name, body in payloads.items():
+        results[name] = {"raw_bytes": len(body)}
+        for encoding, encoder_class in ENCODERS.items():
+            results[name][encoding] = {
+                str(level): measure(encoder_class, level, body, args.runs) for level in LEVELS[encoding]
+            }
+
+    output = json.dumps({"runs": args.runs, "codecs": list(ENCODERS), "results": results}, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output)
+        print(f"Results written to {args.out}")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Export formats side by side on a seeded database: for each of csv, ndjson,
+arrow and parquet, how long GET /expenses/export takes, how many bytes it
+sends, the peak Python memory while streaming it, and how long the file
+takes to load back into typed columns with pyarrow (what pandas uses under
+the hood).
+
+Usage:
+    python benchmarks/export_formats.py --rows 100000 --runs 3 --out export_formats.json
+"""
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import tracemalloc
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+from benchmarks.seed_expenses import seed
+
+import pyarrow
+import pyarrow.csv
+import pyarrow.ipc
+import pyarrow.json
+import pyarrow.parquet
+
+LOADERS = {
+    "csv": lambda body: pyarrow.csv.read_csv(io.BytesIO(body)),
+    "ndjson": lambda body: pyarrow.json.read_json(io.BytesIO(body)),
+    "arrow": lambda body: pyarrow.ipc.open_stream(body).read_all(),
+    "parquet": lambda body: pyarrow.parquet.read_table(io.BytesIO(body)),
+}
+
+
+def _median_ms(fn, runs: int):
+    timings, result = [], None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return round(statistics.median(timings) * 1000, 1), result
+
+
+def _peak_mb(fn) -> float:
+    tracemalloc.start()
+    try:
+        fn()
+        return round(tracemalloc.get_traced_memory()[1] / 1e6, 1)
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--out", help="write JSON results to this file (default: stdout)")
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "export_formats.db")
+    # Before seeding: seed() imports backend.database, which reads DATABASE_URL once
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ["EXPENSE_SNAPSHOT_CACHE"] = ""
+    seed(db_path, args.rows)
+
+    from backend.services import export, rows
+    from backend.models import Expense
+
+    query = rows.select_rows().order_by(Expense.created_at.desc())
+
+    results = {}
+    for format in export.FORMATS:
+        # Straight from the generator: the HTTP layer would only add noise
+        export_ms, body = _median_ms(lambda: b"".join(export.stream(query, format)), args.runs)
+        load_ms, table = _median_ms(lambda: LOADERS[format](body), args.runs)
+        results[format] = {
+            "bytes": len(body),
+            "export_ms": export_ms,
+            "peak_mb": _peak_mb(lambda: sum(len(chunk) for chunk in export.stream(query, format))),
+            "load_ms": load_ms,
+            "loaded_rows": table.num_rows,
+            "loaded_types": {field.name: str(field.type) for field in table.schema},
+        }
+
+    output = json.dumps({"rows": args.rows, "runs": args.runs, "results": results}, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output)
+        print(f"Results written to {args.out}")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
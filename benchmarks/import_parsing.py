@@ -0,0 +1,128 @@
+"""
+Row parsing for CSV imports: the old per-row guessing (column positions by
+len(row), up to three strptime formats per row, datetime.now() when none
+fit) against one sniffed format per file (services/csv_format.py), over
+generated files with different date layouts.
+
+Only parsing is timed, no database. "misdated" counts rows the old parser
+silently dated today.
+
+Usage:
+    python benchmarks/import_parsing.py --rows 100000 --out import_parsing.json
+"""
+import os
+import sys
+import csv
+import json
+import time
+import random
+import argparse
+import tempfile
+from datetime import date, datetime, timedelta
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+from backend.services import csv_format
+
+LAYOUTS = {
+    "iso": ("%Y-%m-%d", ","),
+    "us": ("%m/%d/%Y", ","),
+    "day_first": ("%d/%m/%Y", ","),
+    "german": ("%d.%m.%Y", ";"),
+}
+
+
+def legacy_parse(row: list) -> dict:
+    # What import_expenses did for every row before format sniffing
+    date_str = row[0] if len(row) < 6 else row[1]
+    amount_str = row[1] if len(row) < 6 else row[2]
+    category_str = row[2] if len(row) >= 3 and len(row) < 6 else (row[3] if len(row) >= 4 else "Uncategorized")
+    store_str = row[3] if len(row) >= 4 and len(row) < 6 else (row[4] if len(row) >= 5 else "")
+    desc_str = row[4] if len(row) >= 5 and len(row) < 6 else (row[5] if len(row) >= 6 else "")
+    expense_date = datetime.now()
+    for fmt in ("%Y-%m-%d", "%m/%d/%Y", "%d-%m-%Y"):
+        try:
+            expense_date = datetime.strptime(date_str, fmt)
+            break
+        except ValueError:
+            pass
+    return {
+        "amount": float(amount_str.replace('$', '').replace(',', '')),
+        "category": category_str.strip() or "Uncategorized",
+        "store_name": store_str.strip(),
+        "description": desc_str.strip(),
+        "created_at": expense_date,
+    }
+
+
+def make_file(path: str, rows: int, date_format: str, delimiter: str):
+    rng = random.Random(7)
+    start = date(2023, 1, 1)
+    decimal = "," if delimiter == ";" else "."
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, delimiter=delimiter)
+        writer.writerow(["Date", "Amount", "Category", "Store", "Description"])
+        for i in range(rows):
+            day = start + timedelta(days=i * 730 // rows)
+            amount = f"{rng.uniform(1, 300):.2f}".replace(".", decimal)
+            writer.writerow([day.strftime(date_format), amount, "Food", f"Store {i % 50}", "Groceries"])
+
+
+def run(parse, rows: list) -> tuple:
+    start = time.perf_counter()
+    values, failed = [], 0
+    for row in rows:
+        try:
+            values.append(parse(row))
+        except ValueError:
+            failed += 1
+    return time.perf_counter() - start, values, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--out", help="write JSON results to this file (default: stdout)")
+    args = parser.parse_args()
+
+    results = {}
+    for name, (date_format, delimiter) in LAYOUTS.items():
+        path = os.path.join(tempfile.mkdtemp(), f"{name}.csv")
+        make_file(path, args.rows, date_format, delimiter)
+
+        sniff_start = time.perf_counter()
+        fmt = csv_format.sniff(path)
+        sniff_ms = (time.perf_counter() - sniff_start) * 1000
+        with open(path, newline="", encoding="utf-8") as f:
+            legacy_rows = list(csv.reader(f))[1:]
+        with open(path, newline="", encoding=fmt.encoding) as f:
+            sniffed_rows = list(fmt.reader(f))[1:]
+
+        today = date.today()
+        legacy_s, legacy_values, legacy_failed = run(legacy_parse, legacy_rows)
+        fmt.settle_dates({row[fmt.columns["date"]] for row in sniffed_rows})
+        sniffed_s, sniffed_values, sniffed_failed = run(fmt.parser(), sniffed_rows)
+        results[name] = {
+            "format": fmt.describe(),
+            "sniff_ms": round(sniff_ms, 1),
+            "legacy": {
+                "ms": round(legacy_s * 1000, 1),
+                "failed": legacy_failed,
+                "misdated": sum(v["created_at"].date() == today for v in legacy_values),
+            },
+            "sniffed": {"ms": round(sniffed_s * 1000, 1), "failed": sniffed_failed},
+            "speedup": round(legacy_s / sniffed_s, 1),
+        }
+
+    output = json.dumps({"rows": args.rows, "results": results}, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output)
+        print(f"Results written to {args.out}")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
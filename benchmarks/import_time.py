@@ -0,0 +1,75 @@
+"""
+Measures how long `import backend.main` takes in a fresh interpreter, with
+and without the OCR stack (cv2, numpy, PIL, pytesseract) being loaded.
+
+Usage:
+    python benchmarks/import_time.py --runs 10 --out import_time.json
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+import statistics
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CASES = {
+    # What the server pays before it can accept the first request
+    "backend.main": "import backend.main",
+    # The old behaviour: OCR imported at module load
+    "backend.main+ocr": "import backend.main, backend.services.ocr",
+}
+
+PROBE = """
+import time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+import sys
+print(elapsed, int('cv2' in sys.modules))
+"""
+
+
+def measure(statement: str, runs: int):
+    timings = []
+    loaded_cv2 = False
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE.format(statement=statement)],
+            cwd=ROOT_DIR, env=env, capture_output=True, text=True, check=True,
+        ).stdout.strip().splitlines()[-1]
+        elapsed, cv2 = output.split()
+        timings.append(float(elapsed))
+        loaded_cv2 = cv2 == "1"
+    return {
+        "runs": runs,
+        "median_ms": round(statistics.median(timings) * 1000, 2),
+        "min_ms": round(min(timings) * 1000, 2),
+        "max_ms": round(max(timings) * 1000, 2),
+        "cv2_loaded": loaded_cv2,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--out", help="write JSON results to this file (default: stdout)")
+    args = parser.parse_args()
+
+    results = {name: measure(statement, args.runs) for name, statement in CASES.items()}
+    saved = results["backend.main+ocr"]["median_ms"] - results["backend.main"]["median_ms"]
+    report = {"results": results, "saved_ms": round(saved, 2)}
+
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output)
+        print(f"Results written to {args.out}")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
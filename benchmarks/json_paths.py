@@ -0,0 +1,107 @@
+"""
+Compares the two ways of serving GET /expenses/ at 100/1000/10000 rows:
+
+    orm   - ORM objects validated through response_model (the old endpoint,
+            mounted here under /bench/orm)
+    fast  - column-only query + orjson (the current endpoint)
+
+Each case is timed through the ASGI app, and the query/serialization
+split is reported separately so it's clear where the time goes.
+
+Usage:
+    python benchmarks/json_paths.py --runs 20 --out json_paths.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+from typing import List
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+from benchmarks.seed_expenses import seed
+
+SIZES = (100, 1000, 10000)
+
+
+def _median_ms(fn, runs: int) -> float:
+    fn()  # warm up
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return round(statistics.median(timings) * 1000, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--out", help="write JSON results to this file (default: stdout)")
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "json_paths.db")
+    # Before seeding: seed() imports backend.database, which reads DATABASE_URL once
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    seed(db_path, max(SIZES))
+    os.environ["EXPENSE_SNAPSHOT_CACHE"] = ""
+
+    from fastapi import Depends
+    from fastapi.testclient import TestClient
+    from pydantic import TypeAdapter
+    from sqlalchemy.orm import Session
+    from backend.main import app
+    from backend import database, models, schemas
+    from backend.responses import FastJSONResponse
+    from backend.services import rows
+
+    def read_expenses_orm(limit: int = 100, db: Session = Depends(database.get_db)):
+        return db.query(models.Expense).order_by(models.Expense.created_at.desc()).limit(limit).all()
+
+    app.add_api_route("/bench/orm", read_expenses_orm, response_model=List[schemas.Expense])
+    adapter = TypeAdapter(List[schemas.Expense])
+
+    results = {}
+    with TestClient(app) as client:
+        for size in SIZES:
+            db = database.SessionLocal()
+            try:
+                orm = db.query(models.Expense).order_by(models.Expense.created_at.desc()).limit(size)
+                fast = rows.select_rows().order_by(models.Expense.created_at.desc()).limit(size)
+                orm_objects, fast_rows = orm.all(), rows.fetch(db, fast)
+                results[size] = {
+                    "orm": {
+                        "endpoint_ms": _median_ms(lambda: client.get(f"/bench/orm?limit={size}"), args.runs),
+                        "query_ms": _median_ms(lambda: orm.all(), args.runs),
+                        "serialize_ms": _median_ms(
+                            lambda: adapter.dump_json(adapter.validate_python(orm_objects, from_attributes=True)),
+                            args.runs,
+                        ),
+                    },
+                    "fast": {
+                        "endpoint_ms": _median_ms(lambda: client.get(f"/expenses/?limit={size}"), args.runs),
+                        "query_ms": _median_ms(lambda: rows.fetch(db, fast), args.runs),
+                        "serialize_ms": _median_ms(lambda: FastJSONResponse(fast_rows).body, args.runs),
+                    },
+                }
+                results[size]["speedup"] = round(
+                    results[size]["orm"]["endpoint_ms"] / results[size]["fast"]["endpoint_ms"], 2
+                )
+            finally:
+                db.close()
+
+    output = json.dumps({"runs": args.runs, "results": results}, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output)
+        print(f"Results written to {args.out}")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
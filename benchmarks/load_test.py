@@ -0,0 +1,210 @@
+"""
+In-process load driver: runs httpx against backend.main:app over ASGI and
+reports throughput and p50/p95/p99 latency per scenario as JSON.
+
+Usage:
+    python benchmarks/load_test.py --rows 100000 --concurrency 8 --requests 200 --out results.json
+    python benchmarks/load_test.py --db bench.db --no-seed --scenarios list,chat_total
+    EXPENSE_WRITE_MODE=batch python benchmarks/load_test.py --scenarios create --concurrency 32
+    python benchmarks/load_test.py --scenarios list,summary --background receipt:8,import:4
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import platform
+from datetime import date, timedelta
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+from benchmarks.seed_expenses import seed
+
+SAMPLE_RECEIPT = os.path.join(ROOT_DIR, "sample_receipt.png")
+
+
+def _import_csv(rng: random.Random) -> bytes:
+    lines = ["Date,Amount,Category,Store,Description"]
+    for _ in range(100):
+        day = date.today() - timedelta(days=rng.randrange(365))
+        lines.append(f"{day.isoformat()},{rng.uniform(1, 200):.2f},Food,Bench Mart,imported")
+    return "\n".join(lines).encode()
+
+
+def _chat(message):
+    return lambda rng: ("POST", "/api/chat", {"json": {"message": message}})
+
+
+# scenario name -> function(rng) returning (method, url, httpx kwargs)
+SCENARIOS = {
+    "list": lambda rng: ("GET", f"/expenses/?skip={rng.randrange(0, 1000)}&limit=100", {}),
+    "list_filtered": lambda rng: (
+        "GET", f"/expenses/?start_date={date.today() - timedelta(days=30)}&end_date={date.today()}&limit=100", {}
+    ),
+    "export": lambda rng: ("GET", f"/expenses/export?start_date={date.today() - timedelta(days=30)}", {}),
+    "summary": lambda rng: ("GET", "/budget/", {}),
+    "trends": lambda rng: ("GET", "/analytics/trends", {}),
+    "anomalies": lambda rng: ("GET", "/analytics/anomalies", {}),
+    "recurring": lambda rng: ("GET", "/analytics/recurring", {}),
+    "chat_total": _chat("total spent"),
+    "chat_category": _chat("how much spent on food"),
+    "chat_store": _chat("spending at walmart"),
+    "chat_compound": _chat("how much on food and transport at walmart this month vs last month"),
+    "chat_recent": _chat("recent transactions"),
+    "create": lambda rng: (
+        "POST", "/expenses/", {"json": {"amount": round(rng.uniform(1, 80), 2), "category": "Food", "store_name": "Bench Mart"}}
+    ),
+    "import": lambda rng: ("POST", "/expenses/import", {"files": {"file": ("bench.csv", _import_csv(rng), "text/csv")}}),
+    "receipt": lambda rng: (
+        "POST", "/upload-receipt/", {"files": {"file": ("receipt.png", open(SAMPLE_RECEIPT, "rb").read(), "image/png")}}
+    ),
+}
+# Writes run last so they don't change what the read scenarios see
+DEFAULT_SCENARIOS = [
+    "list", "list_filtered", "export", "summary", "trends", "anomalies", "recurring",
+    "chat_total", "chat_category", "chat_store", "chat_compound", "chat_recent",
+    "create", "import", "receipt",
+]
+
+
+def percentile(sorted_values, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def run_scenario(client, name: str, total: int, concurrency: int, seed: int) -> dict:
+    factory = SCENARIOS[name]
+    rng = random.Random(seed)
+    latencies = []
+    errors = 0
+    remaining = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            method, url, kwargs = factory(rng)
+            started = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "errors": errors,
+        "seconds": round(elapsed, 4),
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+async def background_load(client, name: str, stop: asyncio.Event, counts: dict, seed: int):
+    # Keeps one expensive request in flight until the measured scenario ends
+    factory = SCENARIOS[name]
+    rng = random.Random(seed)
+    while not stop.is_set():
+        method, url, kwargs = factory(rng)
+        response = await client.request(method, url, **kwargs)
+        key = "rejected" if response.status_code in (429, 503) else "completed"
+        counts[key] += 1
+        if key == "rejected":
+            await asyncio.sleep(float(response.headers.get("retry-after", 1)) / 10)
+
+
+async def run(args) -> dict:
+    import httpx
+    from backend.main import app
+
+    results = {}
+    # Count server errors instead of aborting the run
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with app.router.lifespan_context(app), \
+            httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for name in args.scenarios:
+            print(f"Running {name} ({args.requests} requests, concurrency {args.concurrency})...")
+            stop = asyncio.Event()
+            background = {bg: {"completed": 0, "rejected": 0} for bg, _ in args.background}
+            tasks = [
+                asyncio.create_task(background_load(client, bg, stop, background[bg], args.seed + i))
+                for bg, count in args.background for i in range(count)
+            ]
+            results[name] = await run_scenario(client, name, args.requests, args.concurrency, args.seed)
+            stop.set()
+            await asyncio.gather(*tasks)
+            if background:
+                results[name]["background"] = background
+            print(f"  {json.dumps(results[name])}")
+    return results
+
+
+def parse_background(value: str):
+    # "receipt:8,import:2" -> [("receipt", 8), ("import", 2)]
+    pairs = []
+    for item in filter(None, value.split(",")):
+        name, _, count = item.partition(":")
+        pairs.append((name, int(count or 1)))
+    return pairs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default="bench.db")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--no-seed", action="store_true", help="reuse an already seeded --db")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--scenarios", type=lambda s: s.split(","), default=DEFAULT_SCENARIOS)
+    parser.add_argument(
+        "--background", type=parse_background, default=[],
+        help="expensive load to run while measuring, e.g. receipt:8,import:2",
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="write JSON results to this file (default: stdout)")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.scenarios + [bg for bg, _ in args.background] if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(unknown)}")
+
+    # Must be set before anything imports backend.database
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(args.db)}"
+    if not args.no_seed:
+        seed(args.db, args.rows, seed=args.seed)
+
+    # EXPLAIN on every slow statement would distort the numbers
+    os.environ.setdefault("SLOW_QUERY_MS", "60000")
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "rows": None if args.no_seed else args.rows,
+        "concurrency": args.concurrency,
+        "requests_per_scenario": args.requests,
+        "background": dict(args.background),
+        "results": asyncio.run(run(args)),
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output)
+        print(f"Results written to {args.out}")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
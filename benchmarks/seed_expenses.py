@@ -0,0 +1,120 @@
+"""
+Seeds a scratch SQLite database with realistic expenses for benchmarking.
+
+Usage:
+    python benchmarks/seed_expenses.py --rows 1000000 --db bench.db
+"""
+import os
+import sys
+import sqlite3
+import random
+import argparse
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# category -> (stores, typical amount, spread)
+CATALOG = {
+    "Food": (["Walmart", "Whole Foods", "Trader Joe's", "Starbucks", "Chipotle", "Costco"], 25.0, 0.8),
+    "Transport": (["Uber", "Lyft", "Shell", "Chevron", "Metro Transit"], 18.0, 0.6),
+    "Utilities": (["PG&E", "Comcast", "AT&T", "Water Dept"], 90.0, 0.3),
+    "Entertainment": (["Netflix", "Spotify", "AMC Theatres", "Steam"], 15.0, 0.7),
+    "Health": (["CVS", "Walgreens", "Kaiser"], 40.0, 0.9),
+    "Shopping": (["Amazon", "Target", "Best Buy", "IKEA"], 60.0, 1.0),
+    "Housing": (["Landlord LLC", "Home Depot"], 900.0, 0.5),
+    "Education": (["Coursera", "Udemy", "Bookstore"], 35.0, 0.6),
+}
+# Fixed charges on a schedule: (store, category, amount, every N days)
+RECURRING = [
+    ("Landlord LLC", "Housing", 1450.00, 30),
+    ("Netflix", "Entertainment", 15.49, 30),
+    ("Spotify", "Entertainment", 10.99, 30),
+    ("Comcast", "Utilities", 79.99, 30),
+    ("Metro Transit", "Transport", 25.00, 14),
+    ("Coursera", "Education", 399.00, 365),
+]
+DESCRIPTIONS = ["", "Weekly run", "Card payment", "Online order", "Subscription", "Refill", "Quick stop"]
+CHUNK = 50_000
+
+
+def _rows(count: int, days: int, rng: random.Random):
+    now = datetime.now()
+    categories = list(CATALOG)
+    # Food and transport dominate real histories; housing is rare but large
+    weights = [30, 20, 6, 10, 5, 15, 2, 4]
+    for _ in range(count):
+        category = rng.choices(categories, weights)[0]
+        stores, typical, spread = CATALOG[category]
+        amount = round(rng.lognormvariate(0, spread) * typical, 2)
+        created_at = now - timedelta(seconds=rng.randrange(days * 86400))
+        yield (
+            amount,
+            category,
+            rng.choice(DESCRIPTIONS) or None,
+            created_at.strftime("%Y-%m-%d %H:%M:%S.%f"),
+            rng.choice(stores),
+        )
+
+
+def _recurring_rows(days: int, rng: random.Random):
+    now = datetime.now()
+    for store, category, amount, every in RECURRING:
+        first = now - timedelta(days=rng.randrange(min(every, days)))
+        for cycle in range(days // every):
+            created_at = first - timedelta(days=cycle * every, hours=rng.uniform(-12, 12))
+            yield (amount, category, "Subscription", created_at.strftime("%Y-%m-%d %H:%M:%S.%f"), store)
+
+
+def seed(db_path: str, rows: int, days: int = 730, seed: int = 42) -> str:
+    """
+    Creates the schema (through the app's models) and bulk-inserts `rows`
+    expenses. Returns the SQLAlchemy URL of the seeded database.
+    """
+    url = f"sqlite:///{os.path.abspath(db_path)}"
+    if os.path.exists(db_path):
+        os.remove(db_path)
+
+    from sqlalchemy import create_engine
+    from backend.database import Base
+    from backend import models  # noqa: F401  (registers tables)
+
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+
+    rng = random.Random(seed)
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.executemany("INSERT INTO categories (name, color) VALUES (?, 'blue')", [(c,) for c in CATALOG])
+    conn.execute("INSERT INTO budgets (limit_amount, period) VALUES (2500.0, 'monthly')")
+    category_ids = dict(conn.execute("SELECT name, id FROM categories"))
+
+    generator = _rows(rows, days, rng)
+    inserted = 0
+    while inserted < rows:
+        batch = [(a, category_ids[c], *rest) for _, (a, c, *rest) in zip(range(CHUNK), generator)]
+        conn.executemany(
+            "INSERT INTO expenses (amount, category_id, description, created_at, store_name) VALUES (?, ?, ?, ?, ?)",
+            batch,
+        )
+        inserted += len(batch)
+        print(f"  seeded {inserted}/{rows}", end="\r")
+    conn.executemany(
+        "INSERT INTO expenses (amount, category_id, description, created_at, store_name) VALUES (?, ?, ?, ?, ?)",
+        [(a, category_ids[c], *rest) for a, c, *rest in _recurring_rows(days, rng)],
+    )
+    conn.commit()
+    conn.close()
+    print(f"Seeded {rows} expenses into {db_path}")
+    return url
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--db", default="bench.db")
+    parser.add_argument("--days", type=int, default=730, help="spread expenses over this many past days")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    seed(args.db, args.rows, args.days, args.seed)
@@ -0,0 +1,100 @@
+"""
+Starts the real server (python -m backend.serve) with different worker
+counts against a seeded database and measures read throughput over TCP.
+
+Usage:
+    python benchmarks/worker_scaling.py --workers 1,2,4 --rows 100000 --out scaling.json
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import subprocess
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+from benchmarks.seed_expenses import seed
+from benchmarks.load_test import run_scenario
+
+READ_SCENARIOS = ["list", "list_filtered", "chat_total", "chat_compound"]
+
+
+def wait_for_server(base_url: str, process: subprocess.Popen, timeout: float = 60):
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Server exited during startup")
+        try:
+            httpx.get(f"{base_url}/expenses/?limit=1")
+            return
+        except httpx.TransportError:
+            time.sleep(0.2)
+    raise RuntimeError("Server did not start")
+
+
+async def measure(base_url: str, args) -> dict:
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.concurrency)
+    results = {}
+    async with httpx.AsyncClient(base_url=base_url, timeout=None, limits=limits) as client:
+        for name in args.scenarios:
+            results[name] = await run_scenario(client, name, args.requests, args.concurrency, args.seed)
+        # One write at the end proves forwarding to the writer works
+        response = await client.post("/expenses/", json={"amount": 1.0, "category": "Food", "store_name": "Bench"})
+        results["write_check_status"] = response.status_code
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default="bench.db")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--no-seed", action="store_true")
+    parser.add_argument("--workers", type=lambda s: [int(n) for n in s.split(",")], default=[1, 2, 4])
+    parser.add_argument("--port", type=int, default=8123)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--scenarios", type=lambda s: s.split(","), default=READ_SCENARIOS)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out")
+    args = parser.parse_args()
+
+    url = f"sqlite:///{os.path.abspath(args.db)}"
+    if not args.no_seed:
+        seed(args.db, args.rows, seed=args.seed)
+
+    report = {"rows": None if args.no_seed else args.rows, "concurrency": args.concurrency, "runs": {}}
+    base_url = f"http://127.0.0.1:{args.port}"
+    for count in args.workers:
+        env = dict(os.environ, DATABASE_URL=url, OCR_WARMUP="0", SLOW_QUERY_MS="60000")
+        server = subprocess.Popen(
+            [sys.executable, "-m", "backend.serve", "--port", str(args.port), "--workers", str(count)],
+            cwd=ROOT_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_for_server(base_url, server)
+            print(f"Measuring with {count} worker(s)...")
+            report["runs"][str(count)] = asyncio.run(measure(base_url, args))
+            for name in args.scenarios:
+                print(f"  {name}: {report['runs'][str(count)][name]['throughput_rps']} req/s")
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output)
+        print(f"Results written to {args.out}")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,7 +5,7 @@ import ReceiptUpload from './components/ReceiptUpload';
 import BudgetForm from './components/BudgetForm';
 import DashboardStats from './components/DashboardStats';
 import SpendingChart from './components/SpendingChart';
-import { getExpenses } from './api';
+import { getExpenses, subscribeToUpdates } from './api';
 import { LayoutDashboard } from 'lucide-react';
 import ThemeToggle from './components/ThemeToggle';
 import CategoryManager from './components/CategoryManager';
@@ -57,6 +57,17 @@ function App() {
     fetchExpenses();
   }, [refreshList, startDate, endDate]);
 
+  // Edits made on other dashboards arrive over the WebSocket
+  useEffect(() => {
+    return subscribeToUpdates((event) => {
+      // Renaming or deleting a category changes how listed expenses are labelled
+      if (event.type.startsWith('expense.') || event.type === 'category.updated' || event.type === 'category.deleted') {
+        setRefreshList((prev) => prev + 1);
+      }
+      if (event.type.startsWith('expense.') || event.type === 'budget.updated') setRefreshBudget((prev) => prev + 1);
+    });
+  }, []);
+
   const handleDateChange = (type, value) => {
     if (type === 'start') setStartDate(value);
     else setEndDate(value);
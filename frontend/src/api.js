@@ -10,9 +10,26 @@ export const getExpenses = async (skip = 0, limit = 100, startDate = null, endDa
     return response.data;
 };
 
-export const exportExpenses = (startDate, endDate) => {
+// Delta sync: returns { seq, reset, changed, deleted, has_more }; pass seq back next time
+export const getExpenseChanges = async (since = 0, limit = 1000) => {
+    const response = await axios.get(`${API_URL}/expenses/changes?since=${since}&limit=${limit}`);
+    return response.data;
+};
+
+// Word-prefix search over store names and descriptions, best match first
+export const searchExpenses = async (q, skip = 0, limit = 100, startDate = null, endDate = null) => {
+    let url = `${API_URL}/expenses/search?q=${encodeURIComponent(q)}&skip=${skip}&limit=${limit}`;
+    if (startDate) url += `&start_date=${startDate}`;
+    if (endDate) url += `&end_date=${endDate}`;
+    const response = await axios.get(url);
+    return response.data;
+};
+
+// format: 'csv' (default), 'ndjson', 'arrow' or 'parquet'
+export const exportExpenses = (startDate, endDate, format = 'csv') => {
     let url = `${API_URL}/expenses/export`;
     const params = [];
+    if (format !== 'csv') params.push(`format=${format}`);
     if (startDate) params.push(`start_date=${startDate}`);
     if (endDate) params.push(`end_date=${endDate}`);
     if (params.length > 0) url += `?${params.join('&')}`;
@@ -20,6 +37,20 @@ export const exportExpenses = (startDate, endDate) => {
     window.open(url, '_blank');
 };
 
+// Uploads a CSV and polls the background import job until it finishes
+export const importExpenses = async (file, { onProgress = null } = {}) => {
+    const formData = new FormData();
+    formData.append('file', file);
+    let job = (await axios.post(`${API_URL}/expenses/import`, formData)).data;
+    while (job.state !== 'done' && job.state !== 'failed') {
+        if (onProgress) onProgress(job);
+        await new Promise((resolve) => setTimeout(resolve, 500));
+        job = (await axios.get(`${API_URL}/imports/${job.id}`)).data;
+    }
+    if (job.state === 'failed') throw new Error(job.error);
+    return job;
+};
+
 export const createExpense = async (expenseData) => {
     const response = await axios.post(`${API_URL}/expenses/`, expenseData);
     return response.data;
@@ -51,6 +82,68 @@ export const chatWithAnalyst = async (message) => {
     return response.data;
 };
 
+// Streams the analyst answer (Server-Sent Events), calling onDelta for each fragment
+export const streamChatWithAnalyst = async (message, onDelta) => {
+    const response = await fetch(`${API_URL}/api/chat/stream`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ message }),
+    });
+    if (!response.ok || !response.body) {
+        throw new Error(`Chat stream failed: ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        const events = buffer.split('\n\n');
+        buffer = events.pop();
+        for (const raw of events) {
+            let event = 'message';
+            let data = '';
+            for (const line of raw.split('\n')) {
+                if (line.startsWith('event: ')) event = line.slice(7);
+                else if (line.startsWith('data: ')) data += line.slice(6);
+            }
+            if (event === 'done') return;
+            const payload = JSON.parse(data || '{}');
+            if (event === 'error') throw new Error(payload.error);
+            if (payload.delta) onDelta(payload.delta);
+        }
+    }
+};
+
+// --- Analytics ---
+
+export const getTrends = async (startDate = null, endDate = null, category = null) => {
+    const params = new URLSearchParams();
+    if (startDate) params.append('start_date', startDate);
+    if (endDate) params.append('end_date', endDate);
+    if (category) params.append('category', category);
+    const response = await axios.get(`${API_URL}/analytics/trends?${params.toString()}`);
+    return response.data;
+};
+
+export const getAnomalies = async (startDate = null, endDate = null, threshold = null) => {
+    const params = new URLSearchParams();
+    if (startDate) params.append('start_date', startDate);
+    if (endDate) params.append('end_date', endDate);
+    if (threshold) params.append('threshold', threshold);
+    const response = await axios.get(`${API_URL}/analytics/anomalies?${params.toString()}`);
+    return response.data;
+};
+
+export const getRecurring = async () => {
+    const response = await axios.get(`${API_URL}/analytics/recurring`);
+    return response.data;
+};
+
 // --- Categories ---
 
 export const getCategories = async () => {
@@ -70,9 +163,20 @@ export const deleteCategory = async (id) => {
 
 // --- Expense Actions ---
 
-export const clearExpenses = async () => {
-    const response = await axios.delete(`${API_URL}/expenses/`);
-    return response.data;
+// Deletion runs in the background in small batches; this resolves when it's done.
+// onProgress gets { state, deleted, total, progress } while it runs.
+export const clearExpenses = async ({ startDate = null, endDate = null, vacuum = false, onProgress = null } = {}) => {
+    const params = [`vacuum=${vacuum}`];
+    if (startDate) params.push(`start_date=${startDate}`);
+    if (endDate) params.push(`end_date=${endDate}`);
+    let job = (await axios.delete(`${API_URL}/expenses/?${params.join('&')}`)).data;
+    while (job.state !== 'done' && job.state !== 'failed') {
+        if (onProgress) onProgress(job);
+        await new Promise((resolve) => setTimeout(resolve, 500));
+        job = (await axios.get(`${API_URL}/expenses/purge/${job.id}`)).data;
+    }
+    if (job.state === 'failed') throw new Error(job.error);
+    return job;
 };
 
 export const deleteExpense = async (id) => {
@@ -84,3 +188,42 @@ export const updateExpense = async (id, expenseData) => {
     const response = await axios.put(`${API_URL}/expenses/${id}`, expenseData);
     return response.data;
 };
+
+// Bulk writes, one request and one transaction each.
+// filter: { ids, start_date, end_date, store, category } (at least one)
+export const createExpenses = async (expenses) => {
+    const response = await axios.post(`${API_URL}/expenses/bulk`, { expenses });
+    return response.data;
+};
+
+export const updateExpenses = async (filter, changes) => {
+    const response = await axios.patch(`${API_URL}/expenses/bulk`, { ...filter, set: changes });
+    return response.data;
+};
+
+export const deleteExpenses = async (filter) => {
+    const response = await axios.delete(`${API_URL}/expenses/bulk`, { data: filter });
+    return response.data;
+};
+
+// Live change events from other dashboards; reconnects after drops.
+// Returns a function that closes the connection.
+export const subscribeToUpdates = (onEvent) => {
+    const wsUrl = API_URL.replace(/^http/, 'ws') + '/ws';
+    let socket = null;
+    let closed = false;
+
+    const connect = () => {
+        socket = new WebSocket(wsUrl);
+        socket.onmessage = (message) => onEvent(JSON.parse(message.data));
+        socket.onclose = () => {
+            if (!closed) setTimeout(connect, 2000);
+        };
+    };
+    connect();
+
+    return () => {
+        closed = true;
+        if (socket) socket.close();
+    };
+};
@@ -1,7 +1,7 @@
 import React, { useState, useRef, useEffect } from 'react';
 import { MessageSquare, X, Send, Bot, User } from 'lucide-react';
 import { motion, AnimatePresence } from 'framer-motion';
-import { chatWithAnalyst } from '../api';
+import { streamChatWithAnalyst } from '../api';
 
 const AIChat = () => {
     const [isOpen, setIsOpen] = useState(false);
@@ -30,8 +30,20 @@ const AIChat = () => {
         setLoading(true);
 
         try {
-            const data = await chatWithAnalyst(userMessage);
-            setMessages(prev => [...prev, { role: 'assistant', text: data.response }]);
+            let started = false;
+            await streamChatWithAnalyst(userMessage, (delta) => {
+                if (!started) {
+                    // First fragment replaces the typing indicator with a message bubble
+                    started = true;
+                    setLoading(false);
+                    setMessages(prev => [...prev, { role: 'assistant', text: delta }]);
+                    return;
+                }
+                setMessages(prev => {
+                    const last = prev[prev.length - 1];
+                    return [...prev.slice(0, -1), { ...last, text: last.text + delta }];
+                });
+            });
         } catch (error) {
             console.error("Chat error:", error);
             setMessages(prev => [...prev, { role: 'assistant', text: "Sorry, I encountered an error analyzing your data." }]);
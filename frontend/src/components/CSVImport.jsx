@@ -1,5 +1,6 @@
 import React, { useRef, useState } from 'react';
 import { Upload, FileText, CheckCircle, AlertCircle, Loader } from 'lucide-react';
+import { importExpenses } from '../api';
 
 const CSVImport = ({ onImportSuccess }) => {
     const fileInputRef = useRef(null);
@@ -14,28 +15,20 @@ const CSVImport = ({ onImportSuccess }) => {
         if (!file) return;
 
         setUploading(true);
-        const formData = new FormData();
-        formData.append('file', file);
 
         try {
-            // Adjust API URL if needed, assuming relative proxy or full path
-            const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000';
-            const response = await fetch(`${API_URL}/expenses/import`, {
-                method: 'POST',
-                body: formData,
-            });
-
-            if (!response.ok) {
-                throw new Error('Import failed');
-            }
-
-            const result = await response.json();
-            alert(result.message);
+            const job = await importExpenses(file);
+            let message = `Successfully imported ${job.imported} expenses`;
+            if (job.skipped) message += ` (${job.skipped} already imported, skipped)`;
+            if (job.failed) message += `; ${job.failed} rows could not be read`;
+            if (job.format?.date_ambiguous) message += `\nDates were read as ${job.format.date_format}`;
+            alert(message);
             if (onImportSuccess) onImportSuccess();
 
         } catch (error) {
             console.error('Error importing CSV:', error);
-            alert('Failed to import CSV. Please check the file format.');
+            const detail = error.response?.data?.detail;
+            alert(detail ? `Failed to import CSV: ${detail}` : 'Failed to import CSV. Please check the file format.');
         } finally {
             setUploading(false);
             // Reset input
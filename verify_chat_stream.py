@@ -0,0 +1,73 @@
+import os
+import sys
+import json
+import tempfile
+
+# Run against a scratch database so the check doesn't touch real data
+scratch_db = os.path.join(tempfile.mkdtemp(), "verify_chat_stream.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{scratch_db}"
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.testclient import TestClient
+from backend.main import app
+from backend.services.llm import FakeLLM, get_llm
+
+client = TestClient(app)
+
+def read_events(response):
+    events = []
+    event = "message"
+    for line in response.iter_lines():
+        if line.startswith("event: "):
+            event = line[len("event: "):]
+        elif line.startswith("data: "):
+            events.append((event, json.loads(line[len("data: "):])))
+            event = "message"
+    return events
+
+def test_stream_fragments():
+    print("Testing SSE stream (POST /api/chat/stream)...")
+    client.post("/expenses/", json={"amount": 12.5, "category": "Food", "store_name": "Walmart"})
+    client.post("/expenses/", json={"amount": 4.0, "category": "Transport", "store_name": "Metro"})
+
+    with client.stream("POST", "/api/chat/stream", json={"message": "recent transactions"}) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = read_events(response)
+
+    deltas = [data["delta"] for event, data in events if event == "message"]
+    assert len(deltas) == 3, deltas  # header + one line per transaction
+    assert events[-1][0] == "done"
+    print(f"  [OK] Received {len(deltas)} fragments")
+
+def test_stream_get():
+    print("Testing SSE stream (GET /api/chat/stream)...")
+    with client.stream("GET", "/api/chat/stream", params={"message": "hello"}) as response:
+        events = read_events(response)
+    assert events[0][1]["delta"].startswith("Hello")
+    print("  [OK] GET stream answered")
+
+def test_fake_llm():
+    print("Testing LLM fallback with FakeLLM...")
+    fake = FakeLLM(["Saving ", "is ", "good."])
+    app.dependency_overrides[get_llm] = lambda: fake
+    try:
+        with client.stream("POST", "/api/chat/stream", json={"message": "should i save more?"}) as response:
+            events = read_events(response)
+        deltas = [data["delta"] for event, data in events if event == "message"]
+        assert deltas == ["Saving ", "is ", "good."], deltas
+        assert len(fake.prompts) == 1
+
+        # Non-streaming endpoint gives the same answer in one piece
+        response = client.post("/api/chat", json={"message": "should i save more?"})
+        assert response.json()["response"] == "Saving is good."
+    finally:
+        app.dependency_overrides.clear()
+    print("  [OK] LLM chunks streamed in order")
+
+if __name__ == "__main__":
+    with client:  # runs the app lifespan (table creation)
+        test_stream_fragments()
+        test_stream_get()
+        test_fake_llm()
+    print("\n[OK] Chat streaming verification passed!")
@@ -0,0 +1,65 @@
+import os
+import sys
+import gzip
+import tempfile
+
+# Run against a scratch database so the check doesn't touch real data
+scratch_db = os.path.join(tempfile.mkdtemp(), "verify_compression.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{scratch_db}"
+os.environ["EXPENSE_SNAPSHOT_CACHE"] = ""
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.testclient import TestClient
+from backend.main import app
+from backend import compression
+
+client = TestClient(app)
+GZIP = {"Accept-Encoding": "gzip"}
+
+def test_json_pages():
+    print("Testing compressed JSON pages...")
+    client.post("/expenses/bulk", json={"expenses": [
+        {"amount": i + 0.5, "category": "Food", "store_name": "Walmart", "description": "Weekly run"} for i in range(200)
+    ]})
+    plain = client.get("/expenses/?limit=200", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+
+    # Decode by hand so the check doesn't depend on the client's auto-decoding
+    with client.stream("GET", "/expenses/?limit=200", headers=GZIP) as response:
+        assert response.headers["content-encoding"] == "gzip", response.headers
+        assert "accept-encoding" in response.headers["vary"].lower()
+        body = b"".join(response.iter_raw())
+    assert int(response.headers["content-length"]) == len(body)
+    assert gzip.decompress(body) == plain.content
+    assert len(body) < len(plain.content) / 4, (len(body), len(plain.content))
+
+    small = client.get("/expenses/?limit=1", headers=GZIP)
+    assert len(small.content) < compression.MIN_SIZE and "content-encoding" not in small.headers
+    print(f"  [OK] {len(plain.content)} -> {len(body)} bytes; small responses left alone")
+
+def test_streamed_export():
+    print("Testing the streamed CSV export...")
+    plain = client.get("/expenses/export", headers={"Accept-Encoding": "identity"}).content
+    with client.stream("GET", "/expenses/export", headers=GZIP) as response:
+        assert response.headers["content-encoding"] == "gzip"
+        assert "content-length" not in response.headers  # streamed, never buffered whole
+        body = b"".join(response.iter_raw())
+    assert gzip.decompress(body) == plain and plain.count(b"\n") == 201
+    print("  [OK] export gzip-streamed and identical once decoded")
+
+def test_negotiation():
+    print("Testing Accept-Encoding negotiation...")
+    assert compression.choose_encoding("gzip, deflate") == "gzip"
+    assert compression.choose_encoding("gzip;q=0, identity") is None
+    assert compression.choose_encoding("deflate") is None
+    assert compression.choose_encoding("*") == next(iter(compression.ENCODERS))
+    with client.stream("GET", "/api/chat/stream?message=total", headers=GZIP) as response:
+        assert "content-encoding" not in response.headers  # SSE is never buffered
+    print(f"  [OK] available encodings: {', '.join(compression.ENCODERS)}")
+
+if __name__ == "__main__":
+    with client:  # runs the app lifespan (table creation)
+        test_json_pages()
+        test_streamed_export()
+        test_negotiation()
+    print("\n[OK] Compression verification passed!")
@@ -0,0 +1,70 @@
+import os
+import io
+import sys
+import csv
+import tempfile
+
+# Run against a scratch database so the check doesn't touch real data
+scratch_db = os.path.join(tempfile.mkdtemp(), "verify_export_formats.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{scratch_db}"
+os.environ["EXPENSE_SNAPSHOT_CACHE"] = ""
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import orjson
+import pyarrow.ipc
+import pyarrow.parquet
+from fastapi.testclient import TestClient
+from backend.main import app
+from backend.services import export
+
+client = TestClient(app)
+ROWS = 2500
+
+def test_ndjson():
+    print("Testing NDJSON export...")
+    api = client.get(f"/expenses/?limit={ROWS}").json()
+    response = client.get("/expenses/export?format=ndjson")
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [orjson.loads(line) for line in response.content.splitlines()]
+    assert lines == api, "NDJSON rows should match GET /expenses/"
+    print(f"  [OK] {len(lines)} rows, identical to the JSON API")
+    return api
+
+def test_columnar(api):
+    print("Testing Arrow and Parquet exports...")
+    arrow = pyarrow.ipc.open_stream(client.get("/expenses/export?format=arrow").content).read_all()
+    assert arrow.num_rows == ROWS
+    assert str(arrow.schema.field("created_at").type) == "timestamp[us]"
+    assert str(arrow.schema.field("amount").type) == "double"
+    # One record batch per query chunk
+    assert max(batch.num_rows for batch in arrow.to_batches()) == export.CHUNK_ROWS
+
+    parquet = pyarrow.parquet.read_table(io.BytesIO(client.get("/expenses/export?format=parquet").content))
+    assert parquet.equals(arrow), "Parquet and Arrow exports should hold the same table"
+
+    first = arrow.slice(0, 1).to_pylist()[0]
+    assert first["id"] == api[0]["id"] and first["amount"] == api[0]["amount"]
+    assert first["created_at"].isoformat() == api[0]["created_at"]
+    print(f"  [OK] {arrow.num_rows} typed rows in {len(arrow.to_batches())} batches")
+
+def test_filters_and_errors():
+    print("Testing filters and bad formats...")
+    csv_rows = list(csv.reader(io.StringIO(client.get("/expenses/export").text)))
+    assert csv_rows[0][0] == "ID" and len(csv_rows) == ROWS + 1
+
+    empty = pyarrow.ipc.open_stream(client.get("/expenses/export?format=arrow&start_date=2100-01-01").content).read_all()
+    assert empty.num_rows == 0 and "amount" in empty.schema.names
+    assert client.get("/expenses/export?format=ndjson&start_date=2100-01-01").content == b""
+    assert client.get("/expenses/export?format=xlsx").status_code == 400
+    print("  [OK] CSV unchanged, empty ranges valid, unknown formats rejected")
+
+if __name__ == "__main__":
+    with client:  # runs the app lifespan (table creation)
+        client.post("/expenses/bulk", json={"expenses": [
+            {"amount": i + 0.25, "category": "Food" if i % 2 else "Travel", "store_name": "Walmart",
+             "description": None if i % 3 else "Weekly run"} for i in range(ROWS)
+        ]})
+        api = test_ndjson()
+        test_columnar(api)
+        test_filters_and_errors()
+    print("\n[OK] Export format verification passed!")
@@ -0,0 +1,56 @@
+import os
+import sys
+import json
+import tempfile
+
+# Run against a scratch database so the check doesn't touch real data
+scratch_db = os.path.join(tempfile.mkdtemp(), "verify_fast_json.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{scratch_db}"
+os.environ["EXPENSE_SNAPSHOT_CACHE"] = ""
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from typing import List
+from fastapi.encoders import jsonable_encoder
+from fastapi.testclient import TestClient
+from pydantic import TypeAdapter
+from backend.main import app
+from backend import schemas, models, database
+
+client = TestClient(app)
+
+EXPENSES = [
+    {"amount": 12.5, "category": "Food", "store_name": "Walmart", "description": "Weekly run"},
+    {"amount": 3.0, "category": "Uncategorized", "store_name": None, "description": None},
+    {"amount": 1999.99, "category": "Housing", "store_name": "Landlord LLC", "description": "Rent – März"},
+    {"amount": 0.1, "category": "Pets", "store_name": "", "description": ""},
+]
+
+def slow_path(path: str) -> list:
+    # What FastAPI produced before: ORM rows validated through the response model
+    db = database.SessionLocal()
+    try:
+        ids = [e["id"] for e in client.get(path).json()]
+        by_id = {e.id: e for e in db.query(models.Expense).filter(models.Expense.id.in_(ids))}
+        validated = TypeAdapter(List[schemas.Expense]).validate_python([by_id[i] for i in ids], from_attributes=True)
+        return json.loads(json.dumps(jsonable_encoder(validated)))
+    finally:
+        db.close()
+
+def test_matches_response_model():
+    print("Testing that the fast JSON path matches schemas.Expense...")
+    client.post("/expenses/bulk", json={"expenses": EXPENSES})
+    for path in ("/expenses/", "/expenses/?limit=2&skip=1", "/expenses/search?q=walmart"):
+        response = client.get(path)
+        assert response.headers["content-type"] == "application/json", response.headers
+        fast = response.json()
+        assert fast, path
+        # Every row validates against the model and is what the model would have produced
+        TypeAdapter(List[schemas.Expense]).validate_python(fast)
+        assert [list(row) for row in fast] == [list(schemas.Expense.model_fields)] * len(fast), fast
+        assert fast == slow_path(path), (fast, slow_path(path))
+    print("  [OK] same fields, order and values as the response model")
+
+if __name__ == "__main__":
+    with client:  # runs the app lifespan (table creation)
+        test_matches_response_model()
+    print("\n[OK] Fast JSON verification passed!")
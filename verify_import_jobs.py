@@ -0,0 +1,119 @@
+import os
+import sys
+import time
+import tempfile
+from datetime import date, timedelta
+
+# Run against a scratch database so the check doesn't touch real data
+scratch_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(scratch_dir, 'verify_import_jobs.db')}"
+os.environ["EXPENSE_SNAPSHOT_CACHE"] = ""
+os.environ["IMPORT_DIR"] = os.path.join(scratch_dir, "imports")
+os.environ["IMPORT_CHUNK"] = "500"
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text
+from fastapi.testclient import TestClient
+from backend.main import app
+from backend import database, migrations
+
+client = TestClient(app)
+
+def bank_csv(days) -> bytes:
+    lines = ["Date,Amount,Category,Store,Description"]
+    for day in days:
+        when = (date(2024, 1, 1) + timedelta(days=day)).isoformat()
+        lines.append(f"{when},{day + 0.5:.2f},Food,Store {day},Groceries")
+        # The same coffee twice on the same day: two real expenses
+        lines.append(f"{when},3.50,Food,Coffee Bar,Latte")
+        lines.append(f"{when},3.50,Food,  coffee BAR ,latte")
+    return "\n".join(lines).encode()
+
+def run_import(content: bytes, name: str = "bank.csv") -> dict:
+    response = client.post("/expenses/import", files={"file": (name, content, "text/csv")})
+    assert response.status_code == 202, response.text
+    job = response.json()
+    while job["state"] not in ("done", "failed"):
+        time.sleep(0.05)
+        job = client.get(f"/imports/{job['id']}").json()
+    assert job["state"] == "done", job
+    return job
+
+def count() -> int:
+    with database.engine.connect() as conn:
+        return conn.execute(text("SELECT count(*) FROM expenses")).scalar()
+
+def test_import_and_reimport():
+    print("Testing import jobs and re-imports...")
+    job = run_import(bank_csv(range(400)))
+    assert job["total"] == 1200 and job["processed"] == 1200 and job["progress"] == 1.0
+    assert job["imported"] == 1200 and job["skipped"] == 0, job
+    assert count() == 1200
+
+    job = run_import(bank_csv(range(400)))
+    assert job["imported"] == 0 and job["skipped"] == 1200, job
+    assert count() == 1200
+
+    # Overlapping export: the last 100 days again plus 100 new ones
+    job = run_import(bank_csv(range(300, 500)))
+    assert job["imported"] == 300 and job["skipped"] == 300, job
+    assert count() == 1500
+    assert not os.listdir(os.environ["IMPORT_DIR"]), "stored uploads should be removed once imported"
+    print("  [OK] 1200 imported, re-import skipped all, overlap imported only the new 300")
+
+def test_bad_rows():
+    print("Testing row errors...")
+    job = run_import(b"Date,Amount,Category,Store,Description\n2024-02-01,abc,Food,X,Y\n2024-02-01,5,Food,X,Y\n")
+    assert job["imported"] == 1 and job["failed"] == 1 and job["errors"][0].startswith("Row 2:"), job
+    assert job["format"]["columns"]["amount"] == 1
+    assert client.get("/imports/nope").status_code == 404
+    assert client.post("/expenses/import", files={"file": ("bank.txt", b"x", "text/plain")}).status_code == 400
+    print("  [OK] bad rows reported with line numbers")
+
+def test_inferred_formats():
+    print("Testing format inference...")
+    german = "Buchungstag;Betrag;Empfänger;Verwendungszweck\n" + "".join(
+        f"{day:02d}.03.2024;-1.234,{day:02d} €;REWE;Einkauf {day}\n" for day in range(1, 29)
+    )
+    response = client.post("/expenses/import", files={"file": ("giro.csv", german.encode("cp1252"), "text/csv")})
+    assert response.status_code == 202, response.text
+    fmt = response.json()["format"]
+    assert (fmt["delimiter"], fmt["date_format"], fmt["decimal"], fmt["currency"]) == (";", "%d.%m.%Y", ",", "€"), fmt
+    assert fmt["encoding"] == "cp1252" and fmt["has_header"]
+
+    # Day-first, but the first rows (days 1-12) read either way
+    day_first = "Posted Date,Payee,Amount (GBP),Memo\n" + "".join(
+        f"{day:02d}/05/2024,Tesco,£{day}.00,Shop\n" for day in range(1, 29)
+    )
+    job = run_import(day_first.encode())
+    assert job["format"]["columns"] == {"date": 0, "store": 1, "amount": 2, "description": 3}, job["format"]
+    assert job["format"]["date_format"] == "%d/%m/%Y" and not job["format"]["date_ambiguous"], job["format"]
+    assert job["imported"] == 28 and job["failed"] == 0, job
+    rows = client.get("/expenses/?limit=5000&start_date=2024-05-01&end_date=2024-05-31").json()
+    assert len([r for r in rows if r["store_name"] == "Tesco"]) == 28
+
+    bad = client.post("/expenses/import", files={"file": ("x.csv", b"Date,Amount\nsoon,1\nlater,2\n", "text/csv")})
+    assert bad.status_code == 400 and "date" in bad.json()["detail"], bad.text
+    forced = client.post("/expenses/import?date_format=%25d/%25m/%25Y", files={"file": ("x.csv", b"Date,Amount\n01/02/2024,1\n", "text/csv")})
+    assert forced.json()["format"]["date_format"] == "%d/%m/%Y"
+    print("  [OK] ; / cp1252 / € / day-first files read; undatable files rejected up front")
+
+def test_migration_backfill():
+    print("Testing the fingerprint migration on an older database...")
+    with database.engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_expenses_fingerprint"))
+        conn.execute(text("ALTER TABLE expenses DROP COLUMN fingerprint"))
+    migrations.run(database.engine)
+    with database.engine.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM expenses WHERE fingerprint IS NULL")).scalar() == 0
+    job = run_import(bank_csv(range(450, 550)))
+    assert job["imported"] == 150 and job["skipped"] == 150, job
+    print("  [OK] existing rows fingerprinted; re-import after migration deduplicated")
+
+if __name__ == "__main__":
+    with client:  # runs the app lifespan (table creation)
+        test_import_and_reimport()
+        test_bad_rows()
+        test_inferred_formats()
+        test_migration_backfill()
+    print("\n[OK] Import job verification passed!")
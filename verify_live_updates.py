@@ -0,0 +1,61 @@
+import os
+import sys
+import time
+import tempfile
+
+# Run against a scratch database so the check doesn't touch real data
+scratch_db = os.path.join(tempfile.mkdtemp(), "verify_live_updates.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{scratch_db}"
+os.environ["EXPENSE_SNAPSHOT_CACHE"] = ""
+os.environ["WS_QUEUE_SIZE"] = "3"
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+from backend.main import app
+from backend.services.hub import hub
+
+client = TestClient(app)
+
+def test_change_events():
+    print("Testing /ws change events...")
+    with client.websocket_connect("/ws") as ws:
+        expense = client.post("/expenses/", json={"amount": 5.0, "category": "Food", "store_name": "Walmart"}).json()
+        event = ws.receive_json()
+        assert event["type"] == "expense.created" and event["expenses"][0]["id"] == expense["id"], event
+
+        client.put(f"/expenses/{expense['id']}", json={"amount": 6.0, "category": "Food", "store_name": "Walmart"})
+        event = ws.receive_json()
+        assert event["type"] == "expense.updated" and event["expenses"][0]["amount"] == 6.0, event
+
+        client.delete(f"/expenses/{expense['id']}")
+        assert ws.receive_json() == {"type": "expense.deleted", "ids": [expense["id"]]}
+
+        client.post("/budget/", json={"limit_amount": 300.0, "period": "monthly"})
+        assert ws.receive_json()["type"] == "budget.updated"
+
+        category = client.post("/categories/", json={"name": "Pets"}).json()
+        assert ws.receive_json()["category"]["name"] == "Pets"
+        client.delete(f"/categories/{category['id']}")
+        assert ws.receive_json() == {"type": "category.deleted", "id": category["id"]}
+    print("  [OK] expense, budget and category changes pushed")
+
+def test_slow_client_dropped():
+    print("Testing that a client that stops reading is dropped...")
+    with client.websocket_connect("/ws") as ws:
+        for i in range(10):
+            hub.broadcast({"type": "test", "i": i})
+        time.sleep(0.2)
+        try:
+            while True:
+                ws.receive_json()
+        except WebSocketDisconnect as e:
+            assert e.code == 1013, e.code
+    assert not hub.clients
+    print("  [OK] slow client disconnected with 1013")
+
+if __name__ == "__main__":
+    with client:  # runs the app lifespan (table creation)
+        test_change_events()
+        test_slow_client_dropped()
+    print("\n[OK] Live update verification passed!")
@@ -0,0 +1,62 @@
+import os
+import sys
+import tempfile
+
+# Test mode: every request gets a query budget, overridable per request
+scratch_db = os.path.join(tempfile.mkdtemp(), "verify_query_budget.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{scratch_db}"
+os.environ["SQL_QUERY_BUDGET"] = "50"
+os.environ["EXPENSE_SNAPSHOT_CACHE"] = os.path.join(os.path.dirname(scratch_db), "snapshot")
+# Worst case for analytics: the snapshot re-checks the table on every request
+os.environ["SNAPSHOT_CHECK_SECONDS"] = "0"
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.testclient import TestClient
+from backend.main import app
+from backend.database import QueryBudgetExceeded
+
+client = TestClient(app)
+
+# (method, path, json body, max queries)
+BUDGETS = [
+    ("POST", "/expenses/", {"amount": 9.5, "category": "Food", "store_name": "Walmart"}, 4),  # "Food" doesn't exist yet, so this also creates it
+    ("GET", "/expenses/", None, 1),
+    ("GET", "/expenses/export", None, 1),
+    ("GET", "/expenses/search?q=wal", None, 2),  # first search also checks for the FTS index
+    ("POST", "/budget/", {"limit_amount": 500.0, "period": "monthly"}, 4),
+    ("GET", "/budget/", None, 1),
+    ("GET", "/categories/", None, 10),  # first call seeds the default categories
+    ("POST", "/api/chat", {"message": "total spent"}, 2),  # first call loads the analytics snapshot
+    ("POST", "/api/chat", {"message": "total spent"}, 1),
+    ("POST", "/api/chat", {"message": "spent on food and transport this month vs last month"}, 1),
+]
+
+def query_count(response) -> int:
+    # Server-Timing: db;dur=1.23;desc="2 queries", app;dur=4.56
+    timing = response.headers["server-timing"]
+    desc = timing.split('desc="')[1]
+    return int(desc.split(" ")[0])
+
+def test_budgets():
+    print("Testing per-endpoint query budgets...")
+    failures = 0
+    for method, path, body, budget in BUDGETS:
+        try:
+            response = client.request(method, path, json=body, headers={"X-Query-Budget": str(budget)})
+            count = query_count(response)
+            # Some handlers (chat) swallow errors, so check the reported count too
+            if count > budget:
+                raise QueryBudgetExceeded(f"{count} queries reported")
+            print(f"  [OK] {method} {path}: {count} queries (budget {budget})")
+        except QueryBudgetExceeded as e:
+            failures += 1
+            print(f"  [X] {method} {path}: {e}")
+    return failures
+
+if __name__ == "__main__":
+    with client:  # runs the app lifespan (table creation)
+        failures = test_budgets()
+    if failures:
+        print(f"\n[X] {failures} endpoint(s) exceeded their query budget")
+        sys.exit(1)
+    print("\n[OK] All endpoints within query budget!")
@@ -0,0 +1,122 @@
+import os
+import sys
+import random
+import tempfile
+from datetime import timedelta
+
+# Run against a scratch database so the check doesn't touch real data
+scratch_db = os.path.join(tempfile.mkdtemp(), "verify_query_planner.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{scratch_db}"
+os.environ["EXPENSE_SNAPSHOT_CACHE"] = ""
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import func
+from fastapi.testclient import TestClient
+from backend.main import app
+from backend import models, database
+from backend.services import bulk, snapshot
+from backend.services.ai_analyst import AIAnalyst, Aggregate, period_range
+
+client = TestClient(app)
+
+QUESTION = "How much did I spend on food and transport at walmart this month vs last month?"
+CATEGORIES = ["Food", "Transport", "Rent"]
+STORES = ["Walmart", "Walmart Supercenter", "Target", None]
+# Other phrasings -> expected plan
+PLANS = {
+    "how much on food vs transport this month": [
+        Aggregate("food", None, "this month"),
+        Aggregate("transport", None, "this month"),
+    ],
+    "how much did i spend at target compared to walmart?": [
+        Aggregate(None, "target", None),
+        Aggregate(None, "walmart", None),
+    ],
+    "what did i spend on food versus rent last month?": [
+        Aggregate("food", None, "last month"),
+        Aggregate("rent", None, "last month"),
+    ],
+    # The period isn't a category
+    "how much did i spend on this month": [Aggregate(None, None, "this month")],
+}
+
+def seed():
+    # This month, last month and two months back, so the periods have
+    # neighbours to leave out
+    rng = random.Random(26)
+    this_month, _ = period_range("this month")
+    last_month, _ = period_range("last month")
+    values = []
+    for start in (this_month, last_month, last_month - timedelta(days=20)):
+        for i in range(60):
+            values.append({
+                "amount": round(rng.uniform(1, 120), 2),
+                "category": rng.choice(CATEGORIES),
+                "store_name": rng.choice(STORES),
+                "description": None,
+                "created_at": start + timedelta(hours=rng.randrange(24 * 27)),
+            })
+    db = database.SessionLocal()
+    bulk.insert_values(db, values)
+    db.commit()
+    db.close()
+
+def reference_total(db, agg: Aggregate) -> float:
+    # One plain SUM per part: what the analyst did before the planner
+    start, end = period_range(agg.period)
+    return db.query(func.coalesce(func.sum(models.Expense.amount), 0.0)).join(models.Expense.category_ref).filter(
+        func.lower(models.Category.name) == agg.category,
+        func.lower(models.Expense.store_name).like(f"%{agg.store}%"),
+        models.Expense.created_at >= start,
+        models.Expense.created_at < end,
+    ).scalar()
+
+def test_plan():
+    print("Testing the plan for a compound question...")
+    plan = AIAnalyst(None).planner.plan(QUESTION.lower())
+    assert plan == [
+        Aggregate("food", "walmart", "this month"),
+        Aggregate("food", "walmart", "last month"),
+        Aggregate("transport", "walmart", "this month"),
+        Aggregate("transport", "walmart", "last month"),
+    ], plan
+    print(f"  [OK] {len(plan)} aggregates")
+    for question, expected in PLANS.items():
+        assert AIAnalyst(None).planner.plan(question) == expected, (question, AIAnalyst(None).planner.plan(question))
+    print(f"  [OK] {len(PLANS)} other phrasings")
+    return plan
+
+def test_answer(plan, use_snapshot: bool):
+    mode = "snapshot" if use_snapshot else "SQL"
+    print(f"Testing the planner's answer ({mode})...")
+    snapshot.ENABLED = use_snapshot
+    db = database.SessionLocal()
+    try:
+        analyst = AIAnalyst(db)
+        reference = {agg: reference_total(db, agg) for agg in plan}
+        assert all(reference.values()), "seed data should cover every part"
+        expected = analyst._format_plan(plan, reference)
+
+        analyst.analyze(QUESTION)  # warm-up: snapshot load, FTS index check
+        stats = database.begin_query_stats()
+        try:
+            answer = analyst.analyze(QUESTION)
+        finally:
+            database.end_query_stats(stats)
+    finally:
+        db.close()
+
+    assert answer == "Here's the breakdown:\n" + "\n".join(expected), answer
+    # The SQL path answers every part with one statement; the snapshot
+    # needs none once loaded
+    assert stats.count == (0 if use_snapshot else 1), f"{stats.count} queries"
+    print(f"  [OK] same totals as {len(plan)} single queries, using {stats.count} queries")
+    print("      " + expected[-1])
+
+if __name__ == "__main__":
+    with client:  # runs the app lifespan (table creation)
+        seed()
+        plan = test_plan()
+        test_answer(plan, use_snapshot=False)
+        test_answer(plan, use_snapshot=True)
+    print("\n[OK] Query planner verification passed!")